@@ -11,6 +11,7 @@ from pages.applications import show_applications
 from pages.subscription import show_subscription
 from pages.apply_job import show_apply_job
 from utils.google_auth import handle_google_callback, restore_session
+from utils.email_outbox import start_worker
 from pages.dashboard import (
     show_job_seeker_dashboard,
     show_job_poster_dashboard,
@@ -20,6 +21,9 @@ from pages.dashboard import (
 # Initialize database
 init_db()
 
+# Drain emails queued before a restart (no-op once the worker is running)
+start_worker()
+
 # Import necessary modules for page navigation
 try:
     from pages.apply_job import apply_job, show_apply_job
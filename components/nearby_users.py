@@ -73,8 +73,14 @@ def show_nearby_users(user_id, user_role, max_distance=50, premium_only=False, s
                     # Update the max_distance
                     max_distance = new_distance
             
+            skills = st.text_input(
+                "Skills (comma separated)",
+                value="",
+                key=f"nearby_skills_{user_role}_{user_id}_{section_id}"
+            )
+
             # Get nearby users based on distance
-            nearby_users = get_nearby_users(conn, user_id, user_role, max_distance)
+            nearby_users = get_nearby_users(conn, user_id, user_role, max_distance, skills=skills)
             
             # Display users for distance-based search
             if not nearby_users:
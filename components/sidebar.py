@@ -1,4 +1,5 @@
 import streamlit as st
+from utils.database import get_unread_counters
 
 def show_sidebar():
     """Display the sidebar with role-specific navigation"""
@@ -18,6 +19,16 @@ def show_sidebar():
         elif user['role'] == 'Administrator':
             show_admin_sidebar()
 
+def badge_label(label, page):
+    """Append the user's unread message count to the Messages button"""
+    if page != 'messages':
+        return label
+    try:
+        unread = get_unread_counters(st.session_state['user']['user_id'])['messages']
+    except Exception:
+        return label
+    return f"{label} ({unread})" if unread else label
+
 def navigate_to(page):
     """Handle navigation to a specific page"""
     st.session_state['page'] = page
@@ -55,7 +66,7 @@ def show_job_seeker_sidebar():
     }
     
     for label, info in nav_items.items():
-        if st.sidebar.button(label, key=f"seeker_{info['page']}", use_container_width=True):
+        if st.sidebar.button(badge_label(label, info['page']), key=f"seeker_{info['page']}", use_container_width=True):
             navigate_to(info['page'])
     
     if st.sidebar.button('🚪 Logout', key="seeker_logout", use_container_width=True):
@@ -99,7 +110,7 @@ def show_job_poster_sidebar():
     }
     
     for label, info in nav_items.items():
-        if st.sidebar.button(label, key=f"poster_{info['page']}", use_container_width=True):
+        if st.sidebar.button(badge_label(label, info['page']), key=f"poster_{info['page']}", use_container_width=True):
             navigate_to(info['page'])
     
     if st.sidebar.button('🚪 Logout', key="poster_logout", use_container_width=True):
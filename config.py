@@ -4,7 +4,6 @@ import secrets
 import streamlit as st
 from datetime import datetime
 from requests_oauthlib import OAuth2Session
-import bcrypt
 
 # Load environment variables from .env file
 load_dotenv()
@@ -15,8 +14,17 @@ APP_URL = os.getenv('APP_URL', 'http://localhost:8501')
 
 # Security
 SESSION_SECRET = os.getenv('SESSION_SECRET', secrets.token_urlsafe(32))
+# Precomputed bcrypt hash; generate one with `python -m utils.passwords`
 ADMIN_PASSWORD_HASH = os.getenv('ADMIN_PASSWORD_HASH', 'default_hash_for_development')
 
+# Password hashing (see utils/passwords.py). bcrypt runs on a small worker
+# pool; at most PASSWORD_HASH_MAX_PENDING hashes run or wait at once, and a
+# caller gives up after PASSWORD_HASH_TIMEOUT seconds without a slot.
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', '12'))  # Stored hashes with another cost are upgraded on login
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', '2'))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', '16'))
+PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', '10'))
+
 # Google OAuth Settings
 GOOGLE_CLIENT_ID = os.getenv('GOOGLE_CLIENT_ID', '')
 GOOGLE_CLIENT_SECRET = os.getenv('GOOGLE_CLIENT_SECRET', '')
@@ -32,13 +40,32 @@ GOOGLE_SCOPES = [
 
 # Database Settings
 DATABASE_PATH = os.path.join(os.path.dirname(__file__), 'jobcon.db')
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '8'))  # Idle connections kept open for reuse
+
+# PRAGMA profile applied once to every new pooled connection (order matters:
+# busy_timeout must be set before switching journal_mode)
+DB_PRAGMAS = {
+    'busy_timeout': int(os.getenv('DB_BUSY_TIMEOUT_MS', '5000')),
+    'journal_mode': os.getenv('DB_JOURNAL_MODE', 'WAL'),
+    'synchronous': os.getenv('DB_SYNCHRONOUS', 'NORMAL'),
+    'cache_size': -int(os.getenv('DB_CACHE_SIZE_KB', '16384')),  # Negative value = KiB
+    'mmap_size': int(os.getenv('DB_MMAP_SIZE', str(64 * 1024 * 1024))),
+    'temp_store': 'MEMORY',
+    'wal_autocheckpoint': int(os.getenv('DB_WAL_AUTOCHECKPOINT', '1000')),  # Pages
+}
+DB_CHECKPOINT_INTERVAL = int(os.getenv('DB_CHECKPOINT_INTERVAL', '300'))  # Seconds between passive WAL checkpoints
 
-# Email Settings
+# Email Settings. For local testing point these at a stand-in such as
+# `python -m aiosmtpd -n -l localhost:1025` with SMTP_USE_TLS=0 and no username.
 SMTP_SERVER = os.getenv('SMTP_SERVER', 'smtp.gmail.com')
 SMTP_PORT = int(os.getenv('SMTP_PORT', '587'))
 SMTP_USERNAME = os.getenv('SMTP_USERNAME')
 SMTP_PASSWORD = os.getenv('SMTP_PASSWORD')
 EMAIL_FROM = os.getenv('EMAIL_FROM', 'JobCon <noreply@jobcon.com>')
+SMTP_FROM_NAME = os.getenv('SMTP_FROM_NAME', 'JobCon')
+SMTP_FROM_ADDRESS = os.getenv('SMTP_FROM_ADDRESS', SMTP_USERNAME or 'noreply@localhost')
+SMTP_USE_TLS = os.getenv('SMTP_USE_TLS', '1') == '1'  # STARTTLS before login
+SMTP_TIMEOUT = float(os.getenv('SMTP_TIMEOUT', '10'))  # seconds
 
 # Payment Settings
 STRIPE_PUBLIC_KEY = os.getenv('STRIPE_PUBLIC_KEY')
@@ -50,11 +77,13 @@ MAPBOX_ACCESS_TOKEN = os.getenv('MAPBOX_ACCESS_TOKEN')
 
 # Admin configuration
 ADMIN_EMAIL = 'furkaan309@gmail.com'
-ADMIN_PASSWORD = 'admin123'  # This should be stored securely
-ADMIN_PASSWORD_HASH = bcrypt.hashpw(ADMIN_PASSWORD.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
 
 # Session configuration
 SESSION_EXPIRY = 24 * 60 * 60  # 24 hours in seconds
+# Signed session tokens (see utils/session_token.py) are re-checked with
+# Google only once they are this close to expiry. Set SESSION_SECRET so
+# tokens stay valid across restarts.
+SESSION_REFRESH_MARGIN = int(os.getenv('SESSION_REFRESH_MARGIN', str(15 * 60)))  # Seconds
 
 # Role-based access control
 ROLES = ['Job Seeker', 'Job Poster', 'Administrator']
@@ -116,9 +145,27 @@ MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
 
 # Pagination settings
 ITEMS_PER_PAGE = 10
+MESSAGES_PER_PAGE = 50  # Messages loaded per "load older" step of a chat thread
+CHAT_REFRESH_SECONDS = 2  # How often an open chat checks its message channel
 
 # Search settings
 SEARCH_RADIUS_KM = 50  # Default search radius in kilometers
+ZIP_SEARCH_GEOHASH_PRECISION = 5  # ~5 km cells; a postal code search covers its cell and the 8 neighbours
+
+# Job recommendations
+RECOMMENDATION_CANDIDATES = 300  # Jobs retrieved per candidate source before scoring
+RECOMMENDATION_LIMIT = 10  # Jobs returned, best match first
+RECOMMENDATION_CACHE_SECONDS = 300  # Per-user cache lifetime; new jobs invalidate it sooner
+
+# Geocoding settings (OpenStreetMap Nominatim)
+GEOCODE_URL = os.getenv('GEOCODE_URL', 'https://nominatim.openstreetmap.org')
+GEOCODE_USER_AGENT = os.getenv('OPENSTREETMAP_USER_AGENT', 'Workify/1.0')
+GEOCODE_EMAIL = os.getenv('OPENSTREETMAP_EMAIL', '')
+GEOCODE_TIMEOUT = float(os.getenv('GEOCODE_TIMEOUT', '5'))  # seconds
+GEOCODE_MIN_INTERVAL = float(os.getenv('GEOCODE_MIN_INTERVAL', '1.0'))  # Nominatim allows 1 request/second
+GEOCODE_CACHE_TTL = int(os.getenv('GEOCODE_CACHE_TTL', str(30 * 24 * 60 * 60)))  # 30 days
+GEOCODE_NEGATIVE_TTL = int(os.getenv('GEOCODE_NEGATIVE_TTL', str(24 * 60 * 60)))  # 1 day for "not found"
+GEOCODE_LRU_SIZE = int(os.getenv('GEOCODE_LRU_SIZE', '1024'))  # In-process entries
 
 # Notification settings
 NOTIFICATION_TYPES = [
@@ -128,6 +175,15 @@ NOTIFICATION_TYPES = [
     'job_completed'
 ]
 
+# Email outbox worker
+EMAIL_BATCH_SIZE = int(os.getenv('EMAIL_BATCH_SIZE', '50'))  # Outbox rows claimed per batch
+EMAIL_POLL_SECONDS = float(os.getenv('EMAIL_POLL_SECONDS', '5'))  # Idle wait between outbox checks
+EMAIL_IDLE_DISCONNECT_SECONDS = float(os.getenv('EMAIL_IDLE_DISCONNECT_SECONDS', '60'))  # Close an unused SMTP session
+EMAIL_MAX_ATTEMPTS = int(os.getenv('EMAIL_MAX_ATTEMPTS', '5'))  # Then the email is marked failed
+EMAIL_RETRY_BASE_SECONDS = float(os.getenv('EMAIL_RETRY_BASE_SECONDS', '30'))  # Doubled after every failed attempt
+EMAIL_DIGEST_SECONDS = float(os.getenv('EMAIL_DIGEST_SECONDS', '300'))  # How long digest emails wait for company
+EMAIL_CLAIM_LEASE_SECONDS = float(os.getenv('EMAIL_CLAIM_LEASE_SECONDS', '600'))  # Then a 'sending' claim counts as abandoned
+
 # Security settings
 PASSWORD_MIN_LENGTH = 8
 PASSWORD_REQUIRE_SPECIAL = True
@@ -178,14 +234,16 @@ SUCCESS_MESSAGES = {
 
 def create_oauth_session():
     """Create an OAuth2Session for Google authentication"""
+    from utils.google_clients import pooled_session
+    
     if not GOOGLE_CLIENT_ID:
         raise ValueError("GOOGLE_CLIENT_ID is not configured")
     
-    return OAuth2Session(
+    return pooled_session(OAuth2Session(
         GOOGLE_CLIENT_ID,
         scope=GOOGLE_SCOPES,
         redirect_uri=GOOGLE_REDIRECT_URI
-    )
+    ))
 
 def get_google_auth_url(role=None):
     """Generate the Google OAuth authorization URL"""
@@ -245,11 +303,13 @@ def handle_google_callback():
             full_url = f"{APP_URL}?code={code}&state={state}"
             
             # Get tokens
-            token = oauth.fetch_token(
-                GOOGLE_TOKEN_URL,
-                client_secret=GOOGLE_CLIENT_SECRET,
-                authorization_response=full_url
-            )
+            from utils.google_clients import timed
+            with timed("Google token exchange"):
+                token = oauth.fetch_token(
+                    GOOGLE_TOKEN_URL,
+                    client_secret=GOOGLE_CLIENT_SECRET,
+                    authorization_response=full_url
+                )
             
             # Store token in session state
             st.session_state['google_token'] = token
@@ -1,6 +1,5 @@
 import streamlit as st
 from utils.database import get_db
-from datetime import datetime
 from utils.notification_manager import NotificationManager
 
 def show_applications():
@@ -40,13 +39,11 @@ def show_seeker_applications(user):
                 j.job_poster_id,
                 u.name as poster_name,
                 u.company_name as poster_company_name,
-                (SELECT COUNT(*) FROM messages 
-                 WHERE receiver_id = ? 
-                 AND sender_id = j.job_poster_id 
-                 AND is_read = 0) as unread_messages
+                IFNULL(c.unread_count, 0) as unread_messages
             FROM applications a
             JOIN jobs j ON a.job_id = j.job_id
             JOIN users u ON j.job_poster_id = u.user_id
+            LEFT JOIN conversations c ON c.user_id = ? AND c.other_user_id = j.job_poster_id
             WHERE a.applicant_id = ?
             ORDER BY 
                 CASE a.status
@@ -232,13 +229,11 @@ def show_poster_applications(user):
                 u.name as applicant_name,
                 u.email as applicant_email,
                 u.phone as applicant_phone,
-                (SELECT COUNT(*) FROM messages 
-                 WHERE receiver_id = ? 
-                 AND sender_id = a.applicant_id 
-                 AND is_read = 0) as unread_messages
+                IFNULL(c.unread_count, 0) as unread_messages
             FROM applications a
             JOIN jobs j ON a.job_id = j.job_id
             JOIN users u ON a.applicant_id = u.user_id
+            LEFT JOIN conversations c ON c.user_id = ? AND c.other_user_id = a.applicant_id
             WHERE j.job_poster_id = ?
         """
         
@@ -369,30 +364,11 @@ def show_poster_applications(user):
 def update_application_status(application_id, new_status):
     """Update the status of an application and create notifications"""
     try:
-        conn = get_db()
-        cursor = conn.cursor()
-        
-        # Update the application status
-        cursor.execute("""
-            UPDATE applications 
-            SET status = ?, updated_at = ? 
-            WHERE application_id = ?
-        """, (new_status, datetime.now().isoformat(), application_id))
-        
-        conn.commit()
-        
-        # Create notifications
-        try:
-            NotificationManager.notify_application_status_change(application_id, new_status)
-        except Exception as e:
-            st.warning(f"Notification could not be sent, but status was updated: {str(e)}")
-        
+        # Status update, notifications and welcome messages in one transaction
+        NotificationManager.update_application_statuses([(application_id, new_status)])
         st.success(f"Application status updated to {new_status}")
         return True
         
     except Exception as e:
         st.error(f"Could not update application status: {str(e)}")
         return False
-    
-    finally:
-        conn.close()
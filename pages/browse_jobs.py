@@ -1,9 +1,11 @@
 import streamlit as st
-from utils.database import get_db
+from utils.database import get_db, has_spatial_index
 from datetime import datetime, timedelta
 import folium
 from streamlit_folium import folium_static
-from utils.location_utils import calculate_distance
+from utils.geo import bbox_filter
+from utils.job_search import keyword_filter
+from utils.pagination import Keyset, page_cursor, page_controls
 
 def check_application_limits(user_id):
     """Check if user has reached their application limits"""
@@ -84,21 +86,34 @@ def show_browse_jobs():
             ["Most Recent", "Distance", "Pay Rate (High to Low)", "Pay Rate (Low to High)"]
         )
     
-    # Build query
+    has_user_coords = bool(user_location and user_location['latitude'] and user_location['longitude'])
+    
+    # Build query; distance is computed in SQL by the registered haversine_km()
     query = """
         SELECT j.*, u.company_name, u.rating, u.latitude as poster_lat, u.longitude as poster_lng,
                COUNT(DISTINCT r.review_id) as review_count
+    """
+    params = []
+    
+    if has_user_coords:
+        query += ", haversine_km(?, ?, j.job_latitude, j.job_longitude) as distance"
+        params.extend([user_location['latitude'], user_location['longitude']])
+    # Jobs without a payment amount sort (and page) as 0
+    query += ", IFNULL(j.payment_amount, 0) as sort_pay"
+    
+    query += """
         FROM jobs j
         JOIN users u ON j.poster_id = u.user_id
         LEFT JOIN reviews r ON u.user_id = r.reviewed_user_id
         WHERE j.is_active = 1
     """
-    params = []
     
     if search_term:
-        query += " AND (j.title LIKE ? OR j.description LIKE ? OR j.skills_required LIKE ?)"
-        search_pattern = f"%{search_term}%"
-        params.extend([search_pattern] * 3)
+        # Full-text match via jobs_fts (LIKE fallback without FTS5)
+        keyword_sql, keyword_params = keyword_filter(search_term)
+        if keyword_sql:
+            query += f" AND {keyword_sql}"
+            params.extend(keyword_params)
     
     if location:
         query += " AND j.location LIKE ?"
@@ -110,49 +125,46 @@ def show_browse_jobs():
     
     # Distance filtering for location-enabled jobs when user has location
     if user_location and user_location['latitude'] and user_location['longitude'] and distance > 0:
-        query += """
-            AND (
-                j.job_latitude IS NOT NULL 
-                AND j.job_longitude IS NOT NULL
-                AND (6371 * acos(cos(radians(?)) * cos(radians(j.job_latitude)) * 
-                cos(radians(j.job_longitude) - radians(?)) + sin(radians(?)) * 
-                sin(radians(j.job_latitude)))) <= ?
+        # Bounding-box prefilter via the jobs_geo R*Tree, exact distance below
+        if has_spatial_index('jobs_geo'):
+            bbox_sql, bbox_params = bbox_filter(
+                'jobs_geo', 'j.job_id',
+                user_location['latitude'], user_location['longitude'], distance
             )
-        """
+            query += f" AND {bbox_sql}"
+            params.extend(bbox_params)
+        
+        query += " AND haversine_km(?, ?, j.job_latitude, j.job_longitude) <= ?"
         params.extend([
             user_location['latitude'], 
             user_location['longitude'], 
-            user_location['latitude'], 
             distance
         ])
     
-    query += " GROUP BY j.job_id"
-    
-    if sort_by == "Most Recent":
-        query += " ORDER BY j.created_at DESC"
-    elif sort_by == "Pay Rate (High to Low)":
-        query += " ORDER BY j.pay_rate DESC"
+    # Sort order, ending in job_id so results can be paged by keyset
+    if sort_by == "Pay Rate (High to Low)":
+        keyset = Keyset('sort_pay', 'j.job_id')
     elif sort_by == "Pay Rate (Low to High)":
-        query += " ORDER BY j.pay_rate ASC"
-    elif sort_by == "Distance" and user_location and user_location['latitude'] and user_location['longitude']:
-        # We'll sort in Python after fetching results since SQLite doesn't handle this well
-        pass
+        keyset = Keyset('sort_pay', 'j.job_id', descending=False)
+    elif sort_by == "Distance" and has_user_coords:
+        # Jobs without coordinates cannot be ranked by distance
+        query += " AND distance IS NOT NULL"
+        keyset = Keyset('distance', 'j.job_id', descending=False)
+    else:  # Most Recent
+        keyset = Keyset('j.created_at', 'j.job_id')
     
-    # Execute query
-    cursor.execute(query, params)
-    jobs = cursor.fetchall()
+    # Continue after the last job of the previous page
+    after = page_cursor('browse_jobs', (search_term, location, job_type, distance, sort_by))
+    page_sql, page_params = keyset.filter(after)
+    if page_sql:
+        query += f" AND {page_sql}"
+        params.extend(page_params)
     
-    # Sort by distance if needed
-    if sort_by == "Distance" and user_location and user_location['latitude'] and user_location['longitude']:
-        def calculate_job_distance(job):
-            if job.get('job_latitude') and job.get('job_longitude'):
-                return calculate_distance(
-                    user_location['latitude'], user_location['longitude'],
-                    job['job_latitude'], job['job_longitude']
-                )
-            return float('inf')  # Jobs without coordinates go to the end
-        
-        jobs = sorted(jobs, key=calculate_job_distance)
+    query += " GROUP BY j.job_id"
+    query += keyset.order_by()
+    
+    # Execute query
+    jobs, next_cursor = keyset.fetch_page(cursor, query, params)
     
     if not jobs:
         st.info("No jobs found matching your criteria.")
@@ -195,12 +207,8 @@ def show_browse_jobs():
             if job.get('job_latitude') and job.get('job_longitude'):
                 # Calculate distance if user location is available
                 distance_info = ""
-                if user_location and user_location['latitude'] and user_location['longitude']:
-                    job_distance = calculate_distance(
-                        user_location['latitude'], user_location['longitude'],
-                        job['job_latitude'], job['job_longitude']
-                    )
-                    distance_info = f"<br>📍 {job_distance:.1f} km from you"
+                if job.get('distance') is not None:
+                    distance_info = f"<br>📍 {job['distance']:.1f} km from you"
                 
                 # Create popup content
                 popup_html = f"""
@@ -209,7 +217,7 @@ def show_browse_jobs():
                     🏢 {job['company_name']}<br>
                     📍 {job['location']}<br>
                     💼 {job['job_type']}<br>
-                    {"💰 $" + str(job['pay_rate']) + "/hr" if job['pay_rate'] else ""}
+                    {"💰 $" + str(job['payment_amount']) + "/hr" if job['payment_amount'] else ""}
                     {distance_info}
                     <br><br>
                     <a href="javascript:void(0);" onclick="parent.postMessage({{'job_id': {job['job_id']}}}, '*')">Apply Now</a>
@@ -249,8 +257,8 @@ def show_browse_jobs():
                 with col1:
                     st.subheader(job['title'])
                     st.write(f"🏢 {job['company_name']} | 📍 {job['location']} | 💼 {job['job_type']}")
-                    if job['pay_rate']:
-                        st.write(f"💰 ${job['pay_rate']}/hr")
+                    if job['payment_amount']:
+                        st.write(f"💰 ${job['payment_amount']}/hr")
                 
                 with col2:
                     can_apply, limit_message = check_application_limits(st.session_state['user']['user_id'])
@@ -280,16 +288,12 @@ def show_browse_jobs():
                     st.write(f"🏢 {job['company_name']}")
                     st.write(f"📍 {job['location']}")
                     st.write(f"💼 {job['job_type']}")
-                    if job['pay_rate']:
-                        st.write(f"💰 ${job['pay_rate']}/hr")
+                    if job['payment_amount']:
+                        st.write(f"💰 ${job['payment_amount']}/hr")
                     
                     # Add distance information if user location is available
-                    if user_location and user_location['latitude'] and user_location['longitude'] and job.get('job_latitude') and job.get('job_longitude'):
-                        distance = calculate_distance(
-                            user_location['latitude'], user_location['longitude'],
-                            job['job_latitude'], job['job_longitude']
-                        )
-                        st.write(f"📍 {distance:.1f} km from your location")
+                    if job.get('distance') is not None:
+                        st.write(f"📍 {job['distance']:.1f} km from your location")
                     
                     with st.expander("View Details"):
                         st.write(job['description'])
@@ -359,6 +363,7 @@ def show_browse_jobs():
                 
                 st.markdown("---")
     
+    page_controls('browse_jobs', next_cursor)
     conn.close()
 
 def save_job(user_id, job_id):
@@ -1,7 +1,13 @@
 import streamlit as st
-from utils.database import get_db
+from utils.database import get_db, has_column, has_spatial_index
+from utils.geo import bbox_filter
+from utils.job_search import keyword_filter, keyword_join
+from utils.pagination import Keyset, page_cursor, page_controls
 from datetime import datetime
 from utils.auth_manager import AuthManager
+from utils.notification_manager import NotificationManager
+from utils.recommendations import invalidate_recommendations
+from config import APPLICATION_STATUSES
 import sqlite3
 
 def get_current_user():
@@ -366,6 +372,7 @@ def show_seeker_portfolio(user):
                         datetime.now().isoformat()
                     ))
                     conn.commit()
+                    invalidate_recommendations(user['user_id'])
                     st.success("Work experience added!")
                     st.rerun()
         
@@ -417,6 +424,7 @@ def show_seeker_portfolio(user):
                         datetime.now().isoformat()
                     ))
                     conn.commit()
+                    invalidate_recommendations(user['user_id'])
                     st.success("Certification added!")
                     st.rerun()
         
@@ -537,6 +545,7 @@ def show_job_search(user):
                                 WHERE user_id = ?
                             """, (location, datetime.now().isoformat(), user['user_id']))
                             conn.commit()
+                            invalidate_recommendations(user['user_id'])
                             
                             # Update session state
                             st.session_state['user']['location'] = location
@@ -590,6 +599,9 @@ def show_job_search(user):
         # Only add distance sorting if we have user coordinates
         if user_location and user_location.get('latitude') and user_location.get('longitude'):
             sort_options.insert(1, "Nearest Location")
+        # Relevance ordering when searching by keyword
+        if keyword:
+            sort_options.insert(0, "Best Match")
         
         sort_by = st.selectbox("Sort By", sort_options)
     with sort_col2:
@@ -618,27 +630,19 @@ def show_job_search(user):
         finally:
             conn.close()
     
-    # Search button
-    search = st.button("Search Jobs", use_container_width=True)
+    # Search button; filters stay applied while paging through the results
+    if st.button("Search Jobs", use_container_width=True):
+        st.session_state['job_search_submitted'] = True
+    search = st.session_state.get('job_search_submitted', False)
     
     # Always show some results, even without explicit search
     conn = get_db()
     cursor = conn.cursor()
     
     try:
-        # Check if postal_code column exists in jobs table
-        has_postal_code = True
-        try:
-            cursor.execute("SELECT postal_code FROM jobs LIMIT 1")
-        except sqlite3.OperationalError:
-            has_postal_code = False
-            
-        # Check if job_latitude and job_longitude exist in the jobs table
-        has_job_coords = True
-        try:
-            cursor.execute("SELECT job_latitude, job_longitude FROM jobs LIMIT 1")
-        except sqlite3.OperationalError:
-            has_job_coords = False
+        # Optional columns, from the cached schema capability map
+        has_postal_code = has_column('jobs', 'postal_code')
+        has_job_coords = has_column('jobs', 'job_latitude') and has_column('jobs', 'job_longitude')
         
         # Get jobs user has already applied to
         cursor.execute("""
@@ -647,37 +651,55 @@ def show_job_search(user):
         """, (user['user_id'],))
         applied_jobs = {row['job_id'] for row in cursor.fetchall()}
         
-        # Base query - use user's latitude/longitude when job coords not available
+        # Base query - use user's latitude/longitude when job coords not available.
+        # One row per job (no GROUP BY), so pages are read straight off the sort index
         query = """
             SELECT j.*, u.name as poster_name, u.company_name,
-                   COUNT(DISTINCT a.application_id) as application_count,
-                   (SELECT COUNT(*) FROM applications WHERE job_id = j.job_id) as current_applicants,
+                   j.application_count as current_applicants,
                    u.is_premium as poster_is_premium
         """
         
         # Conditionally add columns based on what exists
         if has_job_coords:
-            query += ", j.job_latitude, j.job_longitude"
+            lat_column, lon_column = "j.job_latitude", "j.job_longitude"
         else:
             # Use user latitude/longitude instead since job latitude/longitude don't exist
-            query += ", u.latitude as job_latitude, u.longitude as job_longitude"
+            lat_column, lon_column = "u.latitude", "u.longitude"
+        query += f", {lat_column} as job_latitude, {lon_column} as job_longitude"
+        params = []
+        
+        # Distance to the user, computed in SQL by the registered haversine_km()
+        has_user_coords = bool(user_location and user_location['latitude'] and user_location['longitude'])
+        if has_user_coords:
+            query += f", haversine_km(?, ?, {lat_column}, {lon_column}) as distance"
+            params.extend([user_location['latitude'], user_location['longitude']])
+            
+        # Full-text keyword match ranked by bm25; keyword_filter() below covers the LIKE fallback
+        match_join, match_params = keyword_join(keyword) if search and keyword else (None, [])
+        if match_join:
+            query += ", m.match_rank, m.match_snippet"
+        query += ", IFNULL(j.payment_amount, 0) as sort_pay"
+        query += ", IFNULL(j.workers_needed, 1) as sort_workers"
             
         query += """
             FROM jobs j
             JOIN users u ON j.job_poster_id = u.user_id
-            LEFT JOIN applications a ON j.job_id = a.job_id
-            WHERE j.status = 'Open'
         """
-        params = []
+        if match_join:
+            query += match_join
+            params.extend(match_params)
+        query += " WHERE (j.status = 'Open'"
         
         # Apply filters (only if search button was clicked)
         if search:
             if not show_filled:
-                query += " AND (SELECT COUNT(*) FROM applications WHERE job_id = j.job_id) < j.workers_needed"
+                query += " AND j.application_count < IFNULL(j.workers_needed, 1)"
             
-            if keyword:
-                query += " AND (j.title LIKE ? OR j.description LIKE ?)"
-                params.extend([f"%{keyword}%", f"%{keyword}%"])
+            if keyword and not match_join:
+                keyword_sql, keyword_params = keyword_filter(keyword)
+                if keyword_sql:
+                    query += f" AND {keyword_sql}"
+                    params.extend(keyword_params)
             
             if location:
                 # Use the location filter input by the user, but check for postal_code column
@@ -706,47 +728,56 @@ def show_job_search(user):
             # Only include the distance filter if we have user coordinates and distance_enabled is True
             # and the job has coordinates available
             if distance_enabled and user_location and user_location['latitude'] and user_location['longitude'] and max_distance > 0 and has_job_coords:
-                # Use the Haversine formula to calculate distance
-                query += """
-                    AND (
-                        j.job_latitude IS NOT NULL 
-                        AND j.job_longitude IS NOT NULL
-                        AND (6371 * acos(cos(radians(?)) * cos(radians(j.job_latitude)) * 
-                        cos(radians(j.job_longitude) - radians(?)) + sin(radians(?)) * 
-                        sin(radians(j.job_latitude)))) <= ?
+                # Bounding-box prefilter via the jobs_geo R*Tree, exact distance below
+                if has_spatial_index('jobs_geo'):
+                    bbox_sql, bbox_params = bbox_filter(
+                        'jobs_geo', 'j.job_id',
+                        user_location['latitude'], user_location['longitude'], max_distance
                     )
-                """
+                    query += f" AND {bbox_sql}"
+                    params.extend(bbox_params)
+                
+                query += " AND haversine_km(?, ?, j.job_latitude, j.job_longitude) <= ?"
                 params.extend([
                     user_location['latitude'], 
                     user_location['longitude'], 
-                    user_location['latitude'], 
                     max_distance
                 ])
         
         # Include remote jobs if checked
         if include_remote:
-            # Check if is_remote column exists
-            has_is_remote = True
-            try:
-                cursor.execute("SELECT is_remote FROM jobs LIMIT 1")
-            except sqlite3.OperationalError:
-                has_is_remote = False
-            
-            if has_is_remote:
+            if has_column('jobs', 'is_remote'):
                 query += " OR j.is_remote = 1"
+        query += ")"
         
-        query += " GROUP BY j.job_id"
-        
-        # Apply sorting
-        if sort_by == "Highest Paid":
-            query += " ORDER BY CASE WHEN j.payment_amount IS NULL THEN 0 ELSE j.payment_amount END DESC"
+        # Sort order; every order ends in job_id so it can be paged by keyset
+        if sort_by == "Best Match" and match_join:
+            keyset = Keyset('m.match_rank', 'j.job_id', descending=False)
+        elif sort_by == "Highest Paid":
+            keyset = Keyset('sort_pay', 'j.job_id')
         elif sort_by == "Most Workers Needed":
-            query += " ORDER BY j.workers_needed DESC"
-        elif sort_by == "Nearest Location" and user_location and user_location['latitude'] and user_location['longitude']:
-            # We'll sort by distance after fetching results
-            pass
+            keyset = Keyset('sort_workers', 'j.job_id')
+        elif sort_by == "Nearest Location" and has_user_coords:
+            # Nearest first within the max distance; jobs without coordinates are dropped
+            query += " AND distance IS NOT NULL"
+            if max_distance and max_distance > 0:
+                query += " AND distance <= ?"
+                params.append(max_distance)
+            keyset = Keyset('distance', 'j.job_id', descending=False)
         else:  # Newest First
-            query += " ORDER BY j.created_at DESC"
+            keyset = Keyset('j.created_at', 'j.job_id')
+        
+        # Continue after the last job of the previous page
+        after = page_cursor('job_search', (
+            search, keyword, location, max_distance, job_type, trade_category,
+            payment_type, min_pay if payment_type != "To Be Discussed" else None,
+            include_remote, sort_by, show_filled
+        ))
+        page_sql, page_params = keyset.filter(after)
+        if page_sql:
+            query += f" AND {page_sql}"
+            params.extend(page_params)
+        query += keyset.order_by()
         
         # Debug the query
         if debug_mode:
@@ -757,28 +788,11 @@ def show_job_search(user):
         
         # Execute query with proper error handling
         try:
-            cursor.execute(query, params)
-            jobs = cursor.fetchall()
-            
-            # Calculate distances and sort if needed
-            if sort_by == "Nearest Location" and user_location and user_location['latitude'] and user_location['longitude']:
-                from utils.location_utils import calculate_distance
-                for job in jobs:
-                    if job.get('job_latitude') and job.get('job_longitude'):
-                        job['distance'] = calculate_distance(
-                            user_location['latitude'], user_location['longitude'],
-                            job['job_latitude'], job['job_longitude']
-                        )
-                    else:
-                        job['distance'] = float('inf')
-                jobs.sort(key=lambda x: x.get('distance', float('inf')))
-                
-                # Filter by max distance if specified
-                if max_distance and max_distance > 0:
-                    jobs = [j for j in jobs if j.get('distance', float('inf')) <= max_distance]
+            jobs, next_cursor = keyset.fetch_page(cursor, query, params)
             
             # Show result count
-            st.write(f"Found {len(jobs)} matching jobs")
+            if jobs:
+                st.write(f"Showing {len(jobs)} matching jobs")
             
             if jobs:
                 for job in jobs:
@@ -793,7 +807,7 @@ def show_job_search(user):
                         st.write(f"📍 {job['location']} | 💼 {job['job_type']}")
                         
                         # Distance if available
-                        if sort_by == "Nearest Location" and job.get('distance', float('inf')) != float('inf'):
+                        if sort_by == "Nearest Location" and job.get('distance') is not None:
                             st.write(f"📏 {job['distance']:.1f} km away")
                         
                         # Payment info
@@ -811,6 +825,10 @@ def show_job_search(user):
                         workers_needed = job.get('workers_needed', 1)  # Default to 1 if not specified
                         st.write(f"👥 Workers Needed: {workers_needed} | Current Applicants: {job.get('current_applicants', 0)}")
                         
+                        # Highlighted keyword match
+                        if job.get('match_snippet'):
+                            st.markdown(f"🔎 …{job['match_snippet']}…")
+                        
                         # Job description
                         st.write(job['description'])
                         
@@ -855,15 +873,8 @@ def show_job_search(user):
                                         dash_array="5"
                                     ).add_to(m)
                                     
-                                    # Calculate distance for display
-                                    from utils.location_utils import calculate_distance
-                                    distance = calculate_distance(
-                                        user_location['latitude'], user_location['longitude'],
-                                        job['job_latitude'], job['job_longitude']
-                                    )
-                                    
                                     # Add distance information to the map
-                                    folium.Tooltip(f"Distance: {distance:.1f} km").add_to(m)
+                                    folium.Tooltip(f"Distance: {job['distance']:.1f} km").add_to(m)
                                 
                                 # Display the map
                                 folium_static(m, height=250)
@@ -913,9 +924,11 @@ def show_job_search(user):
                                         st.session_state['prev_page'] = 'dashboard'
                                         st.session_state['page'] = 'job_details'
                                         st.rerun()
+
+                page_controls('job_search', next_cursor)
             else:
                 st.info("No jobs found matching your criteria")
-                
+
         except sqlite3.OperationalError as e:
             st.error(f"Database error: {str(e)}")
             st.info("Our job search is experiencing technical difficulties. We're working on fixing it.")
@@ -1030,12 +1043,11 @@ def show_my_applications(user):
         
         cursor.execute("""
             SELECT a.*, j.title, u.name as poster_name, u.company_name,
-                   (SELECT COUNT(*) FROM messages m 
-                    WHERE m.receiver_id = ? AND m.sender_id = j.job_poster_id 
-                    AND m.is_read = 0) as unread_messages
+                   IFNULL(c.unread_count, 0) as unread_messages
             FROM applications a
             JOIN jobs j ON a.job_id = j.job_id
             JOIN users u ON j.job_poster_id = u.user_id
+            LEFT JOIN conversations c ON c.user_id = ? AND c.other_user_id = j.job_poster_id
             WHERE a.applicant_id = ?
             ORDER BY a.created_at DESC
         """, (user['user_id'], user['user_id']))
@@ -1175,20 +1187,18 @@ def show_user_management():
     cursor = conn.cursor()
     
     try:
-        cursor.execute("""
+        # Counts per user on the page only, newest users first
+        keyset = Keyset('u.created_at', 'u.user_id')
+        page_sql, params = keyset.filter(page_cursor('admin_users'))
+        users, next_cursor = keyset.fetch_page(cursor, f"""
             SELECT u.*, 
-                   COUNT(DISTINCT j.job_id) as total_jobs,
-                   COUNT(DISTINCT a.application_id) as total_applications
+                   (SELECT COUNT(*) FROM jobs WHERE job_poster_id = u.user_id) as total_jobs,
+                   (SELECT COUNT(*) FROM applications
+                    WHERE applicant_id = u.user_id OR job_poster_id = u.user_id) as total_applications
             FROM users u
-            LEFT JOIN jobs j ON u.user_id = j.job_poster_id
-            LEFT JOIN applications a ON (
-                u.user_id = a.applicant_id OR 
-                u.user_id = j.job_poster_id
-            )
-            GROUP BY u.user_id
-            ORDER BY u.created_at DESC
-        """)
-        users = cursor.fetchall()
+            {f"WHERE {page_sql}" if page_sql else ""}
+            {keyset.order_by()}
+        """, params)
         
         if users:
             for user in users:
@@ -1259,6 +1269,8 @@ def show_user_management():
                                     file_name=f"user_data_{user['user_id']}.json",
                                     mime="application/json"
                                 )
+            
+            page_controls('admin_users', next_cursor)
         else:
             st.info("No users found")
     finally:
@@ -1271,13 +1283,15 @@ def show_job_management():
     cursor = conn.cursor()
     
     try:
-        cursor.execute("""
+        keyset = Keyset('j.created_at', 'j.job_id')
+        page_sql, params = keyset.filter(page_cursor('admin_jobs'))
+        jobs, next_cursor = keyset.fetch_page(cursor, f"""
             SELECT j.*, u.company_name, u.name as poster_name
             FROM jobs j
             JOIN users u ON j.job_poster_id = u.user_id
-            ORDER BY j.created_at DESC
-        """)
-        jobs = cursor.fetchall()
+            {f"WHERE {page_sql}" if page_sql else ""}
+            {keyset.order_by()}
+        """, params)
         
         if jobs:
             for job in jobs:
@@ -1302,6 +1316,7 @@ def show_job_management():
                                 (new_status, job['job_id'])
                             )
                             conn.commit()
+                            invalidate_recommendations()
                             st.rerun()
                     with col2:
                         if st.button("Delete Job", key=f"delete_job_{job['job_id']}"):
@@ -1316,8 +1331,11 @@ def show_job_management():
                                 (job['job_id'],)
                             )
                             conn.commit()
+                            invalidate_recommendations()
                             st.success("Job deleted successfully")
                             st.rerun()
+            
+            page_controls('admin_jobs', next_cursor)
         else:
             st.info("No jobs found")
     finally:
@@ -1544,6 +1562,7 @@ def show_poster_jobs(user):
                                 (new_status, job['job_id'])
                             )
                             conn.commit()
+                            invalidate_recommendations()
                             st.rerun()
                     with col3:
                         if st.button("Delete", key=f"delete_{job['job_id']}"):
@@ -1558,6 +1577,7 @@ def show_poster_jobs(user):
                                 (job['job_id'],)
                             )
                             conn.commit()
+                            invalidate_recommendations()
                             st.success("Job deleted successfully")
                             st.rerun()
         else:
@@ -1656,12 +1676,6 @@ def show_applications_received(user):
                     with col1:
                         if app['status'] == 'Pending' and app['accepted_count'] < app['workers_needed']:
                             if st.button("Accept", key=f"accept_{app['application_id']}"):
-                                cursor.execute("""
-                                    UPDATE applications 
-                                    SET status = 'Accepted', updated_at = ? 
-                                    WHERE application_id = ?
-                                """, (datetime.now().isoformat(), app['application_id']))
-                                
                                 # Calculate response time
                                 cursor.execute("""
                                     UPDATE applications
@@ -1671,27 +1685,14 @@ def show_applications_received(user):
                                         )
                                     WHERE application_id = ?
                                 """, (datetime.now().isoformat(), app['application_id']))
-                                
                                 conn.commit()
                                 
-                                # Send notification
-                                cursor.execute("""
-                                    INSERT INTO notifications (user_id, message, created_at)
-                                    VALUES (?, ?, ?)
-                                """, (app['applicant_id'], 
-                                     f"Your application for {app['job_title']} has been accepted!",
-                                     datetime.now().isoformat()))
-                                conn.commit()
+                                # Status update and notifications in one transaction
+                                NotificationManager.update_application_statuses([(app['application_id'], 'Accepted')])
                                 st.rerun()
                     with col2:
                         if app['status'] == 'Pending':
                             if st.button("Reject", key=f"reject_{app['application_id']}"):
-                                cursor.execute("""
-                                    UPDATE applications 
-                                    SET status = 'Rejected', updated_at = ? 
-                                    WHERE application_id = ?
-                                """, (datetime.now().isoformat(), app['application_id']))
-                                
                                 # Calculate response time
                                 cursor.execute("""
                                     UPDATE applications
@@ -1701,17 +1702,10 @@ def show_applications_received(user):
                                         )
                                     WHERE application_id = ?
                                 """, (datetime.now().isoformat(), app['application_id']))
-                                
                                 conn.commit()
                                 
-                                # Send notification
-                                cursor.execute("""
-                                    INSERT INTO notifications (user_id, message, created_at)
-                                    VALUES (?, ?, ?)
-                                """, (app['applicant_id'], 
-                                     f"Your application for {app['job_title']} was not selected.",
-                                     datetime.now().isoformat()))
-                                conn.commit()
+                                # Status update and notifications in one transaction
+                                NotificationManager.update_application_statuses([(app['application_id'], 'Rejected')])
                                 st.rerun()
                     with col3:
                         if st.button("Message", key=f"msg_{app['application_id']}"):
@@ -1787,7 +1781,9 @@ def show_admin_applications():
     cursor = conn.cursor()
     
     try:
-        cursor.execute("""
+        keyset = Keyset('a.created_at', 'a.application_id')
+        page_sql, params = keyset.filter(page_cursor('admin_applications'))
+        applications, next_cursor = keyset.fetch_page(cursor, f"""
             SELECT a.*, 
                    j.title as job_title,
                    js.name as applicant_name,
@@ -1797,11 +1793,26 @@ def show_admin_applications():
             JOIN jobs j ON a.job_id = j.job_id
             JOIN users js ON a.applicant_id = js.user_id
             JOIN users jp ON j.job_poster_id = jp.user_id
-            ORDER BY a.created_at DESC
-        """)
-        applications = cursor.fetchall()
+            {f"WHERE {page_sql}" if page_sql else ""}
+            {keyset.order_by()}
+        """, params)
         
         if applications:
+            # Bulk status change: one transaction for the updates and all notifications
+            with st.form("admin_bulk_status"):
+                labels = {
+                    app['application_id']: f"#{app['application_id']} {app['applicant_name']} → {app['job_title']}"
+                    for app in applications
+                }
+                selected = st.multiselect("Applications", list(labels), format_func=labels.get)
+                bulk_status = st.selectbox("New status", APPLICATION_STATUSES)
+                if st.form_submit_button("Update selected") and selected:
+                    NotificationManager.update_application_statuses(
+                        [(application_id, bulk_status) for application_id in selected]
+                    )
+                    st.success(f"Updated {len(selected)} application{'s' if len(selected) > 1 else ''} to {bulk_status}")
+                    st.rerun()
+            
             for app in applications:
                 company = app['company_name'] or app['poster_name']
                 with st.expander(f"{app['applicant_name']} → {app['job_title']} at {company}"):
@@ -1823,12 +1834,7 @@ def show_admin_applications():
                     with col1:
                         if st.button("Update Status", key=f"status_{app['application_id']}"):
                             new_status = 'Accepted' if app['status'] == 'Pending' else 'Pending'
-                            cursor.execute("""
-                                UPDATE applications 
-                                SET status = ?, updated_at = ? 
-                                WHERE application_id = ?
-                            """, (new_status, datetime.now().isoformat(), app['application_id']))
-                            conn.commit()
+                            NotificationManager.update_application_statuses([(app['application_id'], new_status)])
                             st.rerun()
                     with col2:
                         if st.button("Delete", key=f"delete_{app['application_id']}"):
@@ -1839,6 +1845,8 @@ def show_admin_applications():
                             conn.commit()
                             st.success("Application deleted successfully")
                             st.rerun()
+            
+            page_controls('admin_applications', next_cursor)
         else:
             st.info("No applications found")
             
@@ -1,7 +1,152 @@
 import streamlit as st
-from utils.database import get_db
-from datetime import datetime
-import time
+from utils.database import get_db, table_columns
+from utils.message_manager import MessageManager
+from utils.message_hub import MessageHub
+from config import MESSAGES_PER_PAGE, CHAT_REFRESH_SECONDS
+
+def render_message(msg, user_id):
+    """HTML for one chat bubble, or an empty string for an empty message"""
+    # Get the message content using the consistent field name and strip any HTML div tags
+    message_content = (msg.get('message_text') or '').replace('<div>', '').replace('</div>', '')
+    if not message_content:
+        return ""
+    
+    message_time = msg['created_at'][:16].replace('T', ' ')
+    
+    if msg['sender_id'] == user_id:
+        return (
+            '<div style="text-align: right; margin: 10px 0;">'
+            f'<small style="color: #666;">{message_time}</small><br>'
+            '<div style="background-color: #0084ff; color: white; padding: 10px; border-radius: 15px; display: inline-block; max-width: 80%; text-align: left;">'
+            f'{message_content}</div></div>'
+        )
+    
+    sender_name = msg['company_name'] or msg['sender_name']
+    return (
+        '<div style="text-align: left; margin: 10px 0;">'
+        f'<small style="color: #666;">{sender_name} - {message_time}</small><br>'
+        '<div style="background-color: #f0f0f0; padding: 10px; border-radius: 15px; display: inline-block; max-width: 80%;">'
+        f'{message_content}</div></div>'
+    )
+
+def load_thread(user_id, partner_id):
+    """
+    Open thread with rendered bubbles, cached in session state.
+
+    The first load fetches the latest MESSAGES_PER_PAGE messages; afterwards
+    the database is only queried when the user's MessageHub channel has
+    fired, and then only for messages newer than the last one cached.
+    """
+    # Read the channel before querying so a publish during the load is not missed
+    version = MessageHub.version(user_id)
+    thread = st.session_state.get('message_thread')
+    
+    if not thread or thread['user_id'] != user_id or thread['partner_id'] != partner_id:
+        messages = MessageManager.get_thread(user_id, partner_id)
+        thread = {
+            'user_id': user_id,
+            'partner_id': partner_id,
+            'bubbles': [],
+            'oldest_id': None,
+            'newest_id': None,
+            'has_older': len(messages) >= MESSAGES_PER_PAGE,
+            'has_unread': False
+        }
+        st.session_state['message_thread'] = thread
+    elif thread.get('version') == version:
+        return thread
+    elif thread['newest_id'] is not None:
+        messages = MessageManager.get_thread(user_id, partner_id, after_id=thread['newest_id'])
+    else:
+        messages = MessageManager.get_thread(user_id, partner_id)
+    
+    thread['version'] = version
+    if messages:
+        thread['bubbles'].extend(render_message(msg, user_id) for msg in messages)
+        thread['newest_id'] = messages[-1]['message_id']
+        if thread['oldest_id'] is None:
+            thread['oldest_id'] = messages[0]['message_id']
+        thread['has_unread'] = thread['has_unread'] or any(
+            msg['receiver_id'] == user_id and not msg['is_read'] for msg in messages
+        )
+    return thread
+
+def load_older_messages(thread):
+    """Button callback: prepend the page of messages before the oldest one loaded"""
+    messages = MessageManager.get_thread(
+        thread['user_id'], thread['partner_id'], before_id=thread['oldest_id']
+    )
+    if messages:
+        thread['bubbles'][:0] = [render_message(msg, thread['user_id']) for msg in messages]
+        thread['oldest_id'] = messages[0]['message_id']
+    thread['has_older'] = len(messages) >= MESSAGES_PER_PAGE
+
+def send_chat_message(user_id, partner_id):
+    """Form callback: store the typed message; the hub then refreshes the thread"""
+    new_message = st.session_state.get('message_input', '')
+    if not new_message.strip():
+        return
+    
+    # Remove any HTML div tags that might be in the message
+    clean_message = new_message.strip().replace('<div>', '').replace('</div>', '')
+    try:
+        MessageManager.send_message(user_id, partner_id, clean_message)
+        st.toast("Message sent!")
+    except Exception:
+        st.error("Unable to send message. Please try again.")
+
+@st.fragment(run_every=CHAT_REFRESH_SECONDS)
+def show_chat(user_id, partner_id):
+    """
+    Thread and reply form of the open conversation.
+
+    Runs as a fragment on a timer: a tick whose message channel has not
+    fired redraws from the session cache without touching the database, and
+    sending only reruns this fragment rather than the whole page.
+    """
+    thread = load_thread(user_id, partner_id)
+    
+    # Mark messages as read (also clears the conversation's unread count)
+    if thread['has_unread']:
+        try:
+            MessageManager.mark_conversation_read(user_id, partner_id)
+            thread['has_unread'] = False
+        except Exception:
+            pass  # Silent error handling for marking messages as read
+    
+    # Messages container with scrollable height
+    message_container = st.container(height=400)
+    
+    # Show messages
+    with message_container:
+        if thread['has_older']:
+            st.button("Load older messages", key="load_older_messages",
+                      on_click=load_older_messages, args=(thread,))
+        
+        if not thread['bubbles']:
+            st.info("No messages yet. Send a message to start the conversation.")
+        else:
+            st.markdown("".join(thread['bubbles']), unsafe_allow_html=True)
+    
+    # Message input
+    st.write("### Send a message")
+    
+    # Check if we have a message template
+    default_message = ""
+    if 'message_template' in st.session_state:
+        default_message = st.session_state['message_template']
+        # Clear it after use
+        st.session_state['message_template'] = ""
+    
+    # Use a form for message submission to avoid session state issues
+    with st.form(key="message_form", clear_on_submit=True):
+        st.text_area("Type your message", value=default_message, height=100, key="message_input")
+        st.form_submit_button(
+            "Send Message",
+            use_container_width=True,
+            on_click=send_chat_message,
+            args=(user_id, partner_id)
+        )
 
 def show_messages():
     """Show messaging interface"""
@@ -16,9 +161,7 @@ def show_messages():
     
     # First, check the schema of the messages table
     try:
-        cursor.execute("PRAGMA table_info(messages)")
-        columns = {col['name'] for col in cursor.fetchall()}
-        message_column = 'message' if 'message' in columns else 'content'
+        columns = table_columns('messages')
         
         if not ('message' in columns or 'content' in columns):
             st.error("Message table schema is incompatible. Please contact support.")
@@ -28,44 +171,8 @@ def show_messages():
         return
     
     try:
-        # Get all conversations - use the correct column name
-        query = f"""
-            SELECT DISTINCT 
-                CASE 
-                    WHEN m.sender_id = ? THEN m.receiver_id 
-                    ELSE m.sender_id 
-                END as other_user_id,
-                u.name as other_user_name,
-                u.company_name,
-                (SELECT COUNT(*) FROM messages 
-                 WHERE receiver_id = ? 
-                 AND sender_id = other_user_id 
-                 AND is_read = 0) as unread_count,
-                (SELECT {message_column} FROM messages 
-                 WHERE (sender_id = ? AND receiver_id = other_user_id)
-                 OR (sender_id = other_user_id AND receiver_id = ?)
-                 ORDER BY created_at DESC LIMIT 1) as last_message
-            FROM messages m
-            JOIN users u ON u.user_id = 
-                CASE 
-                    WHEN m.sender_id = ? THEN m.receiver_id 
-                    ELSE m.sender_id 
-                END
-            WHERE m.sender_id = ? OR m.receiver_id = ?
-            ORDER BY (SELECT created_at FROM messages 
-                     WHERE (sender_id = ? AND receiver_id = other_user_id)
-                     OR (sender_id = other_user_id AND receiver_id = ?)
-                     ORDER BY created_at DESC LIMIT 1) DESC
-        """
-        
-        cursor.execute(query, (
-            user['user_id'], user['user_id'], 
-            user['user_id'], user['user_id'],
-            user['user_id'], user['user_id'], user['user_id'],
-            user['user_id'], user['user_id']
-        ))
-        
-        conversations = cursor.fetchall()
+        # Inbox from the conversations summary table, most recent first
+        conversations = MessageManager.get_conversations(user['user_id'])
         
         # Check if we have any application context data to display
         related_applications = []
@@ -158,132 +265,7 @@ def show_messages():
                 else:
                     st.header(f"Chat with {partner_name}")
                 
-                # Get messages using the detected column
-                query = f"""
-                    SELECT m.*, u.name as sender_name, u.company_name,
-                           m.{message_column} as message_text
-                    FROM messages m
-                    JOIN users u ON m.sender_id = u.user_id
-                    WHERE (m.sender_id = ? AND m.receiver_id = ?)
-                    OR (m.sender_id = ? AND m.receiver_id = ?)
-                    ORDER BY m.created_at ASC
-                """
-                
-                cursor.execute(query, (user['user_id'], current_partner, current_partner, user['user_id']))
-                messages = cursor.fetchall()
-                
-                # Mark messages as read
-                try:
-                    cursor.execute("""
-                        UPDATE messages 
-                        SET is_read = 1 
-                        WHERE sender_id = ? AND receiver_id = ? AND is_read = 0
-                    """, (current_partner, user['user_id']))
-                    conn.commit()
-                except Exception:
-                    pass  # Silent error handling for marking messages as read
-                
-                # Messages container with scrollable height
-                message_container = st.container(height=400)
-                
-                # Show messages
-                with message_container:
-                    if not messages:
-                        st.info("No messages yet. Send a message to start the conversation.")
-                    else:
-                        for msg in messages:
-                            is_own_message = msg['sender_id'] == user['user_id']
-                            sender_name = "You" if is_own_message else (msg['company_name'] or msg['sender_name'])
-                            
-                            # Get the message content using the consistent field name and strip any HTML
-                            message_content = msg.get('message_text', '')
-                            # Remove any HTML div tags that might have been included
-                            message_content = message_content.replace('<div>', '').replace('</div>', '')
-                            
-                            if not message_content:
-                                continue  # Skip empty messages
-                            
-                            message_time = msg['created_at'][:16].replace('T', ' ')
-                            
-                            # Simplified message display without excessive HTML
-                            if is_own_message:
-                                st.container().markdown(f"""
-                                    <div style="text-align: right; margin: 10px 0;">
-                                        <small style="color: #666;">{message_time}</small><br>
-                                        <div style="background-color: #0084ff; color: white; padding: 10px; border-radius: 15px; display: inline-block; max-width: 80%; text-align: left;">
-                                            {message_content}
-                                        </div>
-                                    </div>
-                                """, unsafe_allow_html=True)
-                            else:
-                                st.container().markdown(f"""
-                                    <div style="text-align: left; margin: 10px 0;">
-                                        <small style="color: #666;">{sender_name} - {message_time}</small><br>
-                                        <div style="background-color: #f0f0f0; padding: 10px; border-radius: 15px; display: inline-block; max-width: 80%;">
-                                            {message_content}
-                                        </div>
-                                    </div>
-                                """, unsafe_allow_html=True)
-                
-                # Message input
-                st.write("### Send a message")
-                
-                # Check if we have a message template
-                default_message = ""
-                if 'message_template' in st.session_state:
-                    default_message = st.session_state['message_template']
-                    # Clear it after use
-                    st.session_state['message_template'] = ""
-                
-                # Use a form for message submission to avoid session state issues
-                with st.form(key="message_form", clear_on_submit=True):
-                    new_message = st.text_area("Type your message", value=default_message, height=100, key="message_input")
-                    send_button = st.form_submit_button("Send Message", use_container_width=True)
-                
-                    if send_button and new_message.strip():
-                        # Remove any HTML div tags that might be in the message
-                        clean_message = new_message.strip().replace('<div>', '').replace('</div>', '')
-                        
-                        # Check if the table has an 'other_user_id' column
-                        has_other_user_id = 'other_user_id' in columns
-                        
-                        try:
-                            if has_other_user_id:
-                                # Schema with other_user_id column
-                                query = f"""
-                                    INSERT INTO messages (
-                                        sender_id, receiver_id, {message_column}, 
-                                        other_user_id, created_at, is_read
-                                    ) VALUES (?, ?, ?, ?, ?, 0)
-                                """
-                                cursor.execute(query, (
-                                    user['user_id'], 
-                                    current_partner, 
-                                    clean_message,
-                                    current_partner,  # other_user_id is set to the conversation partner
-                                    datetime.now().isoformat()
-                                ))
-                            else:
-                                # Standard schema without other_user_id
-                                query = f"""
-                                    INSERT INTO messages (
-                                        sender_id, receiver_id, {message_column}, 
-                                        created_at, is_read
-                                    ) VALUES (?, ?, ?, ?, 0)
-                                """
-                                cursor.execute(query, (
-                                    user['user_id'], 
-                                    current_partner, 
-                                    clean_message, 
-                                    datetime.now().isoformat()
-                                ))
-                            
-                            conn.commit()
-                            st.success("Message sent!")
-                            time.sleep(0.5)  # Small delay to show success
-                            st.rerun()
-                        except Exception:
-                            st.error("Unable to send message. Please try again.")
+                show_chat(user['user_id'], current_partner)
             else:
                 st.info("Select a conversation from the left to start chatting.")
                 
@@ -1,5 +1,6 @@
 import streamlit as st
 from utils.database import get_db
+from utils.location_services import geocode_address
 from datetime import datetime, timedelta
 
 def check_job_posting_limits(user_id):
@@ -150,6 +151,11 @@ def show_post_jobs():
                 st.error("Please fill in all required fields")
                 return
             
+            # Resolve coordinates once, before taking a connection; jobs that
+            # cannot be geocoded now are picked up by migrate_job_locations()
+            coordinates = geocode_address(location)
+            job_latitude, job_longitude = coordinates if coordinates else (None, None)
+            
             conn = get_db()
             cursor = conn.cursor()
             
@@ -168,22 +174,22 @@ def show_post_jobs():
                         job_poster_id, title, description, location,
                         job_type, trade_category, payment_type, payment_amount,
                         urgency, start_date, requirements, tools_needed,
-                        status, created_at, updated_at, workers_needed
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                        status, created_at, updated_at, workers_needed,
+                        job_latitude, job_longitude
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """, (
                     user['user_id'], title, description, location,
                     job_type, trade_category, payment_type, payment_amount,
                     urgency, start_date.isoformat(), requirements, tools_needed,
-                    'Open', now, now, workers_needed
+                    'Open', now, now, workers_needed,
+                    job_latitude, job_longitude
                 ))
                 
                 conn.commit()
                 st.success("Job posted successfully!")
                 
                 # Store the job_id in session state
-                cursor.execute("SELECT last_insert_rowid()")
-                job_id = cursor.fetchone()[0]
-                st.session_state['last_posted_job_id'] = job_id
+                st.session_state['last_posted_job_id'] = cursor.lastrowid
                 
                 # Redirect to dashboard
                 st.session_state['page'] = 'poster_dashboard'
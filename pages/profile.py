@@ -2,7 +2,8 @@ import streamlit as st
 from utils.database import get_db, update_user_profile
 from datetime import datetime
 from utils.location_utils import update_user_location
-import requests
+from utils.geocoding import geocode, GeocodingError
+from utils.recommendations import invalidate_recommendations
 import folium
 from streamlit_folium import folium_static
 
@@ -50,6 +51,7 @@ def update_profile(user_id, data):
             """, (data.get('latitude'), data.get('longitude'), user_id))
         
         conn.commit()
+        invalidate_recommendations(user_id)
         return True
         
     except Exception as e:
@@ -117,6 +119,7 @@ def show_profile():
                     # Execute the update
                     cursor.execute(sql, list(update_data.values()) + [user['user_id']])
                     conn.commit()
+                    invalidate_recommendations(user['user_id'])
                     
                     # Update session state
                     cursor.execute("SELECT * FROM users WHERE user_id = ?", 
@@ -156,6 +159,7 @@ def show_profile():
                     """, (skills, certifications, datetime.now().isoformat(), 
                          user['user_id']))
                     conn.commit()
+                    invalidate_recommendations(user['user_id'])
                     
                     # Update session state
                     cursor.execute("SELECT * FROM users WHERE user_id = ?", 
@@ -317,63 +321,61 @@ def show_profile():
                     try:
                         # Show searching indicator
                         with st.spinner("Searching for location..."):
-                            # Try to geocode the address
+                            # Try to geocode the address (served from the geocode cache when possible)
                             location_query = f"{new_location} {new_postal}"
-                            response = requests.get(
-                                f"https://nominatim.openstreetmap.org/search?q={location_query}&format=json&limit=1",
-                                headers={"User-Agent": "Workify/1.0"}
-                            )
+                            try:
+                                result = geocode(location_query)
+                                error = "Location not found. Try a different address or add more details like city, state or country."
+                            except GeocodingError:
+                                result = None
+                                error = "Error contacting location service. Please try again later."
                             
-                            if response.status_code == 200:
-                                results = response.json()
-                                if results:
-                                    new_lat = float(results[0]['lat'])
-                                    new_lng = float(results[0]['lon'])
+                            if result:
+                                new_lat = result['lat']
+                                new_lng = result['lon']
+                                
+                                # Extract detailed address information
+                                address = result['display_name'].split(',')
+                                if len(address) >= 2:
+                                    # Use the first two parts of the address for a cleaner display
+                                    new_location = f"{address[0].strip()}, {address[1].strip()}"
+                                
+                                # Try to get the postal code from the result
+                                if not new_postal:
+                                    new_postal = result['address'].get('postcode', '')
+                                
+                                # Show the found location on map
+                                st.success(f"Location found: {new_location}")
+                                if new_postal:
+                                    st.write(f"Postal/ZIP Code: {new_postal}")
+                                
+                                m = folium.Map(location=[new_lat, new_lng], zoom_start=13)
+                                folium.Marker(
+                                    location=[new_lat, new_lng],
+                                    popup=new_location,
+                                    icon=folium.Icon(color="green", icon="info-sign"),
+                                ).add_to(m)
+                                folium_static(m, width=700, height=300)
+                                
+                                # Save button - now part of the form submit
+                                if st.form_submit_button("Save This Location"):
+                                    update_data = {
+                                        'location': new_location,
+                                        'postal_code': new_postal,
+                                        'latitude': new_lat,
+                                        'longitude': new_lng
+                                    }
                                     
-                                    # Extract detailed address information
-                                    address = results[0].get('display_name', '').split(',')
-                                    if len(address) >= 2:
-                                        # Use the first two parts of the address for a cleaner display
-                                        new_location = f"{address[0].strip()}, {address[1].strip()}"
-                                    
-                                    # Try to get the postal code from the result
-                                    if not new_postal and 'address' in results[0]:
-                                        new_postal = results[0]['address'].get('postcode', '')
-                                    
-                                    # Show the found location on map
-                                    st.success(f"Location found: {new_location}")
-                                    if new_postal:
-                                        st.write(f"Postal/ZIP Code: {new_postal}")
-                                    
-                                    m = folium.Map(location=[new_lat, new_lng], zoom_start=13)
-                                    folium.Marker(
-                                        location=[new_lat, new_lng],
-                                        popup=new_location,
-                                        icon=folium.Icon(color="green", icon="info-sign"),
-                                    ).add_to(m)
-                                    folium_static(m, width=700, height=300)
-                                    
-                                    # Save button - now part of the form submit
-                                    if st.form_submit_button("Save This Location"):
-                                        update_data = {
-                                            'location': new_location,
-                                            'postal_code': new_postal,
-                                            'latitude': new_lat,
-                                            'longitude': new_lng
-                                        }
-                                        
-                                        if update_profile(user['user_id'], {**user, **update_data}):
-                                            st.success("Location updated successfully!")
-                                            # Update session state
-                                            st.session_state['user']['location'] = new_location
-                                            st.session_state['user']['postal_code'] = new_postal
-                                            st.session_state['user']['latitude'] = new_lat
-                                            st.session_state['user']['longitude'] = new_lng
-                                            st.rerun()
-                                else:
-                                    st.error("Location not found. Try a different address or add more details like city, state or country.")
+                                    if update_profile(user['user_id'], {**user, **update_data}):
+                                        st.success("Location updated successfully!")
+                                        # Update session state
+                                        st.session_state['user']['location'] = new_location
+                                        st.session_state['user']['postal_code'] = new_postal
+                                        st.session_state['user']['latitude'] = new_lat
+                                        st.session_state['user']['longitude'] = new_lng
+                                        st.rerun()
                             else:
-                                st.error("Error contacting location service. Please try again later.")
+                                st.error(error)
                     except Exception as e:
                         st.error(f"Error finding location: {str(e)}")
                         
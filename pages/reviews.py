@@ -1,5 +1,5 @@
 import streamlit as st
-from utils.database import get_db
+from utils.database import get_db, table_columns, has_column, clear_column_cache
 from datetime import datetime
 
 def show_admin_reviews():
@@ -132,8 +132,7 @@ def show_reviews():
     
     # First, check if the reviews table exists and has the right structure
     try:
-        cursor.execute("PRAGMA table_info(reviews)")
-        columns = {col['name'] for col in cursor.fetchall()}
+        columns = table_columns('reviews')
         
         required_columns = {'review_id', 'reviewer_id', 'reviewed_id', 'rating', 'comment'}
         missing_columns = required_columns - columns
@@ -157,6 +156,7 @@ def show_reviews():
                         )
                     """)
                     conn.commit()
+                    clear_column_cache()
                     st.success("Reviews table created successfully! Please refresh the page.")
                     return
                 except Exception as e:
@@ -222,8 +222,7 @@ def show_reviews():
                     """)
         
         # Check application table structure for the query
-        cursor.execute("PRAGMA table_info(applications)")
-        app_columns = {col['name'] for col in cursor.fetchall()}
+        app_columns = table_columns('applications')
         
         # Determine field names based on schema
         job_poster_field = 'job_poster_id' if 'job_poster_id' in app_columns else 'poster_id'
@@ -286,10 +285,7 @@ def show_reviews():
                             
                             # Update user's average rating if avg_rating column exists
                             try:
-                                cursor.execute("PRAGMA table_info(users)")
-                                user_columns = {col['name'] for col in cursor.fetchall()}
-                                
-                                if 'avg_rating' in user_columns:
+                                if has_column('users', 'avg_rating'):
                                     cursor.execute("""
                                         UPDATE users 
                                         SET avg_rating = (
@@ -164,4 +164,21 @@ CREATE TABLE IF NOT EXISTS reviews (
     FOREIGN KEY (reviewer_id) REFERENCES users(user_id),
     FOREIGN KEY (reviewed_id) REFERENCES users(user_id),
     FOREIGN KEY (job_id) REFERENCES jobs(job_id)
-); 
\ No newline at end of file
+); 
+
+-- Secondary indexes for hot query paths (kept in sync with HOT_INDEXES in utils/database.py)
+CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs (status, created_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_poster_created ON jobs (job_poster_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_applications_applicant_created ON applications (applicant_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_applications_job_applicant ON applications (job_id, applicant_id);
+CREATE INDEX IF NOT EXISTS idx_applications_poster_created ON applications (job_poster_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_messages_pair_created ON messages (sender_id, receiver_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_messages_receiver_unread ON messages (receiver_id, is_read, sender_id);
+CREATE INDEX IF NOT EXISTS idx_notifications_user_unread ON notifications (user_id, is_read, created_at);
+CREATE INDEX IF NOT EXISTS idx_reviews_reviewed_created ON reviews (reviewed_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_reviews_reviewer_reviewed ON reviews (reviewer_id, reviewed_id);
+CREATE INDEX IF NOT EXISTS idx_job_alerts_user_active ON job_alerts (user_id, is_active);
+CREATE INDEX IF NOT EXISTS idx_work_history_user ON work_history (user_id);
+CREATE INDEX IF NOT EXISTS idx_certifications_user ON certifications (user_id);
+CREATE INDEX IF NOT EXISTS idx_background_checks_user_created ON background_checks (user_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_user_analytics_user_metric ON user_analytics (user_id, metric_name, created_at);
@@ -0,0 +1,77 @@
+import os
+import shutil
+import sys
+import tempfile
+from datetime import datetime
+
+import pytest
+
+# utils.database resolves WORKIFY_DB_PATH at import, so point it at a
+# scratch database before any app module is imported
+_db_dir = tempfile.mkdtemp(prefix='workify-tests-')
+os.environ['WORKIFY_DB_PATH'] = os.path.join(_db_dir, 'workify.db')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.database import _pool, db_connection, get_db, init_db
+
+# Migrated before test modules are collected, so capability checks such as
+# has_fts() in skip markers see the final schema
+init_db()
+
+# Values for the NOT NULL columns of each table, so tests only spell out
+# the columns they care about
+DEFAULTS = {
+    'users': lambda: {'email': f"{datetime.now().timestamp()}@example.com", 'name': 'Test User',
+                      'role': 'Job Seeker'},
+    'jobs': lambda: {'title': 'Test job', 'description': 'Test description', 'location': 'Boston, MA',
+                     'job_type': 'Full-time', 'trade_category': 'General', 'payment_type': 'Hourly'},
+    'applications': lambda: {},
+    'messages': lambda: {'message': 'Hello'},
+    'notifications': lambda: {'message': 'Something happened'},
+    'certifications': lambda: {'issuing_authority': 'Test board', 'issue_date': '2024-01-01'},
+    'work_history': lambda: {'company_name': 'Test Co', 'position': 'Apprentice', 'start_date': '2020-01-01'},
+    'job_alerts': lambda: {},
+}
+
+# Base tables cleared after every test; deleting them through the triggers
+# also empties the derived tables (conversations, rollups, R*Trees, ...)
+DATA_TABLES = [
+    'applications', 'messages', 'notifications', 'certifications', 'work_history',
+    'job_alerts', 'jobs', 'users', 'email_outbox', 'unread_counters',
+    'postal_centroids', 'geocode_cache',
+]
+
+@pytest.fixture(scope='session', autouse=True)
+def database():
+    """Remove the scratch database after the run"""
+    yield os.environ['WORKIFY_DB_PATH']
+    _pool.close_all()
+    shutil.rmtree(_db_dir, ignore_errors=True)
+
+@pytest.fixture(autouse=True)
+def clean_tables():
+    yield
+    with db_connection() as conn:
+        for table in DATA_TABLES:
+            conn.execute(f"DELETE FROM {table}")
+
+@pytest.fixture
+def conn():
+    """A pooled connection; anything left uncommitted is rolled back"""
+    conn = get_db()
+    yield conn
+    conn.close()
+
+@pytest.fixture
+def insert(conn):
+    """insert(table, **values) -> rowid, filling in required columns"""
+    def insert(table, **values):
+        now = datetime.now().isoformat()
+        row = {**DEFAULTS[table](), 'created_at': now, **values}
+        if table in ('users', 'jobs', 'applications'):
+            row.setdefault('updated_at', now)
+        columns = ', '.join(row)
+        placeholders = ', '.join('?' for _ in row)
+        cursor = conn.execute(f"INSERT INTO {table} ({columns}) VALUES ({placeholders})", list(row.values()))
+        return cursor.lastrowid
+    return insert
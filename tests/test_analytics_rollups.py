@@ -0,0 +1,79 @@
+from utils.database import ANALYTICS_ROLLUPS, rebuild_analytics_rollups
+
+def rollup(conn, table):
+    return conn.execute(f"SELECT * FROM {table}").fetchall()
+
+def snapshot(conn):
+    return {
+        table: sorted(tuple(row.values()) for row in rollup(conn, table))
+        for table, *_ in ANALYTICS_ROLLUPS
+    }
+
+def assert_matches_rebuild(conn):
+    maintained = snapshot(conn)
+    rebuild_analytics_rollups(conn)
+    assert snapshot(conn) == maintained
+
+def apply(insert, applicant_id='seeker', day='2024-03-01', **values):
+    return insert(
+        'applications', job_id=1, job_poster_id='poster', applicant_id=applicant_id,
+        created_at=f'{day}T09:00:00', **values
+    )
+
+def test_applications_roll_up_per_seeker_and_poster_day(conn, insert):
+    apply(insert)
+    apply(insert, applicant_id='other')
+    apply(insert, day='2024-03-02', status='Accepted')
+
+    assert sorted(rollup(conn, 'daily_seeker_stats'), key=lambda row: (row['user_id'], row['day'])) == [
+        {'user_id': 'other', 'day': '2024-03-01', 'applications': 1, 'accepted': 0},
+        {'user_id': 'seeker', 'day': '2024-03-01', 'applications': 1, 'accepted': 0},
+        {'user_id': 'seeker', 'day': '2024-03-02', 'applications': 1, 'accepted': 1},
+    ]
+    assert sorted(rollup(conn, 'daily_poster_stats'), key=lambda row: row['day']) == [
+        {'user_id': 'poster', 'day': '2024-03-01', 'applications': 2, 'responses': 0, 'response_time_total': 0},
+        {'user_id': 'poster', 'day': '2024-03-02', 'applications': 1, 'responses': 0, 'response_time_total': 0},
+    ]
+    assert_matches_rebuild(conn)
+
+def test_status_and_response_updates_move_counters(conn, insert):
+    application_id = apply(insert)
+
+    conn.execute("""
+        UPDATE applications SET status = 'Accepted', response_time = 45 WHERE application_id = ?
+    """, (application_id,))
+
+    assert rollup(conn, 'daily_seeker_stats') == [
+        {'user_id': 'seeker', 'day': '2024-03-01', 'applications': 1, 'accepted': 1}
+    ]
+    assert rollup(conn, 'daily_poster_stats') == [
+        {'user_id': 'poster', 'day': '2024-03-01', 'applications': 1, 'responses': 1, 'response_time_total': 45}
+    ]
+    assert_matches_rebuild(conn)
+
+def test_deleting_last_source_row_drops_rollup_row(conn, insert):
+    application_id = apply(insert)
+    apply(insert, day='2024-03-02')
+
+    conn.execute("DELETE FROM applications WHERE application_id = ?", (application_id,))
+
+    assert [row['day'] for row in rollup(conn, 'daily_seeker_stats')] == ['2024-03-02']
+    assert [row['day'] for row in rollup(conn, 'daily_poster_stats')] == ['2024-03-02']
+    assert_matches_rebuild(conn)
+
+def test_jobs_roll_up_per_category_day(conn, insert):
+    job_id = insert('jobs', job_poster_id='poster', trade_category='Plumbing', created_at='2024-03-01T08:00:00')
+    insert('jobs', job_poster_id='poster', trade_category='Plumbing', created_at='2024-03-01T12:00:00')
+
+    conn.execute("UPDATE jobs SET status = 'Closed' WHERE job_id = ?", (job_id,))
+    assert rollup(conn, 'daily_category_stats') == [
+        {'trade_category': 'Plumbing', 'day': '2024-03-01', 'jobs_posted': 2, 'open_jobs': 1}
+    ]
+
+    # Re-categorizing moves the job to the other rollup row
+    conn.execute("UPDATE jobs SET trade_category = 'Electrical' WHERE job_id = ?", (job_id,))
+    assert sorted(rollup(conn, 'daily_category_stats'), key=lambda row: row['trade_category']) == [
+        {'trade_category': 'Electrical', 'day': '2024-03-01', 'jobs_posted': 1, 'open_jobs': 0},
+        {'trade_category': 'Plumbing', 'day': '2024-03-01', 'jobs_posted': 1, 'open_jobs': 1},
+    ]
+    assert_matches_rebuild(conn)
@@ -0,0 +1,39 @@
+from utils.recommendations import still_open
+
+def application_count(conn, job_id):
+    row = conn.execute("SELECT application_count FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+    return row['application_count']
+
+def apply(insert, job_id, applicant_id='seeker'):
+    return insert('applications', job_id=job_id, job_poster_id='poster', applicant_id=applicant_id)
+
+def test_application_count_follows_inserts_moves_and_deletes(conn, insert):
+    job_id = insert('jobs', job_poster_id='poster')
+    other_job_id = insert('jobs', job_poster_id='poster')
+    application_id = apply(insert, job_id)
+    apply(insert, job_id, applicant_id='other')
+    assert application_count(conn, job_id) == 2
+
+    conn.execute("UPDATE applications SET job_id = ? WHERE application_id = ?", (other_job_id, application_id))
+    assert application_count(conn, job_id) == 1
+    assert application_count(conn, other_job_id) == 1
+
+    conn.execute("DELETE FROM applications WHERE application_id = ?", (application_id,))
+    assert application_count(conn, other_job_id) == 0
+
+    # Status changes leave the count alone
+    conn.execute("UPDATE applications SET status = 'Accepted' WHERE job_id = ?", (job_id,))
+    assert application_count(conn, job_id) == 1
+
+def test_still_open_drops_closed_and_filled_jobs(conn, insert):
+    open_job = insert('jobs', job_poster_id='poster', workers_needed=2)
+    filled_job = insert('jobs', job_poster_id='poster', workers_needed=None)
+    closed_job = insert('jobs', job_poster_id='poster', status='Closed')
+    apply(insert, open_job)
+    apply(insert, filled_job)
+
+    assert still_open(conn, [])
+    assert still_open(conn, [{'job_id': open_job}])
+    # workers_needed defaults to one worker when unset
+    assert not still_open(conn, [{'job_id': open_job}, {'job_id': filled_job}])
+    assert not still_open(conn, [{'job_id': closed_job}])
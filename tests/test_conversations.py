@@ -0,0 +1,64 @@
+from utils.database import rebuild_conversations
+
+def conversations(conn):
+    return conn.execute("""
+        SELECT user_id, other_user_id, last_message_id, last_at, unread_count
+        FROM conversations ORDER BY user_id, other_user_id
+    """).fetchall()
+
+def assert_matches_rebuild(conn):
+    maintained = conversations(conn)
+    rebuild_conversations(conn)
+    assert conversations(conn) == maintained
+
+def test_message_creates_summary_for_both_participants(conn, insert):
+    message_id = insert('messages', sender_id='alice', receiver_id='bob')
+
+    rows = {(row['user_id'], row['other_user_id']): row for row in conversations(conn)}
+    assert set(rows) == {('alice', 'bob'), ('bob', 'alice')}
+    assert rows['alice', 'bob']['last_message_id'] == message_id
+    assert rows['alice', 'bob']['unread_count'] == 0
+    assert rows['bob', 'alice']['unread_count'] == 1
+    assert_matches_rebuild(conn)
+
+def test_reading_messages_updates_unread_count(conn, insert):
+    first = insert('messages', sender_id='alice', receiver_id='bob')
+    insert('messages', sender_id='alice', receiver_id='bob')
+    insert('messages', sender_id='bob', receiver_id='alice', is_read=1)
+
+    conn.execute("UPDATE messages SET is_read = 1 WHERE message_id = ?", (first,))
+    row = conn.execute(
+        "SELECT unread_count FROM conversations WHERE user_id = 'bob' AND other_user_id = 'alice'"
+    ).fetchone()
+    assert row['unread_count'] == 1
+
+    # Marking an already read message read again changes nothing
+    conn.execute("UPDATE messages SET is_read = 1 WHERE message_id = ?", (first,))
+    conn.execute("UPDATE messages SET is_read = 0 WHERE message_id = ?", (first,))
+    row = conn.execute(
+        "SELECT unread_count FROM conversations WHERE user_id = 'bob' AND other_user_id = 'alice'"
+    ).fetchone()
+    assert row['unread_count'] == 2
+    assert_matches_rebuild(conn)
+
+def test_deleting_latest_message_falls_back_to_previous(conn, insert):
+    first = insert('messages', sender_id='alice', receiver_id='bob', created_at='2024-01-01T10:00:00')
+    latest = insert('messages', sender_id='bob', receiver_id='alice', created_at='2024-01-01T11:00:00')
+
+    conn.execute("DELETE FROM messages WHERE message_id = ?", (latest,))
+
+    rows = conversations(conn)
+    assert {row['last_message_id'] for row in rows} == {first}
+    assert {row['last_at'] for row in rows} == {'2024-01-01T10:00:00'}
+    assert_matches_rebuild(conn)
+
+def test_deleting_last_message_removes_conversation(conn, insert):
+    message_id = insert('messages', sender_id='alice', receiver_id='bob')
+    insert('messages', sender_id='carol', receiver_id='bob')
+
+    conn.execute("DELETE FROM messages WHERE message_id = ?", (message_id,))
+
+    assert [(row['user_id'], row['other_user_id']) for row in conversations(conn)] == [
+        ('bob', 'carol'), ('carol', 'bob')
+    ]
+    assert_matches_rebuild(conn)
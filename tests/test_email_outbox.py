@@ -0,0 +1,130 @@
+import time
+
+import pytest
+
+from config import EMAIL_CLAIM_LEASE_SECONDS, EMAIL_MAX_ATTEMPTS
+from utils import email_outbox
+from utils.database import db_connection
+from utils.email_outbox import claim_batch, enqueue_email, mark_failed, mark_sent, requeue_stale
+
+@pytest.fixture(autouse=True)
+def idle_worker(monkeypatch):
+    """Keep the real worker thread from draining the outbox under the tests"""
+    monkeypatch.setattr(email_outbox._worker, 'start', lambda: None)
+    monkeypatch.setattr(email_outbox._worker, 'wake', lambda: None)
+
+def outbox():
+    with db_connection() as conn:
+        rows = conn.execute("SELECT * FROM email_outbox ORDER BY email_id").fetchall()
+    return {row['email_id']: row for row in rows}
+
+def set_rows(sql, params=()):
+    with db_connection() as conn:
+        conn.execute(sql, params)
+
+def test_claim_marks_due_rows_sending_once():
+    first = enqueue_email('a@example.com', 'One', '<p>1</p>')
+    second = enqueue_email('b@example.com', 'Two', '<p>2</p>')
+
+    groups = claim_batch()
+
+    assert sorted(rows[0]['email_id'] for rows in groups.values()) == [first, second]
+    rows = outbox()
+    assert {row['status'] for row in rows.values()} == {'sending'}
+    assert all(row['claimed_at'] for row in rows.values())
+    # A second worker finds nothing left to claim
+    assert claim_batch() == {}
+
+def test_claim_respects_limit_and_due_time():
+    due = [enqueue_email('a@example.com', f'Email {i}', '<p></p>') for i in range(3)]
+    enqueue_email('a@example.com', 'Digest', '<p></p>', digest_key='alerts')
+
+    groups = claim_batch(limit=2)
+
+    assert sorted(rows[0]['email_id'] for rows in groups.values()) == due[:2]
+    # The digest waits EMAIL_DIGEST_SECONDS before it is due
+    assert [row['status'] for row in outbox().values()] == ['sending', 'sending', 'pending', 'pending']
+
+def test_due_digest_pulls_in_its_pending_parts():
+    first = enqueue_email('a@example.com', 'Alert 1', '<p>1</p>', digest_key='alerts')
+    second = enqueue_email('a@example.com', 'Alert 2', '<p>2</p>', digest_key='alerts')
+    other = enqueue_email('b@example.com', 'Alert 3', '<p>3</p>', digest_key='alerts')
+    set_rows("UPDATE email_outbox SET next_attempt_at = 0 WHERE email_id = ?", (first,))
+
+    groups = claim_batch()
+
+    assert list(groups) == [('a@example.com', 'alerts')]
+    assert [row['email_id'] for row in groups['a@example.com', 'alerts']] == [first, second]
+    assert outbox()[other]['status'] == 'pending'
+
+    message = email_outbox.build_message('a@example.com', groups['a@example.com', 'alerts'])
+    assert message['Subject'] == 'Alert 1 (+1 more)'
+
+def test_requeue_leaves_live_claims_alone():
+    enqueue_email('a@example.com', 'One', '<p></p>')
+    claim_batch()
+
+    assert requeue_stale() == 0
+    assert [row['status'] for row in outbox().values()] == ['sending']
+
+def test_requeue_returns_expired_claims():
+    email_id = enqueue_email('a@example.com', 'One', '<p></p>')
+    claim_batch()
+    set_rows("UPDATE email_outbox SET claimed_at = ?", (time.time() - EMAIL_CLAIM_LEASE_SECONDS - 1,))
+
+    assert requeue_stale() == 1
+    row = outbox()[email_id]
+    assert row['status'] == 'pending'
+    assert row['claimed_at'] is None
+
+def test_claim_takes_over_expired_claims():
+    email_id = enqueue_email('a@example.com', 'One', '<p></p>')
+    claim_batch()
+    set_rows("UPDATE email_outbox SET claimed_at = ?", (time.time() - EMAIL_CLAIM_LEASE_SECONDS - 1,))
+
+    groups = claim_batch()
+
+    assert [rows[0]['email_id'] for rows in groups.values()] == [email_id]
+    assert outbox()[email_id]['claimed_at'] > time.time() - 60
+
+def test_mark_sent_and_failed():
+    sent_id = enqueue_email('a@example.com', 'One', '<p></p>')
+    failed_id = enqueue_email('b@example.com', 'Two', '<p></p>')
+    groups = claim_batch()
+    rows = {rows[0]['email_id']: rows for rows in groups.values()}
+
+    mark_sent(rows[sent_id])
+    mark_failed(rows[failed_id], 'Connection refused')
+
+    outcome = outbox()
+    assert outcome[sent_id]['status'] == 'sent'
+    assert outcome[sent_id]['sent_at']
+    assert outcome[failed_id]['status'] == 'pending'
+    assert outcome[failed_id]['attempts'] == 1
+    assert outcome[failed_id]['last_error'] == 'Connection refused'
+    # Backed off, so not due again straight away
+    assert outcome[failed_id]['next_attempt_at'] > time.time()
+    assert claim_batch() == {}
+
+def test_mark_failed_gives_up_after_max_attempts():
+    email_id = enqueue_email('a@example.com', 'One', '<p></p>')
+    set_rows("UPDATE email_outbox SET attempts = ?", (EMAIL_MAX_ATTEMPTS - 1,))
+    groups = claim_batch()
+
+    mark_failed(groups['a@example.com', f'email:{email_id}'], 'Mailbox unavailable')
+
+    row = outbox()[email_id]
+    assert row['status'] == 'failed'
+    assert row['attempts'] == EMAIL_MAX_ATTEMPTS
+
+def test_process_batch_sends_one_email_per_group(monkeypatch):
+    sent = []
+    monkeypatch.setattr(email_outbox, 'is_configured', lambda: True)
+    monkeypatch.setattr(email_outbox._worker.session, 'send', sent.append)
+    enqueue_email('a@example.com', 'One', '<p></p>')
+    enqueue_email('b@example.com', 'Two', '<p></p>')
+
+    assert email_outbox._worker.process_batch() == 2
+
+    assert sorted(message['To'] for message in sent) == ['a@example.com', 'b@example.com']
+    assert {row['status'] for row in outbox().values()} == {'sent'}
@@ -0,0 +1,53 @@
+import pytest
+
+from utils.geo import (
+    bounding_box, geohash_bounds, geohash_encode, geohash_filter, geohash_neighbors, haversine_km
+)
+
+BOSTON = (42.3601, -71.0589)
+
+@pytest.mark.parametrize('lat, lon', [BOSTON, (-33.8688, 151.2093), (0.0, 0.0)])
+def test_bounding_box_contains_radius(lat, lon):
+    min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, 25)
+
+    # The box edges lie at least the radius away from the centre
+    assert haversine_km(lat, lon, min_lat, lon) == pytest.approx(25, rel=1e-6)
+    assert haversine_km(lat, lon, max_lat, lon) == pytest.approx(25, rel=1e-6)
+    assert haversine_km(lat, lon, lat, min_lon) >= 25
+    assert haversine_km(lat, lon, lat, max_lon) >= 25
+
+def test_bounding_box_spans_all_longitudes_near_poles_and_antimeridian():
+    assert bounding_box(89.9, 10.0, 50)[2:] == (-180.0, 180.0)
+    assert bounding_box(0.0, 179.9, 50)[2:] == (-180.0, 180.0)
+
+def test_geohash_encode_known_value():
+    assert geohash_encode(57.64911, 10.40744, 11) == 'u4pruydqqvj'
+    # Shorter precisions are prefixes of the same value
+    assert geohash_encode(57.64911, 10.40744, 5) == 'u4pru'
+
+def test_geohash_bounds_contain_point():
+    cell = geohash_encode(*BOSTON, 7)
+    min_lat, max_lat, min_lon, max_lon = geohash_bounds(cell)
+    assert min_lat <= BOSTON[0] < max_lat
+    assert min_lon <= BOSTON[1] < max_lon
+
+def test_geohash_neighbors_surround_cell():
+    cell = geohash_encode(*BOSTON, 5)
+    cells = geohash_neighbors(cell)
+
+    assert cells[0] == cell
+    assert len(cells) == 9
+    # A point just past each corner of the cell falls in one of them
+    min_lat, max_lat, min_lon, max_lon = geohash_bounds(cell)
+    for lat in (min_lat - 1e-6, max_lat + 1e-6):
+        for lon in (min_lon - 1e-6, max_lon + 1e-6):
+            assert geohash_encode(lat, lon, 5) in cells
+
+def test_geohash_filter_matches_cell_prefixes(conn):
+    sql, params = geohash_filter('geohash', ['drt2y', 'drt2z'])
+    rows = conn.execute(f"""
+        SELECT geohash FROM (
+            SELECT 'drt2yq1' AS geohash UNION ALL SELECT 'drt2zzz' UNION ALL SELECT 'drt3000'
+        ) WHERE {sql}
+    """, params).fetchall()
+    assert sorted(row['geohash'] for row in rows) == ['drt2yq1', 'drt2zzz']
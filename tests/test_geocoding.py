@@ -0,0 +1,70 @@
+import pytest
+import requests
+
+from utils import geocoding
+from utils.geocoding import GeocodingError, geocode, normalize_address
+from utils.location_manager import geocode_address
+
+class FakeResponse:
+    def __init__(self, places):
+        self.places = places
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.places
+
+@pytest.fixture
+def nominatim(monkeypatch):
+    """Stand-in for Nominatim: append responses (or exceptions) to answer with"""
+    answers, calls = [], []
+
+    def get(url, params, headers, timeout):
+        calls.append(params['q'])
+        answer = answers.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return FakeResponse(answer)
+
+    monkeypatch.setattr(geocoding.requests, 'get', get)
+    monkeypatch.setattr(geocoding, 'GEOCODE_MIN_INTERVAL', 0)
+    geocoding._lru.clear()
+    yield answers, calls
+    geocoding._lru.clear()
+
+PLACE = {'lat': '42.3601', 'lon': '-71.0589', 'display_name': 'Boston, MA', 'address': {'postcode': '02108'}}
+
+def test_normalize_address():
+    assert normalize_address('  Boston,  MA. ') == 'boston ma'
+
+def test_hits_are_cached(nominatim):
+    answers, calls = nominatim
+    answers.append([PLACE])
+
+    assert geocode('Boston, MA')['lat'] == 42.3601
+    assert geocode('boston ma')['address'] == {'postcode': '02108'}
+    assert calls == ['boston ma']
+
+def test_not_found_is_cached_as_a_miss(nominatim):
+    answers, calls = nominatim
+    answers.append([])
+
+    assert geocode('Atlantis') is None
+    assert geocode('Atlantis') is None
+    assert len(calls) == 1
+
+def test_service_errors_raise_and_are_not_cached(nominatim):
+    answers, calls = nominatim
+    answers += [requests.ConnectionError('down'), [PLACE]]
+
+    with pytest.raises(GeocodingError):
+        geocode('Boston, MA')
+    assert geocode('Boston, MA')['display_name'] == 'Boston, MA'
+    assert len(calls) == 2
+
+def test_wrappers_treat_errors_as_no_result(nominatim):
+    answers, _ = nominatim
+    answers.append(requests.Timeout('slow'))
+
+    assert geocode_address('Boston, MA') is None
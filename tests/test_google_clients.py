@@ -0,0 +1,57 @@
+import threading
+
+import pytest
+
+from utils import google_clients
+from utils.google_clients import fetch_userinfo
+
+class FakeService:
+    """Stands in for the oauth2 client; records the Http each call went out on"""
+
+    def __init__(self):
+        self.used = []
+        self.fail = False
+
+    def userinfo(self):
+        return self
+
+    def get(self):
+        return self
+
+    def execute(self, http):
+        self.used.append(http.http)
+        if self.fail:
+            raise RuntimeError("userinfo failed")
+        return {'id': '123'}
+
+@pytest.fixture
+def service(monkeypatch):
+    service = FakeService()
+    monkeypatch.setattr(google_clients, 'oauth2_service', lambda: service)
+    monkeypatch.setattr(google_clients, '_idle_http', [])
+    return service
+
+def in_new_thread(func):
+    # Streamlit runs every rerun on a fresh thread
+    thread = threading.Thread(target=func)
+    thread.start()
+    thread.join()
+
+def test_connection_is_reused_across_threads(service):
+    in_new_thread(lambda: fetch_userinfo(credentials=None))
+    in_new_thread(lambda: fetch_userinfo(credentials=None))
+
+    assert len(service.used) == 2
+    assert service.used[0] is service.used[1]
+
+def test_concurrent_calls_get_their_own_connection(service):
+    with google_clients._http() as busy:
+        assert fetch_userinfo(credentials=None) == {'id': '123'}
+    assert service.used[0] is not busy
+    assert len(google_clients._idle_http) == 2
+
+def test_connection_returns_to_pool_on_error(service):
+    service.fail = True
+    with pytest.raises(RuntimeError):
+        fetch_userinfo(credentials=None)
+    assert google_clients._idle_http == service.used
@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from utils import email_outbox
+from utils.notification_manager import NotificationManager
+
+@pytest.fixture(autouse=True)
+def idle_worker(monkeypatch):
+    monkeypatch.setattr(email_outbox._worker, 'start', lambda: None)
+    monkeypatch.setattr(email_outbox._worker, 'wake', lambda: None)
+
+@pytest.fixture
+def alert(conn, insert):
+    """A premium seeker with an active Plumbing alert and a job poster"""
+    premium_until = (datetime.now() + timedelta(days=30)).isoformat()
+    insert('users', user_id='seeker', email='seeker@example.com', is_premium=1, premium_until=premium_until)
+    insert('users', user_id='poster', role='Job Poster')
+    alert_id = insert('job_alerts', user_id='seeker', trade_category='Plumbing')
+    conn.commit()
+    return alert_id
+
+def post_job(conn, insert, trade_category):
+    job_id = insert('jobs', job_poster_id='poster', trade_category=trade_category)
+    conn.commit()
+    return job_id
+
+def alert_messages(conn):
+    rows = conn.execute("SELECT message FROM notifications WHERE user_id = 'seeker' ORDER BY notification_id")
+    return [row['message'] for row in rows.fetchall()]
+
+def test_new_jobs_and_alerts_are_tagged_before_matching(conn, insert, alert):
+    # Neither the alert nor the jobs have tag sets yet
+    post_job(conn, insert, 'Plumbing')
+    latest = post_job(conn, insert, 'Roofing')
+
+    NotificationManager.check_job_alerts()
+
+    assert alert_messages(conn) == ["Found 1 new job matching your preferences!"]
+    mark = conn.execute("SELECT last_job_id FROM job_alerts WHERE alert_id = ?", (alert,)).fetchone()
+    assert mark['last_job_id'] == latest
+
+def test_jobs_are_alerted_once(conn, insert, alert):
+    post_job(conn, insert, 'Plumbing')
+    NotificationManager.check_job_alerts()
+    post_job(conn, insert, 'Plumbing')
+    NotificationManager.check_job_alerts()
+    NotificationManager.check_job_alerts()
+
+    assert alert_messages(conn) == ["Found 1 new job matching your preferences!"] * 2
+
+def test_edited_alert_matches_on_its_new_tags(conn, insert, alert):
+    post_job(conn, insert, 'Plumbing')
+    NotificationManager.check_job_alerts()
+
+    conn.execute("UPDATE job_alerts SET trade_category = 'Roofing' WHERE alert_id = ?", (alert,))
+    conn.commit()
+    post_job(conn, insert, 'Roofing')
+    NotificationManager.check_job_alerts()
+
+    assert alert_messages(conn) == ["Found 1 new job matching your preferences!"] * 2
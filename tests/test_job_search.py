@@ -0,0 +1,48 @@
+import pytest
+
+from utils.job_search import build_match_query, has_fts, keyword_filter, search_jobs
+
+pytestmark = pytest.mark.skipif(not has_fts(), reason="SQLite built without FTS5")
+
+def titles(results):
+    return [job['title'] for job in results]
+
+def test_build_match_query_quotes_prefix_terms():
+    assert build_match_query('leaky  pipe') == '"leaky"* "pipe"*'
+    # FTS5 operators are searched literally
+    assert build_match_query('pipe OR NOT roof') == '"pipe"* "OR"* "NOT"* "roof"*'
+    assert build_match_query(' -- ') is None
+
+def test_search_matches_prefixes_and_ranks_title_first(conn, insert):
+    insert('jobs', job_poster_id='poster', title='Fix bathroom sink', description='Plumbing repair needed')
+    insert('jobs', job_poster_id='poster', title='Plumber for new build', description='Rough-in work')
+    insert('jobs', job_poster_id='poster', title='Paint fence', description='Two coats')
+
+    assert titles(search_jobs(conn, 'plumb')) == ['Plumber for new build', 'Fix bathroom sink']
+    assert search_jobs(conn, 'plumb')[0]['match_snippet']
+    assert search_jobs(conn, 'plumbing rough') == []
+
+def test_search_follows_job_updates_and_deletes(conn, insert):
+    job_id = insert('jobs', job_poster_id='poster', title='Roof repair')
+
+    conn.execute("UPDATE jobs SET title = 'Gutter cleaning' WHERE job_id = ?", (job_id,))
+    assert search_jobs(conn, 'roof') == []
+    assert titles(search_jobs(conn, 'gutter')) == ['Gutter cleaning']
+
+    conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+    assert search_jobs(conn, 'gutter') == []
+
+def test_search_only_returns_requested_status(conn, insert):
+    insert('jobs', job_poster_id='poster', title='Tile floor', status='Closed')
+
+    assert search_jobs(conn, 'tile') == []
+    assert titles(search_jobs(conn, 'tile', status='Closed')) == ['Tile floor']
+
+def test_keyword_filter_restricts_listing_query(conn, insert):
+    insert('jobs', job_poster_id='poster', title='Install ceiling fan', trade_category='Electrical')
+    insert('jobs', job_poster_id='poster', title='Replace faucet')
+
+    where_sql, params = keyword_filter('ceiling')
+    rows = conn.execute(f"SELECT j.title FROM jobs j WHERE {where_sql}", params).fetchall()
+
+    assert titles(rows) == ['Install ceiling fan']
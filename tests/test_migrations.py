@@ -0,0 +1,10 @@
+from utils.database import SCHEMA_VERSION, apply_migrations, check_query_plans, get_schema_version
+
+def test_fresh_database_is_fully_migrated(conn):
+    assert get_schema_version(conn) == SCHEMA_VERSION
+
+def test_migrations_run_once(conn):
+    assert apply_migrations(conn) == []
+
+def test_hot_queries_use_indexes(conn):
+    assert check_query_plans(conn) == []
@@ -0,0 +1,94 @@
+from utils.database import refresh_geohashes
+from utils.geo import geohash_encode
+from utils.location_utils import get_nearby_users, get_postal_centroid
+
+BOSTON = (42.3601, -71.0589)
+
+def add_user(insert, user_id, coords=None, role='Job Seeker', **values):
+    if coords:
+        values.update(latitude=coords[0], longitude=coords[1])
+    insert('users', user_id=user_id, name=user_id.title(), role=role, **values)
+
+def nearby(conn, distance_km=50, **kwargs):
+    return [user['user_id'] for user in get_nearby_users(conn, 'poster', 'Job Poster', distance_km, **kwargs)]
+
+def test_radius_search_returns_seekers_nearest_first(conn, insert):
+    add_user(insert, 'poster', BOSTON, role='Job Poster')
+    add_user(insert, 'cambridge', (42.3736, -71.1097))
+    add_user(insert, 'next_door', (42.3610, -71.0600))
+    add_user(insert, 'new_york', (40.7128, -74.0060))
+    add_user(insert, 'other_poster', (42.3620, -71.0610), role='Job Poster')
+    add_user(insert, 'no_location')
+    conn.commit()
+
+    assert nearby(conn) == ['next_door', 'cambridge']
+    assert nearby(conn, distance_km=1) == ['next_door']
+    assert nearby(conn, distance_km=500) == ['next_door', 'cambridge', 'new_york']
+
+def test_spatial_index_follows_moves_and_deletes(conn, insert):
+    add_user(insert, 'poster', BOSTON, role='Job Poster')
+    add_user(insert, 'mover', (40.7128, -74.0060))
+    add_user(insert, 'leaver', (42.3610, -71.0600))
+    conn.commit()
+
+    conn.execute("UPDATE users SET latitude = 42.3700, longitude = -71.0700 WHERE user_id = 'mover'")
+    conn.execute("DELETE FROM users WHERE user_id = 'leaver'")
+    conn.commit()
+
+    assert nearby(conn) == ['mover']
+    assert not conn.execute("SELECT 1 FROM user_geo_ids WHERE user_id = 'leaver'").fetchone()
+
+def test_spatial_index_survives_rowid_renumbering(conn, insert):
+    # users has a TEXT primary key, so VACUUM may renumber its rowids;
+    # users_geo entries must stay with their users regardless
+    add_user(insert, 'poster', BOSTON, role='Job Poster')
+    add_user(insert, 'far', (40.7128, -74.0060))
+    add_user(insert, 'near', (42.3610, -71.0600))
+    conn.commit()
+
+    conn.execute("UPDATE users SET rowid = rowid + 1000")
+    conn.commit()
+    conn.execute("VACUUM")
+
+    assert nearby(conn) == ['near']
+    assert nearby(conn, distance_km=500) == ['near', 'far']
+
+def test_geohash_follows_coordinate_changes(conn, insert):
+    add_user(insert, 'seeker', BOSTON)
+    conn.commit()
+    refresh_geohashes()
+
+    row = conn.execute("SELECT geohash FROM users WHERE user_id = 'seeker'").fetchone()
+    assert row['geohash'] == geohash_encode(*BOSTON)
+
+    conn.execute("UPDATE users SET latitude = 40.7128, longitude = -74.0060 WHERE user_id = 'seeker'")
+    conn.commit()
+    assert conn.execute("SELECT geohash FROM users WHERE user_id = 'seeker'").fetchone()['geohash'] is None
+    assert refresh_geohashes() == 1
+    row = conn.execute("SELECT geohash FROM users WHERE user_id = 'seeker'").fetchone()
+    assert row['geohash'] == geohash_encode(40.7128, -74.0060)
+
+def test_postal_centroid_averages_known_locations(conn, insert):
+    add_user(insert, 'a', (42.36, -71.10), postal_code='02139')
+    add_user(insert, 'b', (42.38, -71.12), postal_code='02139')
+    conn.commit()
+
+    latitude, longitude = get_postal_centroid('02139')
+    assert (round(latitude, 6), round(longitude, 6)) == (42.37, -71.11)
+    stored = conn.execute("SELECT latitude FROM postal_centroids WHERE postal_code = '02139'").fetchone()
+    assert round(stored['latitude'], 6) == 42.37
+
+def test_zip_search_covers_the_postal_codes_grid_cells(conn, insert):
+    add_user(insert, 'poster', BOSTON, role='Job Poster')
+    add_user(insert, 'same_zip', (42.3650, -71.1040), postal_code='02139')
+    add_user(insert, 'next_zip', (42.3700, -71.0800), postal_code='02141')
+    add_user(insert, 'new_york', (40.7128, -74.0060), postal_code='10001')
+    add_user(insert, 'no_coords', postal_code='02139')
+    conn.commit()
+
+    users = get_nearby_users(conn, 'poster', 'Job Poster', zip_code='02139')
+
+    distances = {user['user_id']: user['distance'] for user in users}
+    assert set(distances) == {'same_zip', 'no_coords', 'next_zip'}
+    assert distances['same_zip'] == distances['no_coords'] == 0
+    assert 0 < distances['next_zip'] < 5
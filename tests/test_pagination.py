@@ -0,0 +1,76 @@
+import pytest
+
+from utils.pagination import Keyset
+
+def all_pages(conn, keyset, select, where='1', params=(), page_size=2):
+    """Walk a listing page by page; returns (rows, number of pages)"""
+    rows, cursor, pages = [], None, 0
+    while True:
+        after_sql, after_params = keyset.filter(cursor)
+        query = f"{select} WHERE {where}" + (f" AND {after_sql}" if after_sql else "") + keyset.order_by()
+        page, cursor = keyset.fetch_page(conn.cursor(), query, list(params) + after_params, page_size)
+        rows += page
+        pages += 1
+        if cursor is None:
+            return rows, pages
+
+def test_pages_cover_every_row_once_despite_ties(conn, insert):
+    job_ids = [
+        insert('jobs', job_poster_id='poster', created_at=created_at)
+        for created_at in ['2024-01-01', '2024-01-02', '2024-01-02', '2024-01-02', '2024-01-03']
+    ]
+    keyset = Keyset('j.created_at', 'j.job_id')
+
+    rows, pages = all_pages(conn, keyset, "SELECT j.job_id, j.created_at FROM jobs j")
+
+    assert pages == 3
+    assert [row['job_id'] for row in rows] == [job_ids[4], job_ids[3], job_ids[2], job_ids[1], job_ids[0]]
+
+def test_ascending_order_with_filter(conn, insert):
+    job_ids = [insert('jobs', job_poster_id='poster', trade_category=category)
+               for category in ['Plumbing', 'Electrical', 'Plumbing', 'Plumbing']]
+    keyset = Keyset('j.job_id', descending=False)
+
+    rows, _ = all_pages(conn, keyset, "SELECT j.job_id FROM jobs j", "j.trade_category = ?", ['Plumbing'])
+
+    assert [row['job_id'] for row in rows] == [job_ids[0], job_ids[2], job_ids[3]]
+
+def test_aliased_sort_expression_pages_through_nulls(conn, insert):
+    # The "Most Workers Needed" listing sorts on IFNULL(workers_needed, 1)
+    # through an alias, so jobs without a value page like jobs needing one
+    workers = [3, None, 1, None, 2, 1]
+    job_ids = [insert('jobs', job_poster_id='poster', workers_needed=count) for count in workers]
+    keyset = Keyset('sort_workers', 'j.job_id')
+
+    rows, _ = all_pages(
+        conn, keyset, "SELECT j.job_id, IFNULL(j.workers_needed, 1) AS sort_workers FROM jobs j"
+    )
+
+    expected = sorted(zip(workers, job_ids), key=lambda pair: (pair[0] or 1, pair[1]), reverse=True)
+    assert [row['job_id'] for row in rows] == [job_id for _, job_id in expected]
+
+@pytest.mark.parametrize('descending', [True, False])
+def test_browse_jobs_pay_sort_pages_through_nulls(conn, insert, descending):
+    # Browse Jobs' "Pay Rate" sorts page on IFNULL(payment_amount, 0), so
+    # jobs without an amount neither vanish nor repeat across pages
+    amounts = [25.0, None, 40.0, 25.0, None, 10.0, 40.0]
+    job_ids = [insert('jobs', job_poster_id='poster', payment_amount=amount) for amount in amounts]
+    keyset = Keyset('sort_pay', 'j.job_id', descending=descending)
+
+    rows, _ = all_pages(
+        conn, keyset, "SELECT j.job_id, IFNULL(j.payment_amount, 0) AS sort_pay FROM jobs j"
+    )
+
+    expected = sorted(zip(amounts, job_ids), key=lambda pair: (pair[0] or 0, pair[1]), reverse=descending)
+    assert [row['job_id'] for row in rows] == [job_id for _, job_id in expected]
+
+def test_last_page_has_no_cursor(conn, insert):
+    insert('jobs', job_poster_id='poster')
+    keyset = Keyset('j.job_id')
+
+    cursor = conn.cursor()
+    after_sql, _ = keyset.filter(None)
+    assert after_sql is None
+    rows, next_cursor = keyset.fetch_page(cursor, "SELECT j.job_id FROM jobs j" + keyset.order_by(), [], 1)
+    assert len(rows) == 1
+    assert next_cursor is None
@@ -0,0 +1,41 @@
+import threading
+
+import pytest
+
+from config import BCRYPT_ROUNDS
+from utils import passwords
+from utils.passwords import PasswordHashingBusy, hash_password, hash_rounds, needs_rehash, verify_password
+
+# The cheapest cost bcrypt accepts keeps the tests fast
+ROUNDS = 4
+
+def test_hash_and_verify():
+    hashed = hash_password('correct horse', rounds=ROUNDS)
+
+    assert hashed != 'correct horse'
+    assert verify_password('correct horse', hashed)
+    assert not verify_password('wrong horse', hashed)
+
+def test_verify_rejects_unset_and_legacy_passwords():
+    assert not verify_password('secret', None)
+    assert not verify_password('', hash_password('secret', rounds=ROUNDS))
+    assert not verify_password('secret', 'secret')
+
+def test_needs_rehash_on_cost_change():
+    hashed = hash_password('secret', rounds=ROUNDS)
+
+    assert hash_rounds(hashed) == ROUNDS
+    assert needs_rehash(hashed) == (ROUNDS != BCRYPT_ROUNDS)
+    assert hash_rounds('not a hash') is None
+    assert needs_rehash(None)
+
+def test_busy_when_no_slot_frees_up(monkeypatch):
+    monkeypatch.setattr(passwords, '_slots', threading.BoundedSemaphore(1))
+    monkeypatch.setattr(passwords, 'PASSWORD_HASH_TIMEOUT', 0.01)
+    passwords._slots.acquire()
+
+    with pytest.raises(PasswordHashingBusy):
+        hash_password('secret', rounds=ROUNDS)
+
+    passwords._slots.release()
+    assert verify_password('secret', hash_password('secret', rounds=ROUNDS))
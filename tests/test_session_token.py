@@ -0,0 +1,30 @@
+import time
+
+from jose import jwt
+
+from config import SESSION_REFRESH_MARGIN
+from utils.session_token import ALGORITHM, issue_session_token, needs_refresh, read_session_token
+
+def test_round_trip():
+    claims = read_session_token(issue_session_token('user-1'))
+
+    assert claims['sub'] == 'user-1'
+    assert claims['exp'] > time.time()
+    assert not needs_refresh(claims)
+
+def test_rejects_missing_expired_and_forged_tokens():
+    assert read_session_token(None) is None
+    assert read_session_token('not-a-token') is None
+    assert read_session_token(issue_session_token('user-1', lifetime=-1)) is None
+
+    forged = jwt.encode({'sub': 'admin', 'exp': int(time.time()) + 3600}, 'wrong-secret', algorithm=ALGORITHM)
+    assert read_session_token(forged) is None
+
+def test_tampered_payload_is_rejected():
+    header, _, signature = issue_session_token('user-1').split('.')
+    payload = jwt.encode({'sub': 'admin'}, 'x', algorithm=ALGORITHM).split('.')[1]
+    assert read_session_token(f"{header}.{payload}.{signature}") is None
+
+def test_needs_refresh_near_expiry():
+    claims = read_session_token(issue_session_token('user-1', lifetime=SESSION_REFRESH_MARGIN // 2))
+    assert needs_refresh(claims)
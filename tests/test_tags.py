@@ -0,0 +1,82 @@
+from utils.database import refresh_tags
+from utils.location_utils import get_nearby_users
+from utils.tags import overlap, pack_tags, parse_tags, tag_ids, unpack_tags
+
+def test_parse_tags_normalizes_names():
+    assert parse_tags(' Plumbing, pipe  fitting,,PLUMBING', None, 'Welding') == {
+        'plumbing', 'pipe fitting', 'welding'
+    }
+
+def test_pack_tags_round_trip():
+    blob = pack_tags({30, 2, 17})
+    assert blob == pack_tags([2, 17, 30])
+    assert unpack_tags(blob) == {2, 17, 30}
+    assert unpack_tags(None) == frozenset()
+    assert unpack_tags(pack_tags([])) == frozenset()
+
+def test_overlap():
+    assert overlap(frozenset({1, 2, 3}), frozenset({2, 3, 4})) == 2
+    assert overlap(frozenset(), frozenset({1})) == 0
+
+def tags_of(conn, table, key, value, column):
+    return unpack_tags(conn.execute(f"SELECT {column} FROM {table} WHERE {key} = ?", (value,)).fetchone()[column])
+
+def test_refresh_tags_packs_user_sources(conn, insert):
+    insert('users', user_id='seeker', skills='Plumbing, Welding', preferred_trades='HVAC')
+    conn.commit()
+
+    assert refresh_tags() >= 1
+    assert tags_of(conn, 'users', 'user_id', 'seeker', 'skill_tags') == tag_ids(conn, {'plumbing', 'welding'})
+    assert tags_of(conn, 'users', 'user_id', 'seeker', 'trade_tags') == tag_ids(conn, {'hvac'})
+    # Nothing left to do until a source changes
+    assert refresh_tags() == 0
+
+def test_source_changes_mark_rows_pending(conn, insert):
+    insert('users', user_id='seeker', skills='Plumbing')
+    job_id = insert('jobs', job_poster_id='poster', requirements='Ladder', trade_category='Roofing')
+    conn.commit()
+    refresh_tags()
+
+    conn.execute("UPDATE users SET skills = 'Carpentry' WHERE user_id = 'seeker'")
+    conn.execute("UPDATE jobs SET trade_category = 'Siding' WHERE job_id = ?", (job_id,))
+    conn.commit()
+    assert refresh_tags() == 2
+
+    assert tags_of(conn, 'users', 'user_id', 'seeker', 'skill_tags') == tag_ids(conn, {'carpentry'})
+    assert tags_of(conn, 'jobs', 'job_id', job_id, 'category_tags') == tag_ids(conn, {'siding'})
+    assert tags_of(conn, 'jobs', 'job_id', job_id, 'requirement_tags') == tag_ids(conn, {'ladder'})
+
+def test_child_rows_feed_user_tag_sets(conn, insert):
+    insert('users', user_id='seeker')
+    conn.commit()
+    refresh_tags()
+
+    insert('certifications', user_id='seeker', name='Journeyman Electrician')
+    history_id = insert('work_history', user_id='seeker', trade_category='Electrical')
+    conn.commit()
+    refresh_tags()
+
+    assert tags_of(conn, 'users', 'user_id', 'seeker', 'cert_tags') == tag_ids(conn, {'journeyman electrician'})
+    assert tags_of(conn, 'users', 'user_id', 'seeker', 'experience_tags') == tag_ids(conn, {'electrical'})
+
+    conn.execute("DELETE FROM work_history WHERE history_id = ?", (history_id,))
+    conn.commit()
+    refresh_tags()
+    assert tags_of(conn, 'users', 'user_id', 'seeker', 'experience_tags') == frozenset()
+
+def test_nearby_users_skill_filter(conn, insert):
+    insert('users', user_id='poster', role='Job Poster', latitude=42.3601, longitude=-71.0589)
+    insert('users', user_id='welder', skills='Welding, Plumbing', latitude=42.3610, longitude=-71.0600)
+    insert('users', user_id='framer', skills='Carpentry', preferred_trades='welding',
+           latitude=42.3620, longitude=-71.0610)
+    insert('users', user_id='painter', skills='Painting', latitude=42.3630, longitude=-71.0620)
+    conn.commit()
+
+    def nearby(skills):
+        users = get_nearby_users(conn, 'poster', 'Job Poster', 50, skills=skills)
+        return [user['user_id'] for user in users]
+
+    assert nearby('WELDING') == ['welder', 'framer']
+    assert nearby('painting, plumbing') == ['welder', 'painter']
+    assert nearby('underwater basket weaving') == []
+    assert nearby('') == ['welder', 'framer', 'painter']
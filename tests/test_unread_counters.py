@@ -0,0 +1,58 @@
+from utils.database import get_unread_counters, rebuild_unread_counters
+
+def counters(conn, user_id):
+    row = conn.execute(
+        "SELECT notifications, messages FROM unread_counters WHERE user_id = ?", (user_id,)
+    ).fetchone()
+    return row or {'notifications': 0, 'messages': 0}
+
+def assert_matches_rebuild(conn):
+    # Triggers keep zeroed rows around; the rebuild only writes non-zero ones
+    maintained = conn.execute(
+        "SELECT * FROM unread_counters WHERE notifications OR messages ORDER BY user_id"
+    ).fetchall()
+    rebuild_unread_counters(conn)
+    assert conn.execute("SELECT * FROM unread_counters ORDER BY user_id").fetchall() == maintained
+
+def test_notification_counter_follows_inserts_reads_and_deletes(conn, insert):
+    first = insert('notifications', user_id='alice')
+    second = insert('notifications', user_id='alice')
+    insert('notifications', user_id='alice', is_read=1)
+    assert counters(conn, 'alice')['notifications'] == 2
+
+    conn.execute("UPDATE notifications SET is_read = 1 WHERE notification_id = ?", (first,))
+    assert counters(conn, 'alice')['notifications'] == 1
+
+    conn.execute("DELETE FROM notifications WHERE notification_id = ?", (second,))
+    assert counters(conn, 'alice')['notifications'] == 0
+    assert_matches_rebuild(conn)
+
+def test_message_counter_follows_conversations(conn, insert):
+    first = insert('messages', sender_id='alice', receiver_id='bob')
+    insert('messages', sender_id='carol', receiver_id='bob')
+    assert counters(conn, 'bob')['messages'] == 2
+    assert counters(conn, 'alice')['messages'] == 0
+
+    conn.execute("UPDATE messages SET is_read = 1 WHERE message_id = ?", (first,))
+    assert counters(conn, 'bob')['messages'] == 1
+
+    conn.execute("DELETE FROM messages WHERE sender_id = 'carol'")
+    assert counters(conn, 'bob')['messages'] == 0
+    assert_matches_rebuild(conn)
+
+def test_counters_never_go_negative(conn, insert):
+    notification_id = insert('notifications', user_id='alice')
+    # Simulate drift, e.g. a row written while the triggers were missing
+    conn.execute("UPDATE unread_counters SET notifications = 0 WHERE user_id = 'alice'")
+
+    conn.execute("UPDATE notifications SET is_read = 1 WHERE notification_id = ?", (notification_id,))
+    assert counters(conn, 'alice')['notifications'] == 0
+
+def test_get_unread_counters_reads_committed_totals(conn, insert):
+    assert get_unread_counters('alice') == {'notifications': 0, 'messages': 0}
+
+    insert('notifications', user_id='alice')
+    insert('messages', sender_id='bob', receiver_id='alice')
+    conn.commit()
+
+    assert get_unread_counters('alice') == {'notifications': 1, 'messages': 1}
@@ -1,186 +1,74 @@
 from datetime import datetime, timedelta
 from utils.database import get_db
-from utils.location_manager import calculate_distance
+from utils.recommendations import recommend_jobs
 
 class AnalyticsManager:
     @staticmethod
-    def calculate_user_metrics(user_id):
-        """Calculate and store user metrics"""
+    def _window_start(days, now=None):
+        """First day (YYYY-MM-DD) of a window of days ending today"""
+        return ((now or datetime.now()) - timedelta(days=days)).date().isoformat()
+
+    @staticmethod
+    def calculate_user_metrics(user_id, days=30):
+        """
+        Current metrics of a user over the last days, read from the daily
+        rollup tables (nothing is written; the rollups are kept up to date
+        by triggers).
+        """
         conn = get_db()
         cursor = conn.cursor()
         
         try:
-            now = datetime.now()
-            period_start = (now - timedelta(days=30)).isoformat()
-            period_end = now.isoformat()
+            start = AnalyticsManager._window_start(days)
+            metrics = {}
             
-            # Calculate application success rate
+            # Application success rate
             cursor.execute("""
-                SELECT 
-                    COUNT(*) as total_applications,
-                    SUM(CASE WHEN status = 'Accepted' THEN 1 ELSE 0 END) as accepted_applications
-                FROM applications
-                WHERE applicant_id = ?
-                AND created_at BETWEEN ? AND ?
-            """, (user_id, period_start, period_end))
+                SELECT SUM(applications) as total_applications, SUM(accepted) as accepted_applications
+                FROM daily_seeker_stats
+                WHERE user_id = ? AND day >= ?
+            """, (user_id, start))
             
             app_stats = cursor.fetchone()
-            if app_stats['total_applications'] > 0:
-                success_rate = (app_stats['accepted_applications'] / app_stats['total_applications']) * 100
-                
-                cursor.execute("""
-                    INSERT INTO user_analytics 
-                    (user_id, metric_name, metric_value, period_start, period_end, created_at)
-                    VALUES (?, 'application_success_rate', ?, ?, ?, ?)
-                """, (user_id, success_rate, period_start, period_end, now.isoformat()))
+            if app_stats['total_applications']:
+                metrics['application_success_rate'] = (
+                    app_stats['accepted_applications'] / app_stats['total_applications']
+                ) * 100
             
-            # Calculate average response time
+            # Average response time
             cursor.execute("""
-                SELECT AVG(response_time) as avg_response_time
-                FROM applications
-                WHERE job_poster_id = ?
-                AND created_at BETWEEN ? AND ?
-                AND response_time IS NOT NULL
-            """, (user_id, period_start, period_end))
+                SELECT SUM(response_time_total) as response_time_total, SUM(responses) as responses
+                FROM daily_poster_stats
+                WHERE user_id = ? AND day >= ?
+            """, (user_id, start))
             
             response_stats = cursor.fetchone()
-            if response_stats['avg_response_time']:
-                cursor.execute("""
-                    INSERT INTO user_analytics 
-                    (user_id, metric_name, metric_value, period_start, period_end, created_at)
-                    VALUES (?, 'avg_response_time', ?, ?, ?, ?)
-                """, (user_id, response_stats['avg_response_time'], 
-                     period_start, period_end, now.isoformat()))
-            
-            # Calculate popular job categories
-            cursor.execute("""
-                SELECT trade_category, COUNT(*) as category_count
-                FROM jobs
-                WHERE created_at BETWEEN ? AND ?
-                AND status = 'Open'
-                GROUP BY trade_category
-                ORDER BY category_count DESC
-                LIMIT 5
-            """, (period_start, period_end))
-            
-            categories = cursor.fetchall()
-            for idx, cat in enumerate(categories):
-                cursor.execute("""
-                    INSERT INTO user_analytics 
-                    (user_id, metric_name, metric_value, period_start, period_end, created_at)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """, (user_id, f"popular_category_{idx+1}", cat['category_count'],
-                     period_start, period_end, now.isoformat()))
+            if response_stats['responses']:
+                metrics['avg_response_time'] = response_stats['response_time_total'] / response_stats['responses']
             
-            conn.commit()
+            return metrics
             
         finally:
             conn.close()
     
     @staticmethod
     def get_job_recommendations(user_id):
-        """Get personalized job recommendations for a user"""
-        conn = get_db()
-        cursor = conn.cursor()
-        
-        try:
-            # Get user preferences and history
-            cursor.execute("""
-                SELECT u.*, 
-                       GROUP_CONCAT(DISTINCT c.name) as certifications,
-                       GROUP_CONCAT(DISTINCT wh.trade_category) as experience_categories
-                FROM users u
-                LEFT JOIN certifications c ON u.user_id = c.user_id
-                LEFT JOIN work_history wh ON u.user_id = wh.user_id
-                WHERE u.user_id = ?
-                GROUP BY u.user_id
-            """, (user_id,))
-            
-            user = cursor.fetchone()
-            if not user:
-                return []
-            
-            # Build recommendation query
-            query = """
-                SELECT j.*, u.company_name, u.name as poster_name,
-                       COUNT(DISTINCT a.application_id) as application_count
-                FROM jobs j
-                JOIN users u ON j.job_poster_id = u.user_id
-                LEFT JOIN applications a ON j.job_id = a.job_id
-                WHERE j.status = 'Open'
-                AND (SELECT COUNT(*) FROM applications WHERE job_id = j.job_id) < j.workers_needed
-            """
-            params = []
-            
-            # Match trade categories from experience
-            if user['experience_categories']:
-                categories = user['experience_categories'].split(",")
-                placeholders = ",".join("?" * len(categories))
-                query += f" AND j.trade_category IN ({placeholders})"
-                params.extend(categories)
-            
-            # Match required certifications
-            if user['certifications']:
-                query += " AND j.requirements LIKE ?"
-                params.append(f"%{user['certifications']}%")
-            
-            # Group and order
-            query += """ 
-                GROUP BY j.job_id
-                ORDER BY j.created_at DESC
-                LIMIT 10
-            """
-            
-            cursor.execute(query, params)
-            jobs = cursor.fetchall()
-            
-            # Calculate match scores and sort
-            scored_jobs = []
-            for job in jobs:
-                score = 0
-                
-                # Location score
-                if user['latitude'] and user['longitude'] and job['latitude'] and job['longitude']:
-                    distance = calculate_distance(
-                        user['latitude'], user['longitude'],
-                        job['latitude'], job['longitude']
-                    )
-                    score += max(0, 100 - distance)  # Higher score for closer jobs
-                
-                # Experience match score
-                if user['experience_categories'] and job['trade_category'] in user['experience_categories']:
-                    score += 50
-                
-                # Certification match score
-                if user['certifications'] and job['requirements']:
-                    user_certs = set(user['certifications'].split(','))
-                    required_certs = set(cert.strip() for cert in job['requirements'].split(','))
-                    matching_certs = user_certs.intersection(required_certs)
-                    score += len(matching_certs) * 25
-                
-                # Payment score
-                if job['payment_amount']:
-                    score += min(50, job['payment_amount'] / 100)
-                
-                job['match_score'] = score
-                scored_jobs.append(job)
-            
-            # Sort by match score
-            scored_jobs.sort(key=lambda x: x['match_score'], reverse=True)
-            return scored_jobs
-            
-        finally:
-            conn.close()
+        """Get personalized job recommendations for a user (see utils.recommendations)"""
+        return recommend_jobs(user_id)
     
     @staticmethod
-    def get_analytics_dashboard(user_id):
-        """Get analytics dashboard data for premium users"""
+    def get_analytics_dashboard(user_id, days=30):
+        """
+        Get analytics dashboard data for premium users.
+
+        Every figure is summed from the daily rollup tables, so the cost
+        grows with the number of days in the window, not with activity.
+        """
         conn = get_db()
         cursor = conn.cursor()
         
         try:
-            now = datetime.now()
-            period_start = (now - timedelta(days=30)).isoformat()
+            start = AnalyticsManager._window_start(days)
             
             dashboard = {
                 'application_stats': {},
@@ -189,70 +77,62 @@ class AnalyticsManager:
                 'success_rate_trend': []
             }
             
-            # Get latest application stats
+            # Application stats and per-day success rate trend
             cursor.execute("""
-                SELECT metric_name, metric_value
-                FROM user_analytics
-                WHERE user_id = ?
-                AND metric_name = 'application_success_rate'
-                AND created_at > ?
-                ORDER BY created_at DESC
-                LIMIT 1
-            """, (user_id, period_start))
-            
-            success_rate = cursor.fetchone()
-            if success_rate:
-                dashboard['application_stats']['success_rate'] = success_rate['metric_value']
+                SELECT day, applications, accepted
+                FROM daily_seeker_stats
+                WHERE user_id = ? AND day >= ?
+                ORDER BY day ASC
+            """, (user_id, start))
+            
+            seeker_days = cursor.fetchall()
+            total = sum(d['applications'] for d in seeker_days)
+            accepted = sum(d['accepted'] for d in seeker_days)
+            if total:
+                dashboard['application_stats'] = {
+                    'total_applications': total,
+                    'accepted_applications': accepted,
+                    'success_rate': accepted / total * 100
+                }
+            dashboard['success_rate_trend'] = [
+                {'date': d['day'], 'rate': d['accepted'] / d['applications'] * 100}
+                for d in seeker_days if d['applications']
+            ]
             
-            # Get response time metrics
+            # Response time metrics
             cursor.execute("""
-                SELECT metric_name, metric_value
-                FROM user_analytics
-                WHERE user_id = ?
-                AND metric_name = 'avg_response_time'
-                AND created_at > ?
-                ORDER BY created_at DESC
-                LIMIT 1
-            """, (user_id, period_start))
-            
-            response_time = cursor.fetchone()
-            if response_time:
-                dashboard['response_metrics']['avg_response_time'] = response_time['metric_value']
-            
-            # Get popular categories
+                SELECT SUM(applications) as applications_received,
+                       SUM(responses) as responses,
+                       SUM(response_time_total) as response_time_total
+                FROM daily_poster_stats
+                WHERE user_id = ? AND day >= ?
+            """, (user_id, start))
+            
+            poster_stats = cursor.fetchone()
+            if poster_stats['responses']:
+                dashboard['response_metrics'] = {
+                    'applications_received': poster_stats['applications_received'],
+                    'responses': poster_stats['responses'],
+                    'avg_response_time': poster_stats['response_time_total'] / poster_stats['responses']
+                }
+            
+            # Popular categories among open jobs posted in the window
             cursor.execute("""
-                SELECT metric_name, metric_value
-                FROM user_analytics
-                WHERE user_id = ?
-                AND metric_name LIKE 'popular_category_%'
-                AND created_at > ?
-                ORDER BY metric_value DESC
-            """, (user_id, period_start))
+                SELECT trade_category, SUM(open_jobs) as category_count
+                FROM daily_category_stats
+                WHERE day >= ?
+                GROUP BY trade_category
+                HAVING category_count > 0
+                ORDER BY category_count DESC
+                LIMIT 5
+            """, (start,))
             
-            categories = cursor.fetchall()
             dashboard['popular_categories'] = [
-                {'category': cat['metric_name'].replace('popular_category_', ''),
-                 'count': cat['metric_value']}
-                for cat in categories
-            ]
-            
-            # Get success rate trend
-            cursor.execute("""
-                SELECT metric_value, period_start
-                FROM user_analytics
-                WHERE user_id = ?
-                AND metric_name = 'application_success_rate'
-                AND created_at > ?
-                ORDER BY period_start ASC
-            """, (user_id, period_start))
-            
-            trend = cursor.fetchall()
-            dashboard['success_rate_trend'] = [
-                {'date': t['period_start'], 'rate': t['metric_value']}
-                for t in trend
+                {'category': cat['trade_category'], 'count': cat['category_count']}
+                for cat in cursor.fetchall()
             ]
             
             return dashboard
             
         finally:
-            conn.close() 
\ No newline at end of file
+            conn.close()
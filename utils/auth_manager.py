@@ -1,15 +1,16 @@
 import streamlit as st
 import sqlite3
-import bcrypt
 import logging
 from datetime import datetime
 from utils.database import get_db, create_or_update_user
+from utils import passwords
+from utils.passwords import PasswordHashingBusy
+from utils.session_token import issue_session_token, needs_refresh, read_session_token
 from config import ADMIN_PASSWORD_HASH
 import os
 import json
 from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import Flow
-from googleapiclient.discovery import build
+from utils.google_clients import fetch_userinfo, oauth_flow, timed
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -73,11 +74,23 @@ class AuthManager:
                 st.error(f"Your account is not registered as a {role}")
                 return False
             
+            # Upgrade the stored hash if BCRYPT_ROUNDS changed since it was
+            # made; hashed before the first UPDATE so bcrypt never runs while
+            # this connection holds the write lock
+            new_hash = None
+            if passwords.needs_rehash(user['password']):
+                new_hash = AuthManager.hash_password(password)
+            
             # Update last login
             cursor.execute(
                 "UPDATE users SET last_login = ? WHERE user_id = ?",
                 (datetime.now().isoformat(), user['user_id'])
             )
+            if new_hash:
+                cursor.execute(
+                    "UPDATE users SET password = ? WHERE user_id = ?",
+                    (new_hash, user['user_id'])
+                )
             conn.commit()
             
             # Set session state
@@ -93,6 +106,11 @@ class AuthManager:
             logger.info(f"User logged in successfully: {email}")
             return True
             
+        except PasswordHashingBusy:
+            logger.warning(f"Login deferred, password hashing saturated: {email}")
+            st.error("Too many sign-ins right now, please try again in a moment")
+            return False
+            
         except Exception as e:
             logger.error(f"Login error: {str(e)}")
             st.error("An error occurred during login")
@@ -145,7 +163,7 @@ class AuthManager:
                 """, (
                     name, 
                     email, 
-                    password,
+                    AuthManager.hash_password(password),
                     role, 
                     datetime.now().isoformat(),
                     name if role == 'Job Poster' else None,
@@ -187,7 +205,7 @@ class AuthManager:
     
     def get_google_auth_url(self, role):
         """Get Google OAuth URL for the specified role"""
-        flow = Flow.from_client_config(
+        flow = oauth_flow(
             self.client_config,
             scopes=self.SCOPES,
             redirect_uri=self.client_config['web']['redirect_uris'][0]
@@ -208,19 +226,19 @@ class AuthManager:
     def handle_google_callback(self, auth_response):
         """Handle Google OAuth callback and create/update user"""
         try:
-            flow = Flow.from_client_config(
+            flow = oauth_flow(
                 self.client_config,
                 scopes=self.SCOPES,
                 redirect_uri=self.client_config['web']['redirect_uris'][0]
             )
             
             # Get credentials from callback
-            flow.fetch_token(authorization_response=auth_response)
+            with timed("Google token exchange"):
+                flow.fetch_token(authorization_response=auth_response)
             credentials = flow.credentials
             
             # Get user info from Google
-            service = build('oauth2', 'v2', credentials=credentials)
-            user_info = service.userinfo().get().execute()
+            user_info = fetch_userinfo(credentials)
             
             # Get role from session state
             role = st.session_state.get('pending_role', 'Job Seeker')
@@ -238,6 +256,7 @@ class AuthManager:
                 'client_secret': credentials.client_secret,
                 'scopes': credentials.scopes
             }
+            st.session_state['session_token'] = issue_session_token(user['user_id'])
             
             # Clear pending role
             if 'pending_role' in st.session_state:
@@ -250,25 +269,35 @@ class AuthManager:
             return False
     
     def restore_session(self):
-        """Restore user session from stored credentials"""
+        """
+        Restore user session from stored credentials.
+        
+        A valid signed session token is enough; Google userinfo is only
+        called (and a new token issued) when it is missing or near expiry.
+        """
         try:
             if 'credentials' in st.session_state:
-                credentials = Credentials(**st.session_state['credentials'])
-                
-                if credentials and not credentials.expired:
-                    service = build('oauth2', 'v2', credentials=credentials)
-                    user_info = service.userinfo().get().execute()
-                    
-                    # Get user from database
-                    conn = get_db()
-                    cursor = conn.cursor()
-                    cursor.execute("SELECT * FROM users WHERE user_id = ?", (user_info['id'],))
-                    user = cursor.fetchone()
-                    conn.close()
+                claims = read_session_token(st.session_state.get('session_token'))
+                if claims is not None and not needs_refresh(claims):
+                    user_id = claims['sub']
+                else:
+                    credentials = Credentials(**st.session_state['credentials'])
+                    if not credentials or credentials.expired:
+                        return False
                     
-                    if user:
-                        st.session_state['user'] = dict(user)
-                        return True
+                    user_id = fetch_userinfo(credentials)['id']
+                    st.session_state['session_token'] = issue_session_token(user_id)
+                
+                # Get user from database
+                conn = get_db()
+                cursor = conn.cursor()
+                cursor.execute("SELECT * FROM users WHERE user_id = ?", (user_id,))
+                user = cursor.fetchone()
+                conn.close()
+                
+                if user:
+                    st.session_state['user'] = dict(user)
+                    return True
             
             return False
             
@@ -282,6 +311,8 @@ class AuthManager:
             del st.session_state['user']
         if 'credentials' in st.session_state:
             del st.session_state['credentials']
+        if 'session_token' in st.session_state:
+            del st.session_state['session_token']
         if 'pending_role' in st.session_state:
             del st.session_state['pending_role']
 
@@ -312,13 +343,13 @@ class AuthManager:
 
     @staticmethod
     def verify_password(password, hashed_password):
-        """Verify a password against its hash"""
-        return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+        """Verify a password against its hash (on the bcrypt worker pool)"""
+        return passwords.verify_password(password, hashed_password)
 
     @staticmethod
     def hash_password(password):
-        """Hash a password using bcrypt"""
-        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        """Hash a password using bcrypt (on the bcrypt worker pool)"""
+        return passwords.hash_password(password)
 
     @staticmethod
     def create_user(name, email, password, role, company_name=None, company_description=None):
@@ -351,6 +382,14 @@ class AuthManager:
             user = cursor.fetchone()
             
             if user and AuthManager.verify_password(password, user['password']):
+                # Upgrade the stored hash if BCRYPT_ROUNDS changed since it was made
+                if passwords.needs_rehash(user['password']):
+                    new_hash = AuthManager.hash_password(password)
+                    cursor.execute(
+                        "UPDATE users SET password = ? WHERE user_id = ?",
+                        (new_hash, user['user_id'])
+                    )
+                    conn.commit()
                 return user
             return None
         except Exception as e:
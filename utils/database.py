@@ -1,98 +1,210 @@
 import sqlite3
 import logging
 import os
+import re
+import atexit
+import threading
+import time
+from contextlib import contextmanager
+from functools import partial
 from datetime import datetime
-from config import ADMIN_PASSWORD_HASH
+from config import ADMIN_PASSWORD_HASH, DB_POOL_SIZE, DB_PRAGMAS, DB_CHECKPOINT_INTERVAL
 import secrets
+import sys
+from utils.geo import bbox_filter, geohash_encode, register_sql_functions
+from utils.tags import pack_tags, parse_tags, tag_map
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Resolved once at import instead of on every get_db() call
+DB_PATH = os.getenv(
+    'WORKIFY_DB_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), 'workify.db')
+)
+
 def dict_factory(cursor, row):
     """Convert database row objects into dictionaries"""
     fields = [column[0] for column in cursor.description]
     return {key: value for key, value in zip(fields, row)}
 
+def apply_pragmas(conn):
+    """Apply the configured DB_PRAGMAS profile to a new connection"""
+    for name, value in DB_PRAGMAS.items():
+        result = conn.execute(f"PRAGMA {name} = {value}").fetchone()
+        if name == 'journal_mode' and result and str(result[0]).lower() != str(value).lower():
+            logger.warning(f"Could not switch journal_mode to {value}, using {result[0]}")
+
+def checkpoint_wal(conn, mode='PASSIVE'):
+    """Checkpoint the WAL file; mode is PASSIVE, FULL, RESTART or TRUNCATE"""
+    if mode not in ('PASSIVE', 'FULL', 'RESTART', 'TRUNCATE'):
+        raise ValueError(f"Invalid checkpoint mode: {mode}")
+    return conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3 connection whose close() hands it back to the pool.
+
+    Callers keep using the familiar get_db() / conn.close() pattern; the
+    connection is only really closed when the pool is full or shut down.
+    """
+
+    def close(self):
+        _pool.release(self)
+
+    def _close(self):
+        super().close()
+
+class ConnectionPool:
+    """Bounded pool of SQLite connections shared by all script runs.
+
+    Streamlit executes every rerun on a fresh thread, so a thread-local cache
+    would never be reused across reruns. Instead idle connections live in a
+    process-wide LIFO stack (most recently used first, keeping its page cache
+    warm) and are checked out exclusively, which is why they are opened with
+    check_same_thread=False.
+    """
+
+    def __init__(self, db_path, max_idle=DB_POOL_SIZE, checkpoint_interval=DB_CHECKPOINT_INTERVAL):
+        self.db_path = db_path
+        self.max_idle = max_idle
+        self.checkpoint_interval = checkpoint_interval
+        self._last_checkpoint = time.monotonic()
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.db_path,
+            factory=PooledConnection,
+            check_same_thread=False
+        )
+        apply_pragmas(conn)
+        register_sql_functions(conn)
+        conn.row_factory = dict_factory
+        return conn
+
+    def acquire(self):
+        """Check out an idle connection or open a new one"""
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        conn = conn or self._connect()
+        conn.checked_out = True
+        return conn
+
+    def release(self, conn):
+        """Return a connection, discarding any uncommitted work like close() would"""
+        # Ignore a second close() so it cannot touch a connection that has
+        # already been handed to someone else
+        with self._lock:
+            if not getattr(conn, 'checked_out', False):
+                return
+            conn.checked_out = False
+
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = dict_factory
+            self._maybe_checkpoint(conn)
+        except sqlite3.Error:
+            conn._close()
+            return
+
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn._close()
+
+    def _maybe_checkpoint(self, conn):
+        """Run a passive WAL checkpoint at most once per checkpoint_interval.
+
+        wal_autocheckpoint already bounds the WAL during writes; this keeps it
+        from lingering when readers hold it open under steady traffic.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_checkpoint < self.checkpoint_interval:
+                return
+            self._last_checkpoint = now
+        checkpoint_wal(conn, 'PASSIVE')
+
+    def close_all(self):
+        """Really close every idle connection, truncating the WAL first"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        if idle:
+            try:
+                checkpoint_wal(idle[0], 'TRUNCATE')
+            except sqlite3.Error as e:
+                logger.warning(f"WAL checkpoint on shutdown failed: {str(e)}")
+        for conn in idle:
+            conn._close()
+
+_pool = ConnectionPool(DB_PATH)
+atexit.register(_pool.close_all)
+
 def get_db():
-    """Get a database connection"""
-    db_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'workify.db')
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = dict_factory
-    return conn
+    """Get a database connection from the pool; close() returns it"""
+    return _pool.acquire()
+
+@contextmanager
+def db_connection():
+    """Context manager yielding a pooled connection.
+
+    Commits on success, rolls back on error and always returns the
+    connection to the pool.
+    """
+    conn = get_db()
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
 
 def migrate_database():
-    """Perform database migrations to update the schema"""
+    """Bring the schema up to SCHEMA_VERSION; a no-op once it is current.
+
+    Returns the list of applied migration versions, or None on error.
+    """
     conn = get_db()
-    cursor = conn.cursor()
     
     try:
-        # Check if postal_code column exists in users table
-        cursor.execute("PRAGMA table_info(users)")
-        columns = cursor.fetchall()
-        column_names = [col['name'] for col in columns]
-        
-        # Add postal_code column if it doesn't exist
-        if 'postal_code' not in column_names:
-            print("Adding postal_code column to users table")
-            cursor.execute("ALTER TABLE users ADD COLUMN postal_code TEXT")
-            conn.commit()
-            print("Migration completed successfully")
-        
-        # Check if postal_code column exists in jobs table
-        cursor.execute("PRAGMA table_info(jobs)")
-        job_columns = cursor.fetchall()
-        job_column_names = [col['name'] for col in job_columns]
-        
-        # Add postal_code column to jobs table if it doesn't exist
-        if 'postal_code' not in job_column_names:
-            print("Adding postal_code column to jobs table")
-            cursor.execute("ALTER TABLE jobs ADD COLUMN postal_code TEXT")
-            conn.commit()
-            print("Jobs table migration completed successfully")
+        applied = apply_migrations(conn)
+        if applied:
+            print(f"Applied schema migrations: {', '.join(map(str, applied))}")
             
-        # Check if job_latitude and job_longitude columns exist in jobs table
-        if 'job_latitude' not in job_column_names:
-            print("Adding job_latitude column to jobs table")
-            cursor.execute("ALTER TABLE jobs ADD COLUMN job_latitude REAL")
-            conn.commit()
-        
-        if 'job_longitude' not in job_column_names:
-            print("Adding job_longitude column to jobs table")
-            cursor.execute("ALTER TABLE jobs ADD COLUMN job_longitude REAL")
-            conn.commit()
-            print("Location coordinates columns added to jobs table")
-            
-        # Check if is_remote column exists in jobs table
-        if 'is_remote' not in job_column_names:
-            print("Adding is_remote column to jobs table")
-            cursor.execute("ALTER TABLE jobs ADD COLUMN is_remote INTEGER DEFAULT 0")
-            conn.commit()
-            print("Remote job flag added to jobs table")
+            # Verify the hot query plans against the new schema
+            for label, detail in check_query_plans(conn):
+                logger.warning(f"Hot query '{label}' uses a full scan: {detail}")
+        return applied
     except Exception as e:
         print(f"Error during migration: {str(e)}")
+        return None
     finally:
         conn.close()
 
+# app.py calls init_db() on every Streamlit rerun; only the first call per
+# process needs to look at the database
+_initialized = False
+_init_lock = threading.Lock()
+
 def init_db():
     """Initialize database tables if they don't exist"""
-    conn = get_db()
-    cursor = conn.cursor()
+    global _initialized
+    if _initialized:
+        return
     
-    try:
-        create_tables(conn)
-        
-        conn.commit()
+    with _init_lock:
+        if _initialized:
+            return
         
-        # Run migrations to update schema if needed
-        migrate_database()
-        
-        print("Database initialized successfully")
-        
-    except Exception as e:
-        print(f"Error initializing database: {str(e)}")
-    finally:
-        conn.close()
+        if migrate_database() is not None:
+            _initialized = True
+            print("Database initialized successfully")
 
 def create_tables(conn):
     """Create database tables if they don't exist"""
@@ -219,13 +331,1046 @@ def create_tables(conn):
             )
         """)
         
-        conn.commit()
         logger.info("Database tables created successfully")
         
     except Exception as e:
         logging.error(f"Error creating tables: {str(e)}")
         raise
 
+# Secondary indexes for the hot query paths in pages/*.py and utils/*.py.
+# Each entry is (index name, table, columns); an index is skipped when its
+# table or one of its columns does not exist in the current schema. Every
+# migration that adds indexes owns a fixed list, so what a migration does
+# never changes once it has shipped; add new indexes in a new list.
+CORE_INDEXES = [
+    # Open-job listings ordered by recency (landing, dashboard job search)
+    ('idx_jobs_status_created', 'jobs', ('status', 'created_at')),
+    # Poster listings and monthly posting limits
+    ('idx_jobs_poster_created', 'jobs', ('job_poster_id', 'created_at')),
+    # Seeker applications, monthly application limits and recent activity
+    ('idx_applications_applicant_created', 'applications', ('applicant_id', 'created_at')),
+    # Per-job applicant counts and "already applied" checks
+    ('idx_applications_job_applicant', 'applications', ('job_id', 'applicant_id')),
+    # Poster-side application lists and response-time analytics
+    ('idx_applications_poster_created', 'applications', ('job_poster_id', 'created_at')),
+    # Conversation threads between two users
+    ('idx_messages_pair_created', 'messages', ('sender_id', 'receiver_id', 'created_at')),
+    # Unread badges, optionally per sender
+    ('idx_messages_receiver_unread', 'messages', ('receiver_id', 'is_read', 'sender_id')),
+    ('idx_notifications_user_unread', 'notifications', ('user_id', 'is_read', 'created_at')),
+    ('idx_reviews_reviewed_created', 'reviews', ('reviewed_id', 'created_at')),
+    ('idx_reviews_reviewer_reviewed', 'reviews', ('reviewer_id', 'reviewed_id')),
+    ('idx_subscriptions_user_status', 'subscriptions', ('user_id', 'status', 'created_at')),
+    ('idx_users_role_postal', 'users', ('role', 'postal_code')),
+    ('idx_job_alerts_user_active', 'job_alerts', ('user_id', 'is_active')),
+    ('idx_work_history_user', 'work_history', ('user_id',)),
+    ('idx_certifications_user', 'certifications', ('user_id',)),
+    ('idx_background_checks_user_created', 'background_checks', ('user_id', 'created_at')),
+]
+
+# Geohash prefix lookups for "near this postal code"
+GEOHASH_INDEXES = [
+    ('idx_users_role_geohash', 'users', ('role', 'geohash')),
+    ('idx_jobs_geohash', 'jobs', ('geohash',)),
+]
+
+# Admin listings paged by (created_at, id) keyset
+LISTING_INDEXES = [
+    ('idx_jobs_created', 'jobs', ('created_at',)),
+    ('idx_users_created', 'users', ('created_at', 'user_id')),
+    ('idx_applications_created', 'applications', ('created_at',)),
+]
+
+# Messages inbox, most recent conversation first
+CONVERSATION_INDEXES = [
+    ('idx_conversations_user_last', 'conversations', ('user_id', 'last_at')),
+]
+
+# Thread pages by message_id (the rowid rides along as the last key column)
+THREAD_INDEXES = [
+    ('idx_messages_pair', 'messages', ('sender_id', 'receiver_id')),
+]
+
+# Email outbox: due emails, and pending digest parts of one recipient
+EMAIL_OUTBOX_INDEXES = [
+    ('idx_email_outbox_due', 'email_outbox', ('status', 'next_attempt_at')),
+    ('idx_email_outbox_digest', 'email_outbox', ('to_email', 'digest_key', 'status')),
+]
+
+# Popular categories over a window of days
+ANALYTICS_INDEXES = [
+    ('idx_daily_category_stats_day', 'daily_category_stats', ('day', 'trade_category')),
+]
+
+# Recommendation candidates by trade category
+RECOMMENDATION_INDEXES = [
+    ('idx_jobs_status_category_created', 'jobs', ('status', 'trade_category', 'created_at')),
+]
+
+HOT_INDEXES = (
+    CORE_INDEXES + GEOHASH_INDEXES + LISTING_INDEXES + CONVERSATION_INDEXES + THREAD_INDEXES
+    + EMAIL_OUTBOX_INDEXES + ANALYTICS_INDEXES + RECOMMENDATION_INDEXES
+)
+
+# Representative hot queries that must be served by an index. Each entry is
+# (label, sql, params); parameters only need the right arity.
+HOT_QUERIES = [
+    ('open jobs by recency', """
+        SELECT j.*, u.name FROM jobs j JOIN users u ON j.job_poster_id = u.user_id
+        WHERE j.status = 'Open' ORDER BY j.created_at DESC LIMIT 5
+    """, ()),
+    ('open jobs page after cursor', """
+        SELECT j.* FROM jobs j
+        WHERE j.status = 'Open' AND (j.created_at, j.job_id) < (?, ?)
+        ORDER BY j.created_at DESC, j.job_id DESC LIMIT 11
+    """, ('', 0)),
+    ('admin users page', """
+        SELECT u.* FROM users u
+        WHERE (u.created_at, u.user_id) < (?, ?)
+        ORDER BY u.created_at DESC, u.user_id DESC LIMIT 11
+    """, ('', '')),
+    ('admin applications page', """
+        SELECT a.* FROM applications a
+        WHERE (a.created_at, a.application_id) < (?, ?)
+        ORDER BY a.created_at DESC, a.application_id DESC LIMIT 11
+    """, ('', 0)),
+    ('poster jobs in last 30 days', """
+        SELECT COUNT(*) FROM jobs WHERE job_poster_id = ? AND created_at >= ?
+    """, ('', '')),
+    ('seeker applications', """
+        SELECT a.*, j.title FROM applications a JOIN jobs j ON a.job_id = j.job_id
+        WHERE a.applicant_id = ? ORDER BY a.created_at DESC
+    """, ('',)),
+    ('applicants per job', """
+        SELECT COUNT(*) FROM applications WHERE job_id = ?
+    """, (0,)),
+    ('existing application', """
+        SELECT * FROM applications WHERE applicant_id = ? AND job_id = ?
+    """, ('', 0)),
+    ('poster applications', """
+        SELECT * FROM applications WHERE job_poster_id = ? AND created_at BETWEEN ? AND ?
+    """, ('', '', '')),
+    ('conversation thread', """
+        SELECT * FROM messages
+        WHERE (sender_id = ? AND receiver_id = ?) OR (sender_id = ? AND receiver_id = ?)
+        ORDER BY created_at ASC
+    """, ('', '', '', '')),
+    ('thread page before id', """
+        SELECT message_id FROM messages
+        WHERE sender_id = ? AND receiver_id = ? AND message_id < ?
+        ORDER BY message_id DESC LIMIT 50
+    """, ('', '', 0)),
+    ('messages inbox', """
+        SELECT c.*, u.name FROM conversations c JOIN users u ON u.user_id = c.other_user_id
+        WHERE c.user_id = ? ORDER BY c.last_at DESC LIMIT 50
+    """, ('',)),
+    ('unread messages from sender', """
+        SELECT COUNT(*) FROM messages WHERE receiver_id = ? AND sender_id = ? AND is_read = 0
+    """, ('', '')),
+    ('unread notifications', """
+        SELECT COUNT(*) FROM notifications WHERE user_id = ? AND is_read = 0
+    """, ('',)),
+    ('reviews received', """
+        SELECT * FROM reviews WHERE reviewed_id = ? ORDER BY created_at DESC
+    """, ('',)),
+    ('active subscription', """
+        SELECT plan_id, status FROM subscriptions
+        WHERE user_id = ? AND status = 'active' ORDER BY created_at DESC LIMIT 1
+    """, ('',)),
+    ('seekers by postal code', """
+        SELECT user_id FROM users WHERE role = ? AND postal_code = ?
+    """, ('', '')),
+    ('seekers in geohash cells', """
+        SELECT user_id FROM users
+        WHERE role = ? AND ((geohash >= ? AND geohash < ?) OR (geohash >= ? AND geohash < ?))
+    """, ('', '', '', '', '')),
+    ('jobs pending tag refresh', """
+        SELECT job_id, requirements FROM jobs WHERE tags_pending = 1
+    """, ()),
+]
+
+def get_table_columns(conn, table):
+    """Return the set of column names of a table (empty if it does not exist)"""
+    return {col['name'] for col in conn.execute(f"PRAGMA table_info({table})").fetchall()}
+
+def create_indexes(conn, indexes=HOT_INDEXES):
+    """Create any missing indexes of a list and refresh planner statistics"""
+    cursor = conn.cursor()
+    columns_by_table = {}
+    
+    for name, table, columns in indexes:
+        if table not in columns_by_table:
+            columns_by_table[table] = get_table_columns(conn, table)
+        
+        missing = set(columns) - columns_by_table[table]
+        if missing:
+            logger.info(f"Skipping index {name}: {table} lacks {', '.join(sorted(missing))}")
+            continue
+        
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})")
+    
+    # Let SQLite refresh stats for tables whose indexes changed
+    cursor.execute("PRAGMA optimize")
+
+def _schema_copy(conn):
+    """Copy tables and indexes (but no data or sqlite_stat1) into memory.
+
+    Without statistics the planner picks an index whenever one is usable, so
+    plans reflect the schema rather than how many rows a table happens to have.
+    """
+    schema = sqlite3.connect(':memory:')
+    schema.row_factory = dict_factory
+    
+    rows = conn.execute("""
+        SELECT sql FROM sqlite_master
+        WHERE type IN ('table', 'index') AND sql IS NOT NULL
+        AND name NOT LIKE 'sqlite_%'
+    """).fetchall()
+    
+    for row in rows:
+        try:
+            schema.execute(row['sql'])
+        except sqlite3.OperationalError:
+            pass  # e.g. shadow tables already created by their virtual table
+    
+    return schema
+
+def check_query_plans(conn):
+    """Run EXPLAIN QUERY PLAN over HOT_QUERIES and report full table scans.
+
+    Returns a list of (label, plan detail) tuples, one per offending step.
+    Queries that cannot be prepared against the current schema are skipped.
+    """
+    offenders = []
+    schema = _schema_copy(conn)
+    
+    for label, sql, params in HOT_QUERIES:
+        try:
+            plan = schema.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+        except sqlite3.OperationalError as e:
+            logger.info(f"Skipping plan check for '{label}': {str(e)}")
+            continue
+        
+        for step in plan:
+            detail = step['detail']
+            # "SCAN t" without "USING ..." is a full table scan
+            if detail.startswith('SCAN ') and ' USING ' not in detail:
+                offenders.append((label, detail))
+    
+    schema.close()
+    return offenders
+
+def assert_query_plans(conn):
+    """Raise if any hot query falls back to a full table scan"""
+    offenders = check_query_plans(conn)
+    if offenders:
+        details = '; '.join(f"{label}: {detail}" for label, detail in offenders)
+        raise RuntimeError(f"Hot queries fall back to full scans: {details}")
+
+def _add_column_if_missing(conn, table, column, definition):
+    """ALTER TABLE ADD COLUMN unless the column already exists"""
+    if column not in get_table_columns(conn, table):
+        logger.info(f"Adding {column} column to {table} table")
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+def _add_location_columns(conn):
+    """Location and core columns missing from databases created by create_tables"""
+    _add_column_if_missing(conn, 'users', 'postal_code', 'TEXT')
+    _add_column_if_missing(conn, 'users', 'latitude', 'REAL')
+    _add_column_if_missing(conn, 'users', 'longitude', 'REAL')
+    _add_column_if_missing(conn, 'users', 'password', 'TEXT')
+    _add_column_if_missing(conn, 'jobs', 'postal_code', 'TEXT')
+    _add_column_if_missing(conn, 'jobs', 'job_latitude', 'REAL')
+    _add_column_if_missing(conn, 'jobs', 'job_longitude', 'REAL')
+    _add_column_if_missing(conn, 'jobs', 'is_remote', 'INTEGER DEFAULT 0')
+    _add_column_if_missing(conn, 'jobs', 'workers_needed', 'INTEGER DEFAULT 1')
+
+def _create_full_schema(conn):
+    """Tables only defined by utils/db_migration.py (notifications, job_alerts, ...)"""
+    from utils.db_migration import create_schema
+    create_schema(conn)
+
+def _add_premium_columns(conn):
+    """Premium, profile and messaging columns from utils/db_migration.py"""
+    from utils.db_migration import add_premium_columns
+    add_premium_columns(conn)
+
+# R*Tree spatial indexes over user and job coordinates as (index, table, key,
+# id table, latitude column, longitude column). Each point is stored as a
+# degenerate box keyed by an integer id: jobs.job_id, or for users (whose
+# TEXT primary key leaves rowids free to be renumbered by VACUUM) a stable
+# geo_id from the id table. Triggers keep both in sync, so every write path
+# (pages, utils, migrations) is covered.
+SPATIAL_INDEXES = [
+    ('users_geo', 'users', 'user_id', 'user_geo_ids', 'latitude', 'longitude'),
+    ('jobs_geo', 'jobs', 'job_id', None, 'job_latitude', 'job_longitude'),
+]
+
+def _spatial_id(key, id_table, row):
+    """SQL expression for the R*Tree id of {row} (NEW, OLD or the table name)"""
+    if id_table is None:
+        return f"{row}.{key}"
+    return f"(SELECT geo_id FROM {id_table} WHERE {key} = {row}.{key})"
+
+def _create_spatial_indexes(conn):
+    """Create the R*Tree spatial indexes, their sync triggers and backfill them"""
+    for index, table, key, id_table, lat, lon in SPATIAL_INDEXES:
+        try:
+            conn.execute(f"""
+                CREATE VIRTUAL TABLE IF NOT EXISTS {index}
+                USING rtree(id, min_lat, max_lat, min_lon, max_lon)
+            """)
+        except sqlite3.OperationalError as e:
+            # SQLite built without R*Tree: radius searches use plain columns
+            logger.warning(f"Skipping spatial index {index}: {str(e)}")
+            return
+        
+        assign_id = ""
+        if id_table:
+            # INTEGER PRIMARY KEY: the geo_id is the rowid, which VACUUM keeps
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {id_table} (
+                    geo_id INTEGER PRIMARY KEY,
+                    {key} TEXT NOT NULL UNIQUE
+                )
+            """)
+            assign_id = f"INSERT OR IGNORE INTO {id_table} ({key}) VALUES (NEW.{key});"
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {index}_rekey AFTER UPDATE OF {key} ON {table}
+                BEGIN
+                    UPDATE {id_table} SET {key} = NEW.{key} WHERE {key} = OLD.{key};
+                END
+            """)
+        
+        new_id = _spatial_id(key, id_table, 'NEW')
+        old_id = _spatial_id(key, id_table, 'OLD')
+        has_coords = f"NEW.{lat} IS NOT NULL AND NEW.{lon} IS NOT NULL"
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {index}_insert AFTER INSERT ON {table}
+            WHEN {has_coords}
+            BEGIN
+                {assign_id}
+                INSERT OR REPLACE INTO {index}
+                VALUES ({new_id}, NEW.{lat}, NEW.{lat}, NEW.{lon}, NEW.{lon});
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {index}_update AFTER UPDATE OF {lat}, {lon} ON {table}
+            BEGIN
+                {assign_id}
+                DELETE FROM {index} WHERE id = {old_id};
+                INSERT INTO {index}
+                SELECT {new_id}, NEW.{lat}, NEW.{lat}, NEW.{lon}, NEW.{lon}
+                WHERE {has_coords};
+            END
+        """)
+        forget_id = f"DELETE FROM {id_table} WHERE {key} = OLD.{key};" if id_table else ""
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {index}_delete AFTER DELETE ON {table}
+            BEGIN
+                DELETE FROM {index} WHERE id = {old_id};
+                {forget_id}
+            END
+        """)
+    
+    rebuild_spatial_indexes(conn)
+
+def _rekey_spatial_indexes(conn):
+    """Move users_geo from users.rowid to stable user_geo_ids keys"""
+    # Nothing to move when SQLite lacks R*Tree
+    if not get_table_columns(conn, 'users_geo'):
+        return
+    for index, *_ in SPATIAL_INDEXES:
+        for trigger in ('insert', 'update', 'delete'):
+            conn.execute(f"DROP TRIGGER IF EXISTS {index}_{trigger}")
+    _create_spatial_indexes(conn)
+
+def rebuild_spatial_indexes(conn):
+    """Repopulate the spatial indexes from the base tables"""
+    for index, table, key, id_table, lat, lon in SPATIAL_INDEXES:
+        has_coords = f"{lat} IS NOT NULL AND {lon} IS NOT NULL"
+        conn.execute(f"DELETE FROM {index}")
+        if id_table:
+            conn.execute(f"INSERT OR IGNORE INTO {id_table} ({key}) SELECT {key} FROM {table} WHERE {has_coords}")
+        conn.execute(f"""
+            INSERT INTO {index}
+            SELECT {_spatial_id(key, id_table, table)}, {lat}, {lat}, {lon}, {lon} FROM {table}
+            WHERE {has_coords}
+        """)
+
+def has_spatial_index(index):
+    """Whether the R*Tree spatial index exists (per the cached column map)"""
+    return bool(table_columns(index))
+
+def _create_geocode_cache(conn):
+    """Persistent cache for utils/geocoding.py; a NULL result caches a miss"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS geocode_cache (
+            cache_key TEXT PRIMARY KEY,
+            result TEXT,
+            expires_at REAL NOT NULL
+        ) WITHOUT ROWID
+    """)
+
+# Geohash grid columns as (table, key, latitude column, longitude column).
+# A trigger clears geohash whenever the coordinates change and
+# refresh_geohashes() recomputes the cleared rows before grid lookups, so
+# the triggers need no application-defined SQL function.
+GEOHASH_COLUMNS = [
+    ('users', 'user_id', 'latitude', 'longitude'),
+    ('jobs', 'job_id', 'job_latitude', 'job_longitude'),
+]
+
+def _add_geohash_columns(conn):
+    """Geohash columns, their reset triggers and the postal code centroid table"""
+    for table, key, lat, lon in GEOHASH_COLUMNS:
+        _add_column_if_missing(conn, table, 'geohash', 'TEXT')
+        
+        # Small partial index of rows still waiting for a geohash
+        conn.execute(f"""
+            CREATE INDEX IF NOT EXISTS idx_{table}_geohash_pending ON {table} ({key})
+            WHERE geohash IS NULL AND {lat} IS NOT NULL
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_geohash_reset
+            AFTER UPDATE OF {lat}, {lon} ON {table}
+            WHEN NEW.geohash IS NOT NULL
+            BEGIN
+                UPDATE {table} SET geohash = NULL WHERE {key} = NEW.{key};
+            END
+        """)
+    
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS postal_centroids (
+            postal_code TEXT PRIMARY KEY,
+            latitude REAL NOT NULL,
+            longitude REAL NOT NULL,
+            geohash TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        ) WITHOUT ROWID
+    """)
+    
+    create_indexes(conn, GEOHASH_INDEXES)
+    _refresh_geohashes(conn)
+
+def _refresh_geohashes(conn):
+    """Fill geohash for pending rows on an open connection without committing"""
+    updated = 0
+    for table, key, lat, lon in GEOHASH_COLUMNS:
+        rows = conn.execute(f"""
+            SELECT {key} AS id, {lat} AS lat, {lon} AS lon FROM {table}
+            WHERE geohash IS NULL AND {lat} IS NOT NULL AND {lon} IS NOT NULL
+        """).fetchall()
+        if rows:
+            conn.executemany(
+                f"UPDATE {table} SET geohash = ? WHERE {key} = ?",
+                [(geohash_encode(row['lat'], row['lon']), row['id']) for row in rows]
+            )
+            updated += len(rows)
+    return updated
+
+def refresh_geohashes():
+    """Compute geohashes for rows whose coordinates are new or changed.
+
+    Cheap when nothing is pending (one partial-index probe per table).
+    """
+    if not has_column('users', 'geohash'):
+        return 0
+    with db_connection() as conn:
+        return _refresh_geohashes(conn)
+
+# Columns of jobs indexed by the jobs_fts full-text index, in bm25 weight order
+JOB_SEARCH_COLUMNS = ['title', 'description', 'requirements', 'tools_needed', 'trade_category', 'location']
+
+def _create_job_search_index(conn):
+    """FTS5 index over jobs (external content), kept in sync by triggers"""
+    for column in ('requirements', 'tools_needed'):
+        _add_column_if_missing(conn, 'jobs', column, 'TEXT')
+    
+    columns = ', '.join(JOB_SEARCH_COLUMNS)
+    new_values = ', '.join(f"NEW.{column}" for column in JOB_SEARCH_COLUMNS)
+    old_values = ', '.join(f"OLD.{column}" for column in JOB_SEARCH_COLUMNS)
+    
+    try:
+        conn.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS jobs_fts USING fts5(
+                {columns},
+                content='jobs', content_rowid='job_id',
+                tokenize='unicode61 remove_diacritics 2',
+                prefix='2 3'
+            )
+        """)
+    except sqlite3.OperationalError as e:
+        # SQLite built without FTS5: keyword search falls back to LIKE
+        logger.warning(f"Skipping full-text index jobs_fts: {str(e)}")
+        return
+    
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS jobs_fts_insert AFTER INSERT ON jobs
+        BEGIN
+            INSERT INTO jobs_fts (rowid, {columns}) VALUES (NEW.job_id, {new_values});
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS jobs_fts_delete AFTER DELETE ON jobs
+        BEGIN
+            INSERT INTO jobs_fts (jobs_fts, rowid, {columns}) VALUES ('delete', OLD.job_id, {old_values});
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS jobs_fts_update AFTER UPDATE OF {columns} ON jobs
+        BEGIN
+            INSERT INTO jobs_fts (jobs_fts, rowid, {columns}) VALUES ('delete', OLD.job_id, {old_values});
+            INSERT INTO jobs_fts (rowid, {columns}) VALUES (NEW.job_id, {new_values});
+        END
+    """)
+    conn.execute("INSERT INTO jobs_fts (jobs_fts) VALUES ('rebuild')")
+
+def _create_conversations(conn):
+    """Per-user conversation summaries for the Messages inbox, kept in sync by triggers"""
+    # One row per participant: the inbox is a range scan on (user_id, last_at)
+    # and unread_count is what user_id has not yet read from other_user_id
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS conversations (
+            user_id TEXT NOT NULL,
+            other_user_id TEXT NOT NULL,
+            last_message_id INTEGER,
+            last_at TEXT,
+            unread_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, other_user_id)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS conversations_message_insert AFTER INSERT ON messages
+        BEGIN
+            INSERT INTO conversations (user_id, other_user_id, last_message_id, last_at)
+            VALUES (NEW.sender_id, NEW.receiver_id, NEW.message_id, NEW.created_at)
+            ON CONFLICT (user_id, other_user_id) DO UPDATE SET
+                last_message_id = excluded.last_message_id, last_at = excluded.last_at;
+            INSERT INTO conversations (user_id, other_user_id, last_message_id, last_at, unread_count)
+            VALUES (NEW.receiver_id, NEW.sender_id, NEW.message_id, NEW.created_at, IFNULL(NEW.is_read, 0) = 0)
+            ON CONFLICT (user_id, other_user_id) DO UPDATE SET
+                last_message_id = excluded.last_message_id, last_at = excluded.last_at,
+                unread_count = unread_count + excluded.unread_count;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS conversations_message_read AFTER UPDATE OF is_read ON messages
+        WHEN IFNULL(OLD.is_read, 0) != IFNULL(NEW.is_read, 0)
+        BEGIN
+            UPDATE conversations
+            SET unread_count = MAX(unread_count + CASE WHEN NEW.is_read THEN -1 ELSE 1 END, 0)
+            WHERE user_id = NEW.receiver_id AND other_user_id = NEW.sender_id;
+        END
+    """)
+    
+    # Deleting the latest message falls back to the previous one; a
+    # conversation with no messages left is removed
+    pair = """((user_id = OLD.sender_id AND other_user_id = OLD.receiver_id)
+              OR (user_id = OLD.receiver_id AND other_user_id = OLD.sender_id))"""
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS conversations_message_delete AFTER DELETE ON messages
+        BEGIN
+            UPDATE conversations SET unread_count = MAX(unread_count - 1, 0)
+            WHERE user_id = OLD.receiver_id AND other_user_id = OLD.sender_id
+            AND IFNULL(OLD.is_read, 0) = 0;
+            UPDATE conversations SET (last_message_id, last_at) = (
+                SELECT message_id, created_at FROM messages
+                WHERE (sender_id = OLD.sender_id AND receiver_id = OLD.receiver_id)
+                OR (sender_id = OLD.receiver_id AND receiver_id = OLD.sender_id)
+                ORDER BY message_id DESC LIMIT 1
+            )
+            WHERE last_message_id = OLD.message_id AND {pair};
+            DELETE FROM conversations WHERE last_message_id IS NULL AND {pair};
+        END
+    """)
+    
+    create_indexes(conn, CONVERSATION_INDEXES)
+    rebuild_conversations(conn)
+
+def rebuild_conversations(conn):
+    """Recompute every conversation summary from messages (does not commit)"""
+    conn.execute("DELETE FROM conversations")
+    conn.execute("""
+        INSERT INTO conversations (user_id, other_user_id, last_message_id, last_at, unread_count)
+        SELECT g.user_id, g.other_user_id, g.last_message_id, m.created_at, g.unread_count
+        FROM (
+            SELECT p.user_id, p.other_user_id,
+                   MAX(p.message_id) AS last_message_id, SUM(p.unread) AS unread_count
+            FROM (
+                SELECT sender_id AS user_id, receiver_id AS other_user_id, message_id, 0 AS unread
+                FROM messages
+                UNION ALL
+                SELECT receiver_id, sender_id, message_id, IFNULL(is_read, 0) = 0
+                FROM messages WHERE receiver_id != sender_id
+            ) p
+            GROUP BY p.user_id, p.other_user_id
+        ) g
+        JOIN messages m ON m.message_id = g.last_message_id
+    """)
+
+# Per-user unread totals as (counter column, source table, trigger key
+# column, the source's unread delta on insert/delete, WHEN guard for
+# update and the update's delta). Triggers keep unread_counters in step
+# with every write to the source table.
+UNREAD_COUNTER_SOURCES = [
+    ('notifications', 'notifications', 'user_id',
+     "CASE WHEN IFNULL({row}.is_read, 0) = 0 THEN 1 ELSE 0 END",
+     "IFNULL(OLD.is_read, 0) != IFNULL(NEW.is_read, 0)",
+     "CASE WHEN NEW.is_read THEN -1 ELSE 1 END"),
+    # Message totals follow the per-conversation counts, which the
+    # conversations_message_* triggers already maintain
+    ('messages', 'conversations', 'user_id',
+     "{row}.unread_count",
+     "OLD.unread_count != NEW.unread_count",
+     "NEW.unread_count - OLD.unread_count"),
+]
+
+def _bump_unread(counter, user, delta):
+    """Trigger statement adding delta to a counter; a missing row starts at zero and counts never go negative"""
+    return f"""
+        INSERT INTO unread_counters (user_id, {counter}) VALUES ({user}, MAX({delta}, 0))
+        ON CONFLICT (user_id) DO UPDATE SET {counter} = MAX({counter} + ({delta}), 0);
+    """
+
+def _create_unread_counters(conn):
+    """Per-user unread notification/message totals, kept in sync by triggers"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS unread_counters (
+            user_id TEXT PRIMARY KEY,
+            notifications INTEGER NOT NULL DEFAULT 0,
+            messages INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+    
+    for counter, table, key, row_delta, changed, update_delta in UNREAD_COUNTER_SOURCES:
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS unread_{table}_insert AFTER INSERT ON {table}
+            WHEN {row_delta.format(row='NEW')} != 0
+            BEGIN
+                {_bump_unread(counter, f'NEW.{key}', row_delta.format(row='NEW'))}
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS unread_{table}_update AFTER UPDATE ON {table}
+            WHEN {changed}
+            BEGIN
+                {_bump_unread(counter, f'NEW.{key}', update_delta)}
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS unread_{table}_delete AFTER DELETE ON {table}
+            WHEN {row_delta.format(row='OLD')} != 0
+            BEGIN
+                {_bump_unread(counter, f'OLD.{key}', '-' + row_delta.format(row='OLD'))}
+            END
+        """)
+    
+    rebuild_unread_counters(conn)
+
+def rebuild_unread_counters(conn):
+    """Recompute every user's unread totals from their sources (does not commit)"""
+    conn.execute("DELETE FROM unread_counters")
+    conn.execute("""
+        INSERT INTO unread_counters (user_id, notifications, messages)
+        SELECT user_id, SUM(notifications), SUM(messages)
+        FROM (
+            SELECT user_id, COUNT(*) AS notifications, 0 AS messages
+            FROM notifications WHERE IFNULL(is_read, 0) = 0
+            GROUP BY user_id
+            UNION ALL
+            SELECT user_id, 0, SUM(unread_count)
+            FROM conversations WHERE unread_count > 0
+            GROUP BY user_id
+        )
+        GROUP BY user_id
+    """)
+
+def reconcile_unread_counters():
+    """
+    Rebuild conversation summaries and unread counters from the base tables.
+
+    The triggers keep both exact; this repairs drift from writes made with
+    the triggers missing (e.g. restored backups or manual edits).
+    """
+    with db_connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        rebuild_conversations(conn)
+        rebuild_unread_counters(conn)
+
+def get_unread_counters(user_id):
+    """Unread notification and message totals of a user (a primary-key lookup)"""
+    conn = get_db()
+    try:
+        row = conn.execute(
+            "SELECT notifications, messages FROM unread_counters WHERE user_id = ?",
+            (user_id,)
+        ).fetchone()
+    finally:
+        conn.close()
+    return row or {'notifications': 0, 'messages': 0}
+
+def _add_job_alert_mark(conn):
+    """last_job_id: the newest job each alert has already been matched against"""
+    _add_column_if_missing(conn, 'job_alerts', 'last_job_id', 'INTEGER')
+
+def _create_email_outbox(conn):
+    """Durable queue of outbound emails drained by utils/email_outbox.py"""
+    # status is pending, sending, sent or failed; next_attempt_at is a Unix
+    # timestamp; rows sharing to_email and a digest_key are sent as one email
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS email_outbox (
+            email_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            to_email TEXT NOT NULL,
+            subject TEXT NOT NULL,
+            body TEXT NOT NULL,
+            digest_key TEXT,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL,
+            last_error TEXT,
+            created_at TEXT NOT NULL,
+            sent_at TEXT
+        )
+    """)
+    create_indexes(conn, EMAIL_OUTBOX_INDEXES)
+
+def _add_email_outbox_lease(conn):
+    """email_outbox.claimed_at: when a worker marked the row 'sending' (Unix time)"""
+    _add_column_if_missing(conn, 'email_outbox', 'claimed_at', 'REAL')
+
+# Daily analytics rollups as (table, source table, key columns, counter
+# columns). Key and counter values are SQL expressions over {row} (NEW or
+# OLD); every source row adds its counters to the rollup row of its keys.
+# Triggers keep the rollups in step with inserts, updates and deletes, so
+# analytics windows are a range scan over at most one row per day.
+ANALYTICS_ROLLUPS = [
+    # Applications sent per seeker and day of application
+    ('daily_seeker_stats', 'applications',
+     {'user_id': "{row}.applicant_id", 'day': "substr({row}.created_at, 1, 10)"},
+     {'applications': "1", 'accepted': "{row}.status = 'Accepted'"}),
+    # Applications received per poster and day, with response times in minutes
+    ('daily_poster_stats', 'applications',
+     {'user_id': "{row}.job_poster_id", 'day': "substr({row}.created_at, 1, 10)"},
+     {'applications': "1", 'responses': "{row}.response_time IS NOT NULL",
+      'response_time_total': "IFNULL({row}.response_time, 0)"}),
+    # Jobs posted per trade category and day
+    ('daily_category_stats', 'jobs',
+     {'trade_category': "IFNULL({row}.trade_category, '')", 'day': "substr({row}.created_at, 1, 10)"},
+     {'jobs_posted': "1", 'open_jobs': "{row}.status = 'Open'"}),
+]
+
+def _bump_rollup(table, keys, counters, row, sign=''):
+    """Trigger statement adding (sign='-': removing) one source row to its rollup row"""
+    columns = list(keys) + list(counters)
+    values = [expr.format(row=row) for expr in keys.values()]
+    values += [f"{sign}({expr.format(row=row)})" for expr in counters.values()]
+    updates = ', '.join(f"{column} = {column} + excluded.{column}" for column in counters)
+    # Rows without a user/day are left out rather than failing the write
+    has_keys = ' AND '.join(f"{expr.format(row=row)} IS NOT NULL" for expr in keys.values())
+    sql = f"""
+        INSERT INTO {table} ({', '.join(columns)}) SELECT {', '.join(values)} WHERE {has_keys}
+        ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {updates};
+    """
+    if sign:
+        # The first counter counts source rows; drop rollup rows left empty
+        match = ' AND '.join(f"{column} = {expr.format(row=row)}" for column, expr in keys.items())
+        sql += f"DELETE FROM {table} WHERE {match} AND {next(iter(counters))} = 0;"
+    return sql
+
+def _create_analytics_rollups(conn):
+    """Daily analytics rollup tables, kept in sync by triggers"""
+    for table, source, keys, counters in ANALYTICS_ROLLUPS:
+        key_columns = ', '.join(f"{column} TEXT NOT NULL" for column in keys)
+        counter_columns = ', '.join(f"{column} INTEGER NOT NULL DEFAULT 0" for column in counters)
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                {key_columns},
+                {counter_columns},
+                PRIMARY KEY ({', '.join(keys)})
+            ) WITHOUT ROWID
+        """)
+        
+        # Columns whose change moves a row between rollup rows or counters
+        watched = sorted({
+            column for expr in list(keys.values()) + list(counters.values())
+            for column in re.findall(r'\{row\}\.(\w+)', expr)
+        })
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_insert AFTER INSERT ON {source}
+            BEGIN
+                {_bump_rollup(table, keys, counters, 'NEW')}
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_update AFTER UPDATE OF {', '.join(watched)} ON {source}
+            BEGIN
+                {_bump_rollup(table, keys, counters, 'OLD', '-')}
+                {_bump_rollup(table, keys, counters, 'NEW')}
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_delete AFTER DELETE ON {source}
+            BEGIN
+                {_bump_rollup(table, keys, counters, 'OLD', '-')}
+            END
+        """)
+    
+    create_indexes(conn, ANALYTICS_INDEXES)
+    rebuild_analytics_rollups(conn)
+
+def rebuild_analytics_rollups(conn):
+    """Recompute every daily rollup from its source table (does not commit)"""
+    for table, source, keys, counters in ANALYTICS_ROLLUPS:
+        key_exprs = [expr.format(row=source) for expr in keys.values()]
+        sums = [f"SUM({expr.format(row=source)})" for expr in counters.values()]
+        conn.execute(f"DELETE FROM {table}")
+        conn.execute(f"""
+            INSERT INTO {table} ({', '.join(list(keys) + list(counters))})
+            SELECT {', '.join(key_exprs + sums)}
+            FROM {source}
+            WHERE {' AND '.join(f"{expr} IS NOT NULL" for expr in key_exprs)}
+            GROUP BY {', '.join(key_exprs)}
+        """)
+
+def _add_job_application_counts(conn):
+    """jobs.application_count: applications per job, kept in sync by triggers"""
+    _add_column_if_missing(conn, 'jobs', 'application_count', 'INTEGER NOT NULL DEFAULT 0')
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS jobs_application_count_insert AFTER INSERT ON applications
+        BEGIN
+            UPDATE jobs SET application_count = application_count + 1 WHERE job_id = NEW.job_id;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS jobs_application_count_update AFTER UPDATE OF job_id ON applications
+        BEGIN
+            UPDATE jobs SET application_count = MAX(application_count - 1, 0) WHERE job_id = OLD.job_id;
+            UPDATE jobs SET application_count = application_count + 1 WHERE job_id = NEW.job_id;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS jobs_application_count_delete AFTER DELETE ON applications
+        BEGIN
+            UPDATE jobs SET application_count = MAX(application_count - 1, 0) WHERE job_id = OLD.job_id;
+        END
+    """)
+    conn.execute("""
+        UPDATE jobs SET application_count = (
+            SELECT COUNT(*) FROM applications a WHERE a.job_id = jobs.job_id
+        )
+    """)
+    create_indexes(conn, RECOMMENDATION_INDEXES)
+
+# Precomputed tag sets as (table, key, tag column, source columns, child
+# sources as (child table, column)). Each tag column holds the sorted ids
+# (see utils.tags) of the comma-separated values of the source columns that
+# exist on the table plus those of its child rows, which reference the key.
+# Triggers set tags_pending when a source changes and refresh_tags()
+# recomputes the pending rows before tag matching, as with geohashes.
+TAG_COLUMNS = [
+    ('users', 'user_id', 'skill_tags', ('skills',), ()),
+    ('users', 'user_id', 'trade_tags', ('preferred_trades',), ()),
+    ('users', 'user_id', 'cert_tags', ('certifications',), (('certifications', 'name'),)),
+    ('users', 'user_id', 'experience_tags', (), (('work_history', 'trade_category'),)),
+    ('jobs', 'job_id', 'requirement_tags', ('requirements',), ()),
+    ('jobs', 'job_id', 'category_tags', ('trade_category',), ()),
+    ('jobs', 'job_id', 'type_tags', ('job_type',), ()),
+    ('job_alerts', 'alert_id', 'category_tags', ('trade_categories', 'trade_category'), ()),
+    ('job_alerts', 'alert_id', 'type_tags', ('job_types', 'job_type'), ()),
+]
+
+def _tag_sources(conn):
+    """table -> (key, [(tag column, SQL source expressions)]) for the current schema"""
+    sources = {}
+    for table, key, column, row_columns, children in TAG_COLUMNS:
+        columns = get_table_columns(conn, table)
+        exprs = [f"{table}.{source}" for source in row_columns if source in columns]
+        for child, child_column in children:
+            exprs.append(
+                f"(SELECT GROUP_CONCAT({child_column}) FROM {child} WHERE {child}.{key} = {table}.{key})"
+            )
+        sources.setdefault(table, (key, []))[1].append((column, exprs))
+    return sources
+
+def _create_tag_sets(conn):
+    """Tag vocabulary, per-row tag set columns and the triggers that mark them stale"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS tags (
+            tag_id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        )
+    """)
+
+    for table, (key, tag_columns) in _tag_sources(conn).items():
+        for column, _ in tag_columns:
+            _add_column_if_missing(conn, table, column, 'BLOB')
+        # Existing and newly inserted rows start out pending
+        _add_column_if_missing(conn, table, 'tags_pending', 'INTEGER NOT NULL DEFAULT 1')
+        conn.execute(f"""
+            CREATE INDEX IF NOT EXISTS idx_{table}_tags_pending ON {table} ({key})
+            WHERE tags_pending = 1
+        """)
+
+        columns = get_table_columns(conn, table)
+        watched = sorted({
+            source
+            for source_table, _, _, row_columns, _ in TAG_COLUMNS if source_table == table
+            for source in row_columns if source in columns
+        })
+        if watched:
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_tags_reset
+                AFTER UPDATE OF {', '.join(watched)} ON {table}
+                WHEN NEW.tags_pending = 0
+                BEGIN
+                    UPDATE {table} SET tags_pending = 1 WHERE {key} = NEW.{key};
+                END
+            """)
+
+    for table, key, _, _, children in TAG_COLUMNS:
+        for child, child_column in children:
+            for event, rows in (('INSERT', ('NEW',)), ('DELETE', ('OLD',)),
+                                (f'UPDATE OF {key}, {child_column}', ('OLD', 'NEW'))):
+                marks = "".join(
+                    f"UPDATE {table} SET tags_pending = 1 WHERE {key} = {row}.{key};\n"
+                    for row in rows
+                )
+                conn.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS {child}_{table}_tags_{event.split()[0].lower()}
+                    AFTER {event} ON {child}
+                    BEGIN
+                        {marks}
+                    END
+                """)
+
+    _refresh_tags(conn)
+
+def _refresh_tags(conn):
+    """Recompute tag sets of pending rows on an open connection without committing"""
+    updated = 0
+    for table, (key, tag_columns) in _tag_sources(conn).items():
+        selects = []
+        for column, exprs in tag_columns:
+            value = " || ',' || ".join(f"IFNULL({expr}, '')" for expr in exprs) or "NULL"
+            selects.append(f"{value} AS {column}")
+        rows = conn.execute(
+            f"SELECT {key} AS id, {', '.join(selects)} FROM {table} WHERE tags_pending = 1"
+        ).fetchall()
+        if not rows:
+            continue
+
+        names = [{column: parse_tags(row[column]) for column, _ in tag_columns} for row in rows]
+        ids = tag_map(conn, set().union(*(tags for row in names for tags in row.values())), create=True)
+        assignments = ", ".join(f"{column} = ?" for column, _ in tag_columns)
+        conn.executemany(
+            f"UPDATE {table} SET {assignments}, tags_pending = 0 WHERE {key} = ?",
+            [
+                [pack_tags(ids[name] for name in row_names[column]) for column, _ in tag_columns] + [row['id']]
+                for row, row_names in zip(rows, names)
+            ]
+        )
+        updated += len(rows)
+    return updated
+
+def refresh_tags():
+    """Compute tag sets for rows whose tag sources are new or changed.
+
+    Cheap when nothing is pending (one partial-index probe per table).
+    """
+    if not has_column('users', 'tags_pending'):
+        return 0
+    with db_connection() as conn:
+        return _refresh_tags(conn)
+
+# Ordered schema migrations as (version, description, function). Each function
+# gets an open connection and must not commit; apply_migrations runs all
+# pending ones in a single transaction. Only ever append new versions.
+MIGRATIONS = [
+    (1, 'base tables', create_tables),
+    (2, 'location columns', _add_location_columns),
+    (3, 'full table set', _create_full_schema),
+    (4, 'premium and messaging columns', _add_premium_columns),
+    (5, 'hot query indexes', partial(create_indexes, indexes=CORE_INDEXES)),
+    (6, 'spatial indexes', _create_spatial_indexes),
+    (7, 'geocode cache', _create_geocode_cache),
+    (8, 'geohash grid', _add_geohash_columns),
+    (9, 'job full-text index', _create_job_search_index),
+    (10, 'listing page indexes', partial(create_indexes, indexes=LISTING_INDEXES)),
+    (11, 'conversation summaries', _create_conversations),
+    (12, 'message thread index', partial(create_indexes, indexes=THREAD_INDEXES)),
+    (13, 'job alert high-water mark', _add_job_alert_mark),
+    (14, 'email outbox', _create_email_outbox),
+    (15, 'unread counters', _create_unread_counters),
+    (16, 'daily analytics rollups', _create_analytics_rollups),
+    (17, 'job application counts', _add_job_application_counts),
+    (18, 'precomputed tag sets', _create_tag_sets),
+    (19, 'email outbox claim lease', _add_email_outbox_lease),
+    (20, 'stable user spatial index keys', _rekey_spatial_indexes),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def get_schema_version(conn):
+    """Return the schema version recorded in PRAGMA user_version"""
+    return conn.execute("PRAGMA user_version").fetchone()['user_version']
+
+def apply_migrations(conn):
+    """Apply pending MIGRATIONS exactly once and record the new user_version.
+
+    Returns the list of versions applied (empty if the schema is current).
+    """
+    if get_schema_version(conn) >= SCHEMA_VERSION:
+        return []
+    
+    # Take the write lock before re-reading the version so concurrent
+    # processes cannot apply the same migration twice
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        current = get_schema_version(conn)
+        applied = []
+        
+        for version, description, migrate in MIGRATIONS:
+            if version <= current:
+                continue
+            logger.info(f"Applying schema migration {version}: {description}")
+            migrate(conn)
+            applied.append(version)
+        
+        if applied:
+            conn.execute(f"PRAGMA user_version = {applied[-1]}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    
+    _column_cache.clear()
+    return applied
+
+# Column-capability map: table name -> frozenset of column names. Filled on
+# first use and reset whenever migrations run, so pages never probe the schema.
+_column_cache = {}
+
+def table_columns(table):
+    """Return the (cached) column names of a table"""
+    columns = _column_cache.get(table)
+    if columns is None:
+        conn = get_db()
+        try:
+            columns = frozenset(get_table_columns(conn, table))
+        finally:
+            conn.close()
+        _column_cache[table] = columns
+    return columns
+
+def has_column(table, column):
+    """Check the cached column map for a column"""
+    return column in table_columns(table)
+
+def clear_column_cache():
+    """Forget cached columns after DDL issued outside apply_migrations"""
+    _column_cache.clear()
+
 def create_or_update_user(google_data, role):
     """Create or update a user based on Google OAuth data"""
     conn = get_db()
@@ -412,33 +1557,53 @@ def create_job(poster_id, title, description, category_id, location, latitude, l
         conn.close()
 
 def get_nearby_jobs(latitude, longitude, radius_km, category_id=None):
-    """Get jobs within specified radius"""
+    """Get open jobs within radius_km, nearest first.
+
+    category_id matches jobs.trade_category.
+    """
     conn = get_db()
     cursor = conn.cursor()
     
-    # Basic query without category filter
+    # Distance is computed once per row by the registered haversine_km()
     query = """
-    SELECT j.*, u.name as poster_name, sc.name as category_name,
-           (6371 * acos(cos(radians(?)) * cos(radians(latitude)) * 
-            cos(radians(longitude) - radians(?)) + 
-            sin(radians(?)) * sin(radians(latitude)))) AS distance
+    SELECT j.*, u.name as poster_name,
+           haversine_km(?, ?, j.job_latitude, j.job_longitude) AS distance
     FROM jobs j
-    JOIN users u ON j.poster_id = u.user_id
-    JOIN service_categories sc ON j.category_id = sc.category_id
-    WHERE j.status = 'open'
-    HAVING distance <= ?
+    JOIN users u ON j.job_poster_id = u.user_id
+    WHERE j.status = 'Open'
     """
+    params = [latitude, longitude]
     
-    params = [latitude, longitude, latitude, radius_km]
+    if has_spatial_index('jobs_geo'):
+        bbox_sql, bbox_params = bbox_filter('jobs_geo', 'j.job_id', latitude, longitude, radius_km)
+        query += f" AND {bbox_sql}"
+        params.extend(bbox_params)
     
     if category_id:
-        query += " AND j.category_id = ?"
+        query += " AND j.trade_category = ?"
         params.append(category_id)
     
-    query += " ORDER BY distance"
+    query += " AND distance <= ? ORDER BY distance"
+    params.append(radius_km)
     
     cursor.execute(query, params)
     jobs = cursor.fetchall()
     conn.close()
     
-    return [dict(job) for job in jobs] 
\ No newline at end of file
+    return [dict(job) for job in jobs] 
+
+if __name__ == "__main__":
+    # Initialize the schema and fail if a hot query is not index-backed
+    init_db()
+    if sys.argv[1:] == ['reconcile-unread']:
+        reconcile_unread_counters()
+        print("Rebuilt conversation summaries and unread counters")
+        sys.exit()
+    if sys.argv[1:] == ['reconcile-analytics']:
+        with db_connection() as conn:
+            rebuild_analytics_rollups(conn)
+        print("Rebuilt daily analytics rollups")
+        sys.exit()
+    with db_connection() as conn:
+        assert_query_plans(conn)
+    print("All hot queries use indexes")
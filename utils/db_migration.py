@@ -1,13 +1,12 @@
 import os
-import sqlite3
+import sys
 from datetime import datetime
 from dotenv import load_dotenv
 
 def get_db():
-    """Get database connection"""
-    conn = sqlite3.connect('workify.db')
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Get database connection (from the shared pool, so WORKIFY_DB_PATH applies)"""
+    from utils.database import get_db as get_pooled_db
+    return get_pooled_db()
 
 def drop_all_tables():
     """Drop all existing tables"""
@@ -24,6 +23,9 @@ def drop_all_tables():
             if table['name'] != 'sqlite_sequence':
                 cursor.execute(f"DROP TABLE IF EXISTS {table['name']}")
         
+        # Let utils.database re-apply every versioned migration
+        cursor.execute("PRAGMA user_version = 0")
+        
         conn.commit()
         print("All tables dropped successfully")
         
@@ -37,181 +39,9 @@ def drop_all_tables():
 def init_db():
     """Initialize database with schema"""
     conn = get_db()
-    cursor = conn.cursor()
     
     try:
-        # Create users table with all necessary fields and correct data types
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                user_id TEXT PRIMARY KEY,
-                name TEXT NOT NULL,
-                email TEXT UNIQUE NOT NULL,
-                password TEXT,
-                role TEXT NOT NULL,
-                company_name TEXT,
-                company_description TEXT,
-                location TEXT,
-                latitude REAL,
-                longitude REAL,
-                picture_url TEXT,
-                is_premium INTEGER DEFAULT 0,
-                premium_until TEXT,
-                skills TEXT,
-                experience_years INTEGER,
-                preferred_trades TEXT,
-                hourly_rate REAL,
-                availability TEXT,
-                background_check_status TEXT,
-                background_check_date TEXT,
-                rating REAL DEFAULT 0,
-                reviews_count INTEGER DEFAULT 0,
-                last_active TEXT,
-                created_at TEXT NOT NULL,
-                updated_at TEXT
-            )
-        """)
-        
-        # Create jobs table with consistent foreign key types
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS jobs (
-                job_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                job_poster_id TEXT NOT NULL,
-                title TEXT NOT NULL,
-                description TEXT NOT NULL,
-                location TEXT NOT NULL,
-                job_type TEXT NOT NULL,
-                trade_category TEXT NOT NULL,
-                payment_type TEXT,
-                payment_amount REAL,
-                workers_needed INTEGER DEFAULT 1,
-                status TEXT DEFAULT 'Open',
-                created_at TEXT NOT NULL,
-                updated_at TEXT,
-                FOREIGN KEY (job_poster_id) REFERENCES users (user_id)
-            )
-        """)
-        
-        # Create applications table with consistent foreign key types
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS applications (
-                application_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                job_id INTEGER NOT NULL,
-                job_poster_id TEXT NOT NULL,
-                applicant_id TEXT NOT NULL,
-                status TEXT DEFAULT 'Pending',
-                cover_letter TEXT,
-                tools_equipment TEXT,
-                licenses_certs TEXT,
-                approach TEXT,
-                reference_info TEXT,
-                preferred_contact TEXT,
-                is_read INTEGER DEFAULT 0,
-                response_time INTEGER,
-                created_at TEXT NOT NULL,
-                updated_at TEXT,
-                FOREIGN KEY (job_id) REFERENCES jobs (job_id),
-                FOREIGN KEY (job_poster_id) REFERENCES users (user_id),
-                FOREIGN KEY (applicant_id) REFERENCES users (user_id)
-            )
-        """)
-        
-        # Create work_history table with consistent foreign key types
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS work_history (
-                history_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL,
-                company_name TEXT NOT NULL,
-                position TEXT NOT NULL,
-                start_date TEXT NOT NULL,
-                end_date TEXT,
-                description TEXT,
-                trade_category TEXT NOT NULL,
-                is_verified INTEGER DEFAULT 0,
-                created_at TEXT NOT NULL,
-                updated_at TEXT,
-                FOREIGN KEY (user_id) REFERENCES users (user_id)
-            )
-        """)
-        
-        # Create certifications table with consistent foreign key types
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS certifications (
-                cert_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL,
-                name TEXT NOT NULL,
-                issuing_authority TEXT NOT NULL,
-                issue_date TEXT NOT NULL,
-                expiry_date TEXT,
-                certificate_number TEXT,
-                verification_url TEXT,
-                is_verified INTEGER DEFAULT 0,
-                created_at TEXT NOT NULL,
-                updated_at TEXT,
-                FOREIGN KEY (user_id) REFERENCES users (user_id)
-            )
-        """)
-        
-        # Create background_checks table with consistent foreign key types
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS background_checks (
-                check_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL,
-                status TEXT NOT NULL,
-                provider TEXT NOT NULL,
-                report_url TEXT,
-                valid_until TEXT,
-                created_at TEXT NOT NULL,
-                updated_at TEXT,
-                FOREIGN KEY (user_id) REFERENCES users (user_id)
-            )
-        """)
-        
-        # Create messages table with consistent foreign key types
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS messages (
-                message_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                sender_id TEXT NOT NULL,
-                receiver_id TEXT NOT NULL,
-                other_user_id TEXT NOT NULL,
-                message TEXT NOT NULL,
-                is_read INTEGER DEFAULT 0,
-                created_at TEXT NOT NULL,
-                updated_at TEXT,
-                FOREIGN KEY (sender_id) REFERENCES users (user_id),
-                FOREIGN KEY (receiver_id) REFERENCES users (user_id),
-                FOREIGN KEY (other_user_id) REFERENCES users (user_id)
-            )
-        """)
-        
-        # Create notifications table with consistent foreign key types
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS notifications (
-                notification_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL,
-                message TEXT NOT NULL,
-                is_read INTEGER DEFAULT 0,
-                created_at TEXT NOT NULL,
-                FOREIGN KEY (user_id) REFERENCES users (user_id)
-            )
-        """)
-        
-        # Create job_alerts table with consistent foreign key types
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS job_alerts (
-                alert_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL,
-                trade_category TEXT,
-                location TEXT,
-                max_distance INTEGER,
-                min_pay REAL,
-                job_type TEXT,
-                is_active INTEGER DEFAULT 1,
-                created_at TEXT NOT NULL,
-                updated_at TEXT,
-                FOREIGN KEY (user_id) REFERENCES users (user_id)
-            )
-        """)
-        
+        create_schema(conn)
         conn.commit()
         print("Database schema initialized successfully")
         
@@ -222,6 +52,186 @@ def init_db():
     finally:
         conn.close()
 
+def create_schema(conn):
+    """Create the full table set on an open connection without committing.
+
+    Also applied once by the versioned migrations in utils/database.py.
+    """
+    cursor = conn.cursor()
+    
+    # Create users table with all necessary fields and correct data types
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            user_id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            email TEXT UNIQUE NOT NULL,
+            password TEXT,
+            role TEXT NOT NULL,
+            company_name TEXT,
+            company_description TEXT,
+            location TEXT,
+            latitude REAL,
+            longitude REAL,
+            picture_url TEXT,
+            is_premium INTEGER DEFAULT 0,
+            premium_until TEXT,
+            skills TEXT,
+            experience_years INTEGER,
+            preferred_trades TEXT,
+            hourly_rate REAL,
+            availability TEXT,
+            background_check_status TEXT,
+            background_check_date TEXT,
+            rating REAL DEFAULT 0,
+            reviews_count INTEGER DEFAULT 0,
+            last_active TEXT,
+            created_at TEXT NOT NULL,
+            updated_at TEXT
+        )
+    """)
+    
+    # Create jobs table with consistent foreign key types
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job_poster_id TEXT NOT NULL,
+            title TEXT NOT NULL,
+            description TEXT NOT NULL,
+            location TEXT NOT NULL,
+            job_type TEXT NOT NULL,
+            trade_category TEXT NOT NULL,
+            payment_type TEXT,
+            payment_amount REAL,
+            workers_needed INTEGER DEFAULT 1,
+            status TEXT DEFAULT 'Open',
+            created_at TEXT NOT NULL,
+            updated_at TEXT,
+            FOREIGN KEY (job_poster_id) REFERENCES users (user_id)
+        )
+    """)
+    
+    # Create applications table with consistent foreign key types
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS applications (
+            application_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job_id INTEGER NOT NULL,
+            job_poster_id TEXT NOT NULL,
+            applicant_id TEXT NOT NULL,
+            status TEXT DEFAULT 'Pending',
+            cover_letter TEXT,
+            tools_equipment TEXT,
+            licenses_certs TEXT,
+            approach TEXT,
+            reference_info TEXT,
+            preferred_contact TEXT,
+            is_read INTEGER DEFAULT 0,
+            response_time INTEGER,
+            created_at TEXT NOT NULL,
+            updated_at TEXT,
+            FOREIGN KEY (job_id) REFERENCES jobs (job_id),
+            FOREIGN KEY (job_poster_id) REFERENCES users (user_id),
+            FOREIGN KEY (applicant_id) REFERENCES users (user_id)
+        )
+    """)
+    
+    # Create work_history table with consistent foreign key types
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS work_history (
+            history_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            company_name TEXT NOT NULL,
+            position TEXT NOT NULL,
+            start_date TEXT NOT NULL,
+            end_date TEXT,
+            description TEXT,
+            trade_category TEXT NOT NULL,
+            is_verified INTEGER DEFAULT 0,
+            created_at TEXT NOT NULL,
+            updated_at TEXT,
+            FOREIGN KEY (user_id) REFERENCES users (user_id)
+        )
+    """)
+    
+    # Create certifications table with consistent foreign key types
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS certifications (
+            cert_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            name TEXT NOT NULL,
+            issuing_authority TEXT NOT NULL,
+            issue_date TEXT NOT NULL,
+            expiry_date TEXT,
+            certificate_number TEXT,
+            verification_url TEXT,
+            is_verified INTEGER DEFAULT 0,
+            created_at TEXT NOT NULL,
+            updated_at TEXT,
+            FOREIGN KEY (user_id) REFERENCES users (user_id)
+        )
+    """)
+    
+    # Create background_checks table with consistent foreign key types
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS background_checks (
+            check_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            status TEXT NOT NULL,
+            provider TEXT NOT NULL,
+            report_url TEXT,
+            valid_until TEXT,
+            created_at TEXT NOT NULL,
+            updated_at TEXT,
+            FOREIGN KEY (user_id) REFERENCES users (user_id)
+        )
+    """)
+    
+    # Create messages table with consistent foreign key types
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS messages (
+            message_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sender_id TEXT NOT NULL,
+            receiver_id TEXT NOT NULL,
+            other_user_id TEXT NOT NULL,
+            message TEXT NOT NULL,
+            is_read INTEGER DEFAULT 0,
+            created_at TEXT NOT NULL,
+            updated_at TEXT,
+            FOREIGN KEY (sender_id) REFERENCES users (user_id),
+            FOREIGN KEY (receiver_id) REFERENCES users (user_id),
+            FOREIGN KEY (other_user_id) REFERENCES users (user_id)
+        )
+    """)
+    
+    # Create notifications table with consistent foreign key types
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS notifications (
+            notification_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            message TEXT NOT NULL,
+            is_read INTEGER DEFAULT 0,
+            created_at TEXT NOT NULL,
+            FOREIGN KEY (user_id) REFERENCES users (user_id)
+        )
+    """)
+    
+    # Create job_alerts table with consistent foreign key types
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS job_alerts (
+            alert_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            trade_category TEXT,
+            location TEXT,
+            max_distance INTEGER,
+            min_pay REAL,
+            job_type TEXT,
+            is_active INTEGER DEFAULT 1,
+            created_at TEXT NOT NULL,
+            updated_at TEXT,
+            FOREIGN KEY (user_id) REFERENCES users (user_id)
+        )
+    """)
+
+
 def migrate_user_locations():
     """Update user profiles with location data"""
     conn = get_db()
@@ -262,82 +272,140 @@ def migrate_user_locations():
     finally:
         conn.close()
 
-def add_premium_fields():
-    """Add premium-related fields to existing tables"""
+def migrate_job_locations(batch_size=25):
+    """Geocode jobs stored without coordinates, one batch per transaction.
+
+    Each distinct location text is geocoded once; lookups go
+    through utils.geocoding, which caches results and keeps requests within
+    the Nominatim rate limit. Locations that cannot be resolved are left
+    NULL and retried once their negative cache entry expires.
+    """
+    from utils.location_manager import geocode_address
+    
     conn = get_db()
     cursor = conn.cursor()
+    updated = 0
     
     try:
-        # Add fields to applications table
-        cursor.execute("PRAGMA table_info(applications)")
-        columns = {col['name'] for col in cursor.fetchall()}
+        cursor.execute("""
+            SELECT DISTINCT location
+            FROM jobs
+            WHERE location IS NOT NULL
+            AND (job_latitude IS NULL OR job_longitude IS NULL)
+        """)
+        locations = [row['location'] for row in cursor.fetchall()]
         
-        if 'job_poster_id' not in columns:
-            cursor.execute("ALTER TABLE applications ADD COLUMN job_poster_id TEXT REFERENCES users(user_id)")
-        if 'approach' not in columns:
-            cursor.execute("ALTER TABLE applications ADD COLUMN approach TEXT")
-        if 'reference_info' not in columns:
-            cursor.execute("ALTER TABLE applications ADD COLUMN reference_info TEXT")
-        if 'preferred_contact' not in columns:
-            cursor.execute("ALTER TABLE applications ADD COLUMN preferred_contact TEXT")
-        if 'is_read' not in columns:
-            cursor.execute("ALTER TABLE applications ADD COLUMN is_read INTEGER DEFAULT 0")
-        if 'response_time' not in columns:
-            cursor.execute("ALTER TABLE applications ADD COLUMN response_time INTEGER")
+        for start in range(0, len(locations), batch_size):
+            # Geocode the whole batch before writing so the write lock is
+            # never held while waiting on the network
+            resolved = []
+            for location in locations[start:start + batch_size]:
+                coordinates = geocode_address(location)
+                if coordinates:
+                    resolved.append((coordinates['lat'], coordinates['lon'], location))
+            
+            for params in resolved:
+                cursor.execute("""
+                    UPDATE jobs
+                    SET job_latitude = ?, job_longitude = ?
+                    WHERE location = ?
+                    AND (job_latitude IS NULL OR job_longitude IS NULL)
+                """, params)
+                updated += cursor.rowcount
+            
+            # Commit per batch so progress survives an interrupted run
+            conn.commit()
         
-        # Add fields to messages table
-        cursor.execute("PRAGMA table_info(messages)")
-        columns = {col['name'] for col in cursor.fetchall()}
+        print(f"Updated coordinates for {updated} jobs")
         
-        if 'message' not in columns and 'content' in columns:
-            cursor.execute("ALTER TABLE messages RENAME COLUMN content TO message")
-        elif 'message' not in columns:
-            cursor.execute("ALTER TABLE messages ADD COLUMN message TEXT")
-        if 'other_user_id' not in columns:
-            cursor.execute("ALTER TABLE messages ADD COLUMN other_user_id TEXT REFERENCES users(user_id)")
-        if 'updated_at' not in columns:
-            cursor.execute("ALTER TABLE messages ADD COLUMN updated_at TEXT")
+    except Exception as e:
+        print(f"Error migrating job locations: {e}")
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def add_premium_columns(conn):
+    """Add premium-related columns on an open connection without committing"""
+    cursor = conn.cursor()
+    
+    # Add fields to applications table
+    cursor.execute("PRAGMA table_info(applications)")
+    columns = {col['name'] for col in cursor.fetchall()}
+    
+    if 'job_poster_id' not in columns:
+        cursor.execute("ALTER TABLE applications ADD COLUMN job_poster_id TEXT REFERENCES users(user_id)")
+    if 'approach' not in columns:
+        cursor.execute("ALTER TABLE applications ADD COLUMN approach TEXT")
+    if 'reference_info' not in columns:
+        cursor.execute("ALTER TABLE applications ADD COLUMN reference_info TEXT")
+    if 'preferred_contact' not in columns:
+        cursor.execute("ALTER TABLE applications ADD COLUMN preferred_contact TEXT")
+    if 'is_read' not in columns:
+        cursor.execute("ALTER TABLE applications ADD COLUMN is_read INTEGER DEFAULT 0")
+    if 'response_time' not in columns:
+        cursor.execute("ALTER TABLE applications ADD COLUMN response_time INTEGER")
+    
+    # Add fields to messages table
+    cursor.execute("PRAGMA table_info(messages)")
+    columns = {col['name'] for col in cursor.fetchall()}
+    
+    if 'message' not in columns and 'content' in columns:
+        cursor.execute("ALTER TABLE messages RENAME COLUMN content TO message")
+    elif 'message' not in columns:
+        cursor.execute("ALTER TABLE messages ADD COLUMN message TEXT")
+    if 'other_user_id' not in columns:
+        cursor.execute("ALTER TABLE messages ADD COLUMN other_user_id TEXT REFERENCES users(user_id)")
+    if 'updated_at' not in columns:
+        cursor.execute("ALTER TABLE messages ADD COLUMN updated_at TEXT")
+    
+    # Add fields to users table
+    cursor.execute("PRAGMA table_info(users)")
+    columns = {col['name'] for col in cursor.fetchall()}
+    
+    # Core fields
+    if 'picture_url' not in columns:
+        cursor.execute("ALTER TABLE users ADD COLUMN picture_url TEXT")
+    if 'company_description' not in columns:
+        cursor.execute("ALTER TABLE users ADD COLUMN company_description TEXT")
         
-        # Add fields to users table
-        cursor.execute("PRAGMA table_info(users)")
-        columns = {col['name'] for col in cursor.fetchall()}
+    # Premium related fields
+    if 'is_premium' not in columns:
+        cursor.execute("ALTER TABLE users ADD COLUMN is_premium INTEGER DEFAULT 0")
+    if 'premium_until' not in columns:
+        cursor.execute("ALTER TABLE users ADD COLUMN premium_until TEXT")
+    if 'skills' not in columns:
+        cursor.execute("ALTER TABLE users ADD COLUMN skills TEXT")
+    if 'experience_years' not in columns:
+        cursor.execute("ALTER TABLE users ADD COLUMN experience_years INTEGER")
+    if 'preferred_trades' not in columns:
+        cursor.execute("ALTER TABLE users ADD COLUMN preferred_trades TEXT")
+    if 'hourly_rate' not in columns:
+        cursor.execute("ALTER TABLE users ADD COLUMN hourly_rate REAL")
+    if 'availability' not in columns:
+        cursor.execute("ALTER TABLE users ADD COLUMN availability TEXT")
         
-        # Core fields
-        if 'picture_url' not in columns:
-            cursor.execute("ALTER TABLE users ADD COLUMN picture_url TEXT")
-        if 'company_description' not in columns:
-            cursor.execute("ALTER TABLE users ADD COLUMN company_description TEXT")
-            
-        # Premium related fields
-        if 'is_premium' not in columns:
-            cursor.execute("ALTER TABLE users ADD COLUMN is_premium INTEGER DEFAULT 0")
-        if 'premium_until' not in columns:
-            cursor.execute("ALTER TABLE users ADD COLUMN premium_until TEXT")
-        if 'skills' not in columns:
-            cursor.execute("ALTER TABLE users ADD COLUMN skills TEXT")
-        if 'experience_years' not in columns:
-            cursor.execute("ALTER TABLE users ADD COLUMN experience_years INTEGER")
-        if 'preferred_trades' not in columns:
-            cursor.execute("ALTER TABLE users ADD COLUMN preferred_trades TEXT")
-        if 'hourly_rate' not in columns:
-            cursor.execute("ALTER TABLE users ADD COLUMN hourly_rate REAL")
-        if 'availability' not in columns:
-            cursor.execute("ALTER TABLE users ADD COLUMN availability TEXT")
-            
-        # Background check fields
-        if 'background_check_status' not in columns:
-            cursor.execute("ALTER TABLE users ADD COLUMN background_check_status TEXT")
-        if 'background_check_date' not in columns:
-            cursor.execute("ALTER TABLE users ADD COLUMN background_check_date TEXT")
-            
-        # Rating and activity fields
-        if 'rating' not in columns:
-            cursor.execute("ALTER TABLE users ADD COLUMN rating REAL DEFAULT 0")
-        if 'reviews_count' not in columns:
-            cursor.execute("ALTER TABLE users ADD COLUMN reviews_count INTEGER DEFAULT 0")
-        if 'last_active' not in columns:
-            cursor.execute("ALTER TABLE users ADD COLUMN last_active TEXT")
+    # Background check fields
+    if 'background_check_status' not in columns:
+        cursor.execute("ALTER TABLE users ADD COLUMN background_check_status TEXT")
+    if 'background_check_date' not in columns:
+        cursor.execute("ALTER TABLE users ADD COLUMN background_check_date TEXT")
         
+    # Rating and activity fields
+    if 'rating' not in columns:
+        cursor.execute("ALTER TABLE users ADD COLUMN rating REAL DEFAULT 0")
+    if 'reviews_count' not in columns:
+        cursor.execute("ALTER TABLE users ADD COLUMN reviews_count INTEGER DEFAULT 0")
+    if 'last_active' not in columns:
+        cursor.execute("ALTER TABLE users ADD COLUMN last_active TEXT")
+
+
+def add_premium_fields():
+    """Add premium-related fields to existing tables"""
+    conn = get_db()
+    
+    try:
+        add_premium_columns(conn)
         conn.commit()
         print("Added all fields successfully")
         
@@ -369,6 +437,10 @@ def run_migrations():
         print("\nUpdating user locations...")
         migrate_user_locations()
         
+        # Update job locations
+        print("\nUpdating job locations...")
+        migrate_job_locations()
+        
         print("\nAll migrations completed successfully!")
         
     except Exception as e:
@@ -377,4 +449,9 @@ def run_migrations():
 
 if __name__ == "__main__":
     load_dotenv()
-    run_migrations() 
\ No newline at end of file
+    if len(sys.argv) > 1 and sys.argv[1] == "backfill-locations":
+        # Non-destructive: only geocode rows that lack coordinates
+        migrate_user_locations()
+        migrate_job_locations()
+    else:
+        run_migrations()
\ No newline at end of file
@@ -0,0 +1,308 @@
+import logging
+import smtplib
+import threading
+import time
+from datetime import datetime
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from config import (
+    SMTP_SERVER, SMTP_PORT, SMTP_USERNAME, SMTP_PASSWORD, SMTP_FROM_NAME,
+    SMTP_FROM_ADDRESS, SMTP_USE_TLS, SMTP_TIMEOUT,
+    EMAIL_BATCH_SIZE, EMAIL_POLL_SECONDS, EMAIL_IDLE_DISCONNECT_SECONDS,
+    EMAIL_MAX_ATTEMPTS, EMAIL_RETRY_BASE_SECONDS, EMAIL_DIGEST_SECONDS,
+    EMAIL_CLAIM_LEASE_SECONDS
+)
+from utils.database import get_db
+
+logger = logging.getLogger(__name__)
+
+def is_configured():
+    """Whether outbound email can be sent: credentials, or an unauthenticated plain SMTP stand-in"""
+    return bool(SMTP_USERNAME and SMTP_PASSWORD) or not SMTP_USE_TLS
+
+def enqueue_email(to_email, subject, body, digest_key=None, conn=None):
+    """
+    Add an HTML email to the email_outbox table and wake the worker.
+
+    Emails with a digest_key wait EMAIL_DIGEST_SECONDS and are then sent
+    together with every other pending email to the same recipient under the
+    same key. Pass conn to enqueue inside the caller's transaction (the
+    caller commits); otherwise the row is committed here.
+
+    Returns the email_id.
+    """
+    delay = EMAIL_DIGEST_SECONDS if digest_key else 0
+    own_conn = conn is None
+    if own_conn:
+        conn = get_db()
+    try:
+        cursor = conn.execute("""
+            INSERT INTO email_outbox (to_email, subject, body, digest_key, next_attempt_at, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (to_email, subject, body, digest_key, time.time() + delay, datetime.now().isoformat()))
+        email_id = cursor.lastrowid
+        if own_conn:
+            conn.commit()
+    finally:
+        if own_conn:
+            conn.close()
+
+    _worker.start()
+    if not digest_key:
+        _worker.wake()
+    return email_id
+
+def build_message(to_email, rows):
+    """One MIME message for one or more outbox rows to the same recipient"""
+    if len(rows) == 1:
+        subject, body = rows[0]['subject'], rows[0]['body']
+    else:
+        subject = f"{rows[0]['subject']} (+{len(rows) - 1} more)"
+        body = "<hr>".join(row['body'] for row in rows)
+
+    msg = MIMEMultipart()
+    msg['From'] = f"{SMTP_FROM_NAME} <{SMTP_FROM_ADDRESS}>"
+    msg['To'] = to_email
+    msg['Subject'] = subject
+    msg.attach(MIMEText(body, 'html'))
+    return msg
+
+class SMTPSession:
+    """
+    One authenticated SMTP connection reused across messages and batches.
+
+    Connects (STARTTLS + login) on first use, reconnects once if the server
+    dropped an idle session, and is closed after EMAIL_IDLE_DISCONNECT_SECONDS
+    without traffic.
+    """
+
+    def __init__(self):
+        self.server = None
+        self.last_used = 0.0
+
+    def _connect(self):
+        server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT, timeout=SMTP_TIMEOUT)
+        try:
+            if SMTP_USE_TLS:
+                server.starttls()
+            if SMTP_USERNAME:
+                server.login(SMTP_USERNAME, SMTP_PASSWORD)
+        except Exception:
+            server.close()
+            raise
+        return server
+
+    def send(self, msg):
+        if self.server is None:
+            self.server = self._connect()
+        try:
+            self.server.send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            self.server = self._connect()
+            self.server.send_message(msg)
+        self.last_used = time.monotonic()
+
+    def close_if_idle(self):
+        if self.server is not None and time.monotonic() - self.last_used >= EMAIL_IDLE_DISCONNECT_SECONDS:
+            self.close()
+
+    def close(self):
+        if self.server is None:
+            return
+        try:
+            self.server.quit()
+        except Exception:
+            self.server.close()
+        self.server = None
+
+class OutboxWorker:
+    """
+    Daemon thread that drains email_outbox over a single SMTPSession.
+
+    Each batch claims up to EMAIL_BATCH_SIZE due rows (marking them
+    'sending'), pulls in the other pending parts of their digests, sends one
+    email per recipient/digest and records the outcome. Failed sends are
+    retried with exponential backoff until EMAIL_MAX_ATTEMPTS, then marked
+    'failed'. Rows left in 'sending' by a crashed process are requeued once
+    their claim is older than EMAIL_CLAIM_LEASE_SECONDS.
+    """
+
+    def __init__(self):
+        self.session = SMTPSession()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+
+    def start(self):
+        """Start the worker thread unless it is already running"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='email-outbox', daemon=True)
+            self._thread.start()
+
+    def wake(self):
+        """Check the outbox now instead of after the poll interval"""
+        self._wake.set()
+
+    def stop(self, timeout=None):
+        """Stop the worker after its current batch"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        try:
+            requeue_stale()
+        except Exception as e:
+            logger.warning(f"Could not requeue stale outbox emails: {str(e)}")
+
+        while not self._stop.is_set():
+            try:
+                sent = self.process_batch()
+            except Exception as e:
+                logger.error(f"Email outbox batch failed: {str(e)}")
+                sent = 0
+
+            # A full batch suggests more are due; otherwise wait for a wake-up
+            if sent < EMAIL_BATCH_SIZE:
+                self.session.close_if_idle()
+                self._wake.wait(EMAIL_POLL_SECONDS)
+                self._wake.clear()
+
+        self.session.close()
+
+    def process_batch(self):
+        """Send one batch of due emails; returns the number of outbox rows handled"""
+        if not is_configured():
+            return 0
+
+        groups = claim_batch()
+        for (to_email, _), rows in groups.items():
+            try:
+                self.session.send(build_message(to_email, rows))
+            except Exception as e:
+                logger.warning(f"Failed to send email to {to_email}: {str(e)}")
+                self.session.close()
+                mark_failed(rows, str(e))
+            else:
+                mark_sent(rows)
+        return sum(len(rows) for rows in groups.values())
+
+def claim_batch(limit=EMAIL_BATCH_SIZE):
+    """
+    Mark up to limit due outbox rows (plus the pending rest of their
+    digests) as 'sending' and return them grouped by (to_email, digest key).
+
+    Emails without a digest_key form a group of their own. Claims whose
+    lease has run out are returned to the queue first.
+    """
+    now = time.time()
+    conn = get_db()
+    try:
+        # Take the write lock first so two workers cannot claim the same rows
+        conn.execute("BEGIN IMMEDIATE")
+        _requeue_expired(conn, now)
+        rows = conn.execute("""
+            SELECT * FROM email_outbox
+            WHERE status = 'pending' AND next_attempt_at <= ?
+            ORDER BY next_attempt_at LIMIT ?
+        """, (now, limit)).fetchall()
+
+        claimed = {row['email_id']: row for row in rows}
+        for to_email, digest_key in {(row['to_email'], row['digest_key']) for row in rows if row['digest_key']}:
+            for row in conn.execute("""
+                SELECT * FROM email_outbox
+                WHERE to_email = ? AND digest_key = ? AND status = 'pending'
+            """, (to_email, digest_key)).fetchall():
+                claimed.setdefault(row['email_id'], row)
+
+        conn.executemany(
+            "UPDATE email_outbox SET status = 'sending', claimed_at = ? WHERE email_id = ?",
+            [(now, email_id) for email_id in claimed]
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+    groups = {}
+    for email_id in sorted(claimed):
+        row = claimed[email_id]
+        key = (row['to_email'], row['digest_key'] or f"email:{email_id}")
+        groups.setdefault(key, []).append(row)
+    return groups
+
+def mark_sent(rows):
+    """Record a successful send of the given outbox rows"""
+    conn = get_db()
+    try:
+        conn.executemany(
+            "UPDATE email_outbox SET status = 'sent', sent_at = ?, last_error = NULL WHERE email_id = ?",
+            [(datetime.now().isoformat(), row['email_id']) for row in rows]
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+def mark_failed(rows, error):
+    """Schedule a retry with exponential backoff, or give up after EMAIL_MAX_ATTEMPTS"""
+    now = time.time()
+    updates = []
+    for row in rows:
+        attempts = row['attempts'] + 1
+        status = 'failed' if attempts >= EMAIL_MAX_ATTEMPTS else 'pending'
+        next_attempt_at = now + EMAIL_RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+        updates.append((status, attempts, next_attempt_at, error, row['email_id']))
+
+    conn = get_db()
+    try:
+        conn.executemany("""
+            UPDATE email_outbox
+            SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?
+            WHERE email_id = ?
+        """, updates)
+        conn.commit()
+    finally:
+        conn.close()
+
+def _requeue_expired(conn, now):
+    """Return 'sending' rows whose claim lease has expired to the queue"""
+    return conn.execute("""
+        UPDATE email_outbox SET status = 'pending', claimed_at = NULL
+        WHERE status = 'sending' AND IFNULL(claimed_at, 0) < ?
+    """, (now - EMAIL_CLAIM_LEASE_SECONDS,)).rowcount
+
+def requeue_stale():
+    """
+    Return rows stuck in 'sending' (e.g. after a crash) to the queue.
+
+    Only claims older than EMAIL_CLAIM_LEASE_SECONDS are touched, so rows
+    another process is sending right now are left alone.
+    """
+    conn = get_db()
+    try:
+        requeued = _requeue_expired(conn, time.time())
+        conn.commit()
+    finally:
+        conn.close()
+    return requeued
+
+_worker = OutboxWorker()
+
+def start_worker():
+    """Start the process-wide outbox worker; app.py calls this at boot"""
+    _worker.start()
+
+def stop_worker(timeout=None):
+    """Stop the process-wide outbox worker"""
+    _worker.stop(timeout)
+
+if __name__ == '__main__':
+    # Drain the outbox once, e.g. from cron or against a local SMTP stand-in
+    while _worker.process_batch():
+        pass
+    _worker.session.close()
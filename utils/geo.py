@@ -0,0 +1,216 @@
+import math
+import numpy as np
+
+# Mean Earth radius used by every distance calculation in the app
+EARTH_RADIUS_KM = 6371.0
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km between two points; None if any input is None"""
+    if lat1 is None or lon1 is None or lat2 is None or lon2 is None:
+        return None
+
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+def _null_safe(func):
+    """Wrap a one-argument math function so SQL NULL stays NULL"""
+    return lambda value: None if value is None else func(value)
+
+def _bbox_edge(edge):
+    """SQL helper returning one edge of bounding_box(lat, lon, radius_km)"""
+    def func(lat, lon, radius_km):
+        if lat is None or lon is None or radius_km is None:
+            return None
+        return bounding_box(lat, lon, radius_km)[edge]
+    return func
+
+# Deterministic scalar functions registered on every pooled connection, as
+# (name, number of arguments, function). Stock SQLite builds lack radians()
+# and acos(), and haversine_km() replaces the acos() formula in one call.
+SQL_FUNCTIONS = [
+    ('haversine_km', 4, haversine_km),
+    ('radians', 1, _null_safe(math.radians)),
+    ('degrees', 1, _null_safe(math.degrees)),
+    ('bbox_min_lat', 3, _bbox_edge(0)),
+    ('bbox_max_lat', 3, _bbox_edge(1)),
+    ('bbox_min_lon', 3, _bbox_edge(2)),
+    ('bbox_max_lon', 3, _bbox_edge(3)),
+]
+
+def register_sql_functions(conn):
+    """Register SQL_FUNCTIONS on a sqlite3 connection"""
+    for name, num_args, func in SQL_FUNCTIONS:
+        conn.create_function(name, num_args, func, deterministic=True)
+
+def bounding_box(lat, lon, radius_km):
+    """
+    Return (min_lat, max_lat, min_lon, max_lon) enclosing every point within
+    radius_km of (lat, lon).
+
+    The box is conservative: near the poles or across the antimeridian it
+    spans all longitudes. Callers refine candidates with an exact distance.
+    """
+    angular = radius_km / EARTH_RADIUS_KM
+    d_lat = math.degrees(angular)
+    min_lat = max(lat - d_lat, -90.0)
+    max_lat = min(lat + d_lat, 90.0)
+
+    if min_lat <= -90.0 or max_lat >= 90.0 or angular >= math.pi / 2:
+        return min_lat, max_lat, -180.0, 180.0
+
+    d_lon = math.degrees(math.asin(min(1.0, math.sin(angular) / math.cos(math.radians(lat)))))
+    min_lon = lon - d_lon
+    max_lon = lon + d_lon
+
+    if min_lon < -180.0 or max_lon > 180.0:
+        return min_lat, max_lat, -180.0, 180.0
+
+    return min_lat, max_lat, min_lon, max_lon
+
+def bbox_filter(index, id_column, lat, lon, radius_km):
+    """
+    Build a WHERE fragment restricting id_column to entries of an R*Tree
+    spatial index (users_geo / jobs_geo) that overlap the radius' bounding box.
+
+    Returns (sql, params).
+    """
+    min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_km)
+    sql = f"""{id_column} IN (
+        SELECT id FROM {index}
+        WHERE min_lat <= ? AND max_lat >= ? AND min_lon <= ? AND max_lon >= ?
+    )"""
+    return sql, [max_lat, min_lat, max_lon, min_lon]
+
+_GEOHASH_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+# Stored precision of the geohash columns (~150 m cells); shorter prefixes
+# of the same value give the coarser grids
+GEOHASH_PRECISION = 7
+
+def geohash_encode(lat, lon, precision=GEOHASH_PRECISION):
+    """Encode a point as a base32 geohash of the given length"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    value = 0
+    bits = 0
+    even = True
+
+    while len(chars) < precision:
+        coord, interval = (lon, lon_range) if even else (lat, lat_range)
+        mid = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coord >= mid:
+            value |= 1
+            interval[0] = mid
+        else:
+            interval[1] = mid
+        even = not even
+
+        bits += 1
+        if bits == 5:
+            chars.append(_GEOHASH_BASE32[value])
+            value = 0
+            bits = 0
+
+    return ''.join(chars)
+
+def geohash_bounds(geohash):
+    """Return (min_lat, max_lat, min_lon, max_lon) of a geohash cell"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+
+    for char in geohash:
+        value = _GEOHASH_BASE32.index(char)
+        for shift in range(4, -1, -1):
+            interval = lon_range if even else lat_range
+            mid = (interval[0] + interval[1]) / 2
+            if value >> shift & 1:
+                interval[0] = mid
+            else:
+                interval[1] = mid
+            even = not even
+
+    return lat_range[0], lat_range[1], lon_range[0], lon_range[1]
+
+def geohash_neighbors(geohash):
+    """Return the cell itself followed by its (up to) 8 neighbouring cells"""
+    min_lat, max_lat, min_lon, max_lon = geohash_bounds(geohash)
+    height, width = max_lat - min_lat, max_lon - min_lon
+    center_lat, center_lon = (min_lat + max_lat) / 2, (min_lon + max_lon) / 2
+
+    cells = [geohash]
+    for d_lat in (-1, 0, 1):
+        lat = center_lat + d_lat * height
+        if not -90.0 < lat < 90.0:
+            continue
+        for d_lon in (-1, 0, 1):
+            lon = (center_lon + d_lon * width + 180.0) % 360.0 - 180.0
+            cell = geohash_encode(lat, lon, len(geohash))
+            if cell not in cells:
+                cells.append(cell)
+    return cells
+
+def geohash_filter(column, cells):
+    """
+    Build a WHERE fragment matching rows whose geohash column starts with
+    any of the given cells, as index-friendly prefix ranges.
+
+    Returns (sql, params).
+    """
+    # '~' sorts after every base32 character
+    sql = ' OR '.join(f"({column} >= ? AND {column} < ?)" for _ in cells)
+    params = []
+    for cell in cells:
+        params.extend([cell, cell + '~'])
+    return f"({sql})", params
+
+def haversine_many(lat, lon, lats, lons):
+    """
+    Vectorized great-circle distances in km from (lat, lon) to arrays of
+    points. Missing coordinates (None/NaN) yield NaN.
+    """
+    lats = np.radians(np.asarray(lats, dtype=float))
+    lons = np.radians(np.asarray(lons, dtype=float))
+    lat, lon = math.radians(lat), math.radians(lon)
+
+    a = np.sin((lats - lat) / 2) ** 2 + math.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+def nearest(lat, lon, lats, lons, radius_km=None):
+    """
+    Distances, mask and sort order for a batch of points in one call.
+
+    Returns (distances, mask, order): mask marks points with coordinates
+    (and within radius_km if given) and order holds their indices sorted
+    by distance, nearest first.
+    """
+    distances = haversine_many(lat, lon, lats, lons)
+    mask = ~np.isnan(distances)
+    if radius_km is not None:
+        mask &= distances <= radius_km
+
+    candidates = np.flatnonzero(mask)
+    order = candidates[np.argsort(distances[candidates], kind='stable')]
+    return distances, mask, order
+
+def sort_by_distance(rows, lat, lon, radius_km=None, lat_key='latitude', lon_key='longitude'):
+    """
+    Attach a 'distance' (km) to each dict row and return the rows with
+    coordinates, within radius_km if given, nearest first.
+    """
+    if not rows:
+        return []
+
+    lats = [row.get(lat_key) for row in rows]
+    lons = [row.get(lon_key) for row in rows]
+    distances, _, order = nearest(lat, lon, lats, lons, radius_km)
+
+    result = []
+    for i in order:
+        row = dict(rows[i])
+        row['distance'] = float(distances[i])
+        result.append(row)
+    return result
@@ -0,0 +1,181 @@
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+
+from config import (
+    GEOCODE_URL, GEOCODE_USER_AGENT, GEOCODE_EMAIL, GEOCODE_TIMEOUT,
+    GEOCODE_MIN_INTERVAL, GEOCODE_CACHE_TTL, GEOCODE_NEGATIVE_TTL, GEOCODE_LRU_SIZE
+)
+from utils.database import get_db
+
+logger = logging.getLogger(__name__)
+
+# Reverse lookups are cached per ~11 m cell
+REVERSE_PRECISION = 4
+
+# In-process LRU in front of the geocode_cache table:
+# cache key -> (result or None, expires_at)
+_lru = OrderedDict()
+_lru_lock = threading.Lock()
+
+# Serializes Nominatim requests so the whole process stays under its rate limit
+_request_lock = threading.Lock()
+_last_request = 0.0
+
+class GeocodingError(Exception):
+    """The location service could not be reached or returned an error"""
+
+def normalize_address(address):
+    """Lowercase and collapse whitespace/punctuation so equivalent queries share a key"""
+    address = re.sub(r'[\s,;]+', ' ', (address or '').lower())
+    return address.strip(' .')
+
+def _lru_get(key):
+    with _lru_lock:
+        entry = _lru.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= time.time():
+            del _lru[key]
+            return None
+        _lru.move_to_end(key)
+        return entry
+
+def _lru_put(key, result, expires_at):
+    with _lru_lock:
+        _lru[key] = (result, expires_at)
+        _lru.move_to_end(key)
+        while len(_lru) > GEOCODE_LRU_SIZE:
+            _lru.popitem(last=False)
+
+def _cache_get(key):
+    """Return (result, expires_at) from the LRU or geocode_cache, or None on a miss"""
+    entry = _lru_get(key)
+    if entry is not None:
+        return entry
+
+    conn = get_db()
+    try:
+        row = conn.execute("""
+            SELECT result, expires_at FROM geocode_cache
+            WHERE cache_key = ? AND expires_at > ?
+        """, (key, time.time())).fetchone()
+    except Exception as e:
+        logger.warning(f"Geocode cache lookup failed: {str(e)}")
+        row = None
+    finally:
+        conn.close()
+
+    if row is None:
+        return None
+
+    result = json.loads(row['result']) if row['result'] else None
+    _lru_put(key, result, row['expires_at'])
+    return result, row['expires_at']
+
+def _cache_put(key, result):
+    """Store a result (None caches a "not found") with the matching TTL"""
+    ttl = GEOCODE_CACHE_TTL if result is not None else GEOCODE_NEGATIVE_TTL
+    expires_at = time.time() + ttl
+    _lru_put(key, result, expires_at)
+
+    conn = get_db()
+    try:
+        conn.execute("""
+            INSERT OR REPLACE INTO geocode_cache (cache_key, result, expires_at)
+            VALUES (?, ?, ?)
+        """, (key, json.dumps(result) if result is not None else None, expires_at))
+        conn.commit()
+    except Exception as e:
+        logger.warning(f"Geocode cache write failed: {str(e)}")
+    finally:
+        conn.close()
+
+def _request(path, params):
+    """Call Nominatim, waiting GEOCODE_MIN_INTERVAL between requests.
+
+    Raises requests.RequestException on network or HTTP errors.
+    """
+    global _last_request
+    headers = {'User-Agent': GEOCODE_USER_AGENT}
+    if GEOCODE_EMAIL:
+        headers['From'] = GEOCODE_EMAIL
+
+    with _request_lock:
+        wait = _last_request + GEOCODE_MIN_INTERVAL - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        try:
+            response = requests.get(
+                f"{GEOCODE_URL}/{path}",
+                params={**params, 'format': 'json', 'addressdetails': 1},
+                headers=headers,
+                timeout=GEOCODE_TIMEOUT
+            )
+        finally:
+            _last_request = time.monotonic()
+
+    response.raise_for_status()
+    return response.json()
+
+def _to_result(place):
+    return {
+        'lat': float(place['lat']),
+        'lon': float(place['lon']),
+        'display_name': place.get('display_name', ''),
+        'address': place.get('address', {})
+    }
+
+def geocode(address):
+    """
+    Geocode an address through the cache.
+
+    Returns a dict with lat, lon, display_name and address (Nominatim
+    address details) or None if the address was not found. Raises
+    GeocodingError if the service is unavailable; those failures are not
+    cached.
+    """
+    query = normalize_address(address)
+    if not query:
+        return None
+
+    key = f"q:{query}"
+    cached = _cache_get(key)
+    if cached is not None:
+        return cached[0]
+
+    try:
+        places = _request('search', {'q': query, 'limit': 1})
+    except (requests.RequestException, ValueError) as e:
+        logger.warning(f"Geocoding error: {str(e)}")
+        raise GeocodingError(str(e)) from e
+
+    result = _to_result(places[0]) if places else None
+    _cache_put(key, result)
+    return result
+
+def reverse_geocode(lat, lon):
+    """Reverse geocode coordinates through the cache; same result and errors as geocode()"""
+    if lat is None or lon is None:
+        return None
+
+    lat, lon = round(float(lat), REVERSE_PRECISION), round(float(lon), REVERSE_PRECISION)
+    key = f"r:{lat},{lon}"
+    cached = _cache_get(key)
+    if cached is not None:
+        return cached[0]
+
+    try:
+        place = _request('reverse', {'lat': lat, 'lon': lon})
+    except (requests.RequestException, ValueError) as e:
+        logger.warning(f"Reverse geocoding error: {str(e)}")
+        raise GeocodingError(str(e)) from e
+
+    result = _to_result(place) if place and 'lat' in place else None
+    _cache_put(key, result)
+    return result
@@ -1,11 +1,11 @@
 import json
 import secrets
-from google_auth_oauthlib.flow import Flow
 from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
 import streamlit as st
 from datetime import datetime
 from utils.database import get_db, create_or_update_user
+from utils.google_clients import fetch_userinfo, oauth_flow, timed
+from utils.session_token import issue_session_token, needs_refresh, read_session_token
 from config import (
     GOOGLE_CLIENT_ID,
     GOOGLE_CLIENT_SECRET,
@@ -35,7 +35,7 @@ def get_google_auth_url(role):
         st.session_state['selected_role'] = role  # Store in both places for redundancy
         
         # Create OAuth flow instance
-        flow = Flow.from_client_config(
+        flow = oauth_flow(
             CLIENT_CONFIG,
             scopes=GOOGLE_SCOPES
         )
@@ -78,21 +78,19 @@ def handle_google_callback():
             return None
 
         # Create OAuth flow instance
-        flow = Flow.from_client_config(
+        flow = oauth_flow(
             CLIENT_CONFIG,
             scopes=GOOGLE_SCOPES,
             redirect_uri=GOOGLE_REDIRECT_URI
         )
         
         # Exchange code for tokens
-        flow.fetch_token(code=code)
-        
-        # Get credentials and create service
-        credentials = flow.credentials
-        service = build('oauth2', 'v2', credentials=credentials)
+        with timed("Google token exchange"):
+            flow.fetch_token(code=code)
         
         # Get user info
-        user_info = service.userinfo().get().execute()
+        credentials = flow.credentials
+        user_info = fetch_userinfo(credentials)
         
         # Create or update user in database
         user = create_or_update_user(user_info, role)
@@ -110,6 +108,7 @@ def handle_google_callback():
                 'client_secret': credentials.client_secret,
                 'scopes': credentials.scopes
             }
+            st.session_state['session_token'] = issue_session_token(user['user_id'])
             
             # Clear OAuth related session data
             for key in ['oauth_role', 'oauth_state', 'selected_role']:
@@ -146,28 +145,45 @@ def handle_google_callback():
         st.rerun()
         return None
 
+def fetch_google_user_id(creds_dict):
+    """Look up the Google account behind stored credentials (network round trip)"""
+    credentials = Credentials(
+        token=creds_dict['token'],
+        refresh_token=creds_dict['refresh_token'],
+        token_uri=creds_dict['token_uri'],
+        client_id=creds_dict['client_id'],
+        client_secret=creds_dict['client_secret'],
+        scopes=creds_dict['scopes']
+    )
+    
+    user_info = fetch_userinfo(credentials)
+    
+    # Keep the access token if it was refreshed on the way
+    creds_dict['token'] = credentials.token
+    return user_info['id']
+
 def restore_session():
-    """Restore user session from stored credentials"""
+    """
+    Restore user session from stored credentials.
+    
+    The signed session token is checked locally; Google is only asked who
+    the credentials belong to when there is no valid token or it is about
+    to expire, and a fresh token is issued then.
+    """
     try:
         if 'credentials' in st.session_state and 'user' not in st.session_state:
-            creds_dict = st.session_state['credentials']
-            credentials = Credentials(
-                token=creds_dict['token'],
-                refresh_token=creds_dict['refresh_token'],
-                token_uri=creds_dict['token_uri'],
-                client_id=creds_dict['client_id'],
-                client_secret=creds_dict['client_secret'],
-                scopes=creds_dict['scopes']
-            )
-            
-            service = build('oauth2', 'v2', credentials=credentials)
-            user_info = service.userinfo().get().execute()
+            claims = read_session_token(st.session_state.get('session_token'))
+            if claims is None or needs_refresh(claims):
+                user_id = fetch_google_user_id(st.session_state['credentials'])
+                st.session_state['session_token'] = issue_session_token(user_id)
+            else:
+                user_id = claims['sub']
             
             # Get user from database
             conn = get_db()
             cursor = conn.cursor()
             try:
-                cursor.execute("SELECT * FROM users WHERE user_id = ?", (user_info['id'],))
+                cursor.execute("SELECT * FROM users WHERE user_id = ?", (user_id,))
                 user = cursor.fetchone()
                 if user:
                     st.session_state['user'] = dict(user)
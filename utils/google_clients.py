@@ -0,0 +1,83 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+import httplib2
+from google_auth_httplib2 import AuthorizedHttp
+from google_auth_oauthlib.flow import Flow
+from googleapiclient.discovery import build
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# One connection pool for every token endpoint request; each Flow gets a
+# fresh OAuth2Session, but they all share this adapter's kept-alive connections
+_token_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+
+_service = None
+_service_lock = threading.Lock()
+
+# Idle httplib2.Http objects (each holding a kept-alive connection to
+# Google) shared by all script runs. httplib2.Http is not thread-safe, so
+# each call checks one out exclusively; a thread-local would be used for a
+# single rerun only, since Streamlit runs every rerun on a fresh thread.
+_idle_http = []
+_http_lock = threading.Lock()
+MAX_IDLE_HTTP = 4
+
+@contextmanager
+def timed(label):
+    """Log how long the enclosed Google call took"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        logger.info(f"{label} took {(time.perf_counter() - start) * 1000:.0f} ms")
+
+def pooled_session(session):
+    """Route a requests/OAuth2Session's HTTPS traffic through the shared pool"""
+    session.mount('https://', _token_adapter)
+    return session
+
+def oauth_flow(client_config, scopes, **kwargs):
+    """OAuth Flow whose token exchange reuses the shared connection pool"""
+    flow = Flow.from_client_config(client_config, scopes=scopes, **kwargs)
+    pooled_session(flow.oauth2session)
+    return flow
+
+def oauth2_service():
+    """
+    The oauth2 v2 API client, built once from the discovery document bundled
+    with google-api-python-client (no discovery request). It carries no
+    credentials; fetch_userinfo supplies them per call.
+    """
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = build('oauth2', 'v2', http=httplib2.Http(), static_discovery=True)
+    return _service
+
+@contextmanager
+def _http():
+    """Check out an idle Http from the pool (or a new one) and return it afterwards"""
+    with _http_lock:
+        http = _idle_http.pop() if _idle_http else None
+    http = http or httplib2.Http()
+    try:
+        yield http
+    finally:
+        with _http_lock:
+            keep = len(_idle_http) < MAX_IDLE_HTTP
+            if keep:
+                _idle_http.append(http)
+        if not keep:
+            http.close()
+
+def fetch_userinfo(credentials):
+    """Google userinfo for credentials, over a pooled kept-alive connection"""
+    with timed("Google userinfo"), _http() as http:
+        return oauth2_service().userinfo().get().execute(
+            http=AuthorizedHttp(credentials, http=http)
+        )
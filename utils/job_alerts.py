@@ -0,0 +1,163 @@
+import re
+from bisect import bisect_right
+
+from utils.geo import haversine_many
+from utils.tags import unpack_tags
+
+def split_list(value):
+    """Comma-separated alert preference as a list of stripped, non-empty items"""
+    return [item.strip() for item in (value or '').split(',') if item.strip()]
+
+def tokenize(text):
+    """Lower-case word tokens of a piece of text"""
+    return re.findall(r'\w+', (text or '').lower())
+
+def alert_preferences(alert):
+    """
+    Normalized preferences of a job_alerts row.
+
+    Categories and job types come from the precomputed category_tags and
+    type_tags sets, whichever column spelling the database uses.
+    """
+    return {
+        'trade_categories': unpack_tags(alert.get('category_tags')),
+        'job_types': unpack_tags(alert.get('type_tags')),
+        'keywords': [kw.lower() for kw in split_list(alert.get('keywords'))],
+        'min_pay': alert.get('min_pay'),
+        'max_distance': alert.get('max_distance')
+    }
+
+class JobIndex:
+    """
+    Inverted indexes over a batch of new jobs, built once per alert run.
+
+    Jobs are addressed by their position in the batch; each index maps a
+    value (a tag id for categories and job types) to the set of positions
+    holding it, so an alert is matched by intersecting a few sets instead of
+    scanning every job.
+    """
+
+    def __init__(self, jobs):
+        self.jobs = jobs
+        self.all = set(range(len(jobs)))
+        self.by_category = {}
+        self.by_type = {}
+        self.by_token = {}
+        self.text = []
+
+        for i, job in enumerate(jobs):
+            for tag_id in unpack_tags(job.get('category_tags')):
+                self.by_category.setdefault(tag_id, set()).add(i)
+            for tag_id in unpack_tags(job.get('type_tags')):
+                self.by_type.setdefault(tag_id, set()).add(i)
+            text = f"{job.get('title') or ''} {job.get('description') or ''}".lower()
+            self.text.append(text)
+            for token in set(tokenize(text)):
+                self.by_token.setdefault(token, set()).add(i)
+
+        self.lats = [job.get('job_latitude') for job in jobs]
+        self.lons = [job.get('job_longitude') for job in jobs]
+
+    def lookup(self, index, values):
+        """Positions whose indexed value is any of values"""
+        result = set()
+        for value in values:
+            result |= index.get(value, set())
+        return result
+
+    def keyword_candidates(self, keyword):
+        """
+        Positions whose title/description contain keyword.
+
+        Jobs holding every word of the keyword are taken from the token
+        index, then checked with a substring test so multi-word keywords
+        keep their phrase semantics. Keywords with no word characters fall
+        back to a scan.
+        """
+        tokens = tokenize(keyword)
+        if tokens:
+            candidates = set.intersection(*(self.by_token.get(token, set()) for token in tokens))
+        else:
+            candidates = self.all
+        return {i for i in candidates if keyword in self.text[i]}
+
+    def match(self, preferences, user_lat=None, user_lon=None, within=None):
+        """
+        Sorted positions of the jobs matching one alert's preferences,
+        restricted to within (a set or range of positions) if given.
+        """
+        matches = []
+        if preferences['trade_categories']:
+            matches.append(self.lookup(self.by_category, preferences['trade_categories']))
+        if preferences['job_types']:
+            matches.append(self.lookup(self.by_type, preferences['job_types']))
+        if preferences['keywords']:
+            matched = set()
+            for keyword in preferences['keywords']:
+                matched |= self.keyword_candidates(keyword)
+            matches.append(matched)
+
+        if matches:
+            candidates = set.intersection(*matches)
+            if within is not None:
+                candidates = {i for i in candidates if i in within}
+        else:
+            candidates = set(self.all if within is None else within)
+
+        min_pay = preferences['min_pay']
+        if min_pay and candidates:
+            candidates = {
+                i for i in candidates
+                if not self.jobs[i].get('payment_amount') or self.jobs[i]['payment_amount'] >= min_pay
+            }
+
+        # Jobs without coordinates pass the distance check, as before
+        max_distance = preferences['max_distance']
+        if max_distance and user_lat is not None and user_lon is not None and candidates:
+            positions = sorted(candidates)
+            distances = haversine_many(
+                user_lat, user_lon,
+                [self.lats[i] for i in positions],
+                [self.lons[i] for i in positions]
+            )
+            candidates = {i for i, d in zip(positions, distances) if not d > max_distance}
+
+        return sorted(candidates)
+
+def match_alerts(alerts, jobs, default_since=None):
+    """
+    Match every alert against a batch of new jobs in one pass.
+
+    jobs must be ordered by job_id. Each alert row needs latitude/longitude
+    of its user and its last_job_id high-water mark; only jobs with a larger
+    job_id are considered for it. An alert without a mark only considers
+    jobs created after default_since (an ISO timestamp), or every job if
+    that is None.
+
+    Returns a list of (alert, matching jobs) for alerts with at least one match.
+    """
+    if not alerts or not jobs:
+        return []
+
+    index = JobIndex(jobs)
+    job_ids = [job['job_id'] for job in jobs]
+    recent = None
+    if default_since is not None:
+        recent = {i for i, job in enumerate(jobs) if (job.get('created_at') or '') > default_since}
+
+    results = []
+    for alert in alerts:
+        last_job_id = alert.get('last_job_id')
+        if last_job_id is not None:
+            within = range(bisect_right(job_ids, last_job_id), len(jobs))
+        else:
+            within = recent
+
+        positions = index.match(
+            alert_preferences(alert),
+            alert.get('latitude'), alert.get('longitude'),
+            within
+        )
+        if positions:
+            results.append((alert, [jobs[i] for i in positions]))
+    return results
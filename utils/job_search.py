@@ -0,0 +1,91 @@
+import re
+
+from utils.database import table_columns
+
+# bm25() weights in utils.database.JOB_SEARCH_COLUMNS order: title matches count most
+BM25_WEIGHTS = (10.0, 1.0, 2.0, 2.0, 5.0, 3.0)
+
+# Markers snippet() puts around matched terms (Markdown bold)
+SNIPPET_START = '**'
+SNIPPET_END = '**'
+
+def has_fts():
+    """Whether the jobs_fts full-text index exists"""
+    return bool(table_columns('jobs_fts'))
+
+def build_match_query(text):
+    """
+    Turn free text into an FTS5 MATCH expression, or None if it has no terms.
+
+    Every word must match and is treated as a prefix, so partially typed
+    words still find results. Words are quoted, so FTS5 operators typed by
+    the user are searched literally.
+    """
+    terms = re.findall(r'\w+', text or '')
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"*' for term in terms)
+
+def keyword_filter(text, alias='j'):
+    """
+    Build a WHERE fragment restricting the jobs table aliased as alias to
+    jobs matching text.
+
+    Uses jobs_fts when available and LIKE over title/description otherwise.
+    Returns (sql, params); sql is None when text has no searchable terms.
+    """
+    match = build_match_query(text)
+    if match is None:
+        return None, []
+
+    if has_fts():
+        return f"{alias}.job_id IN (SELECT rowid FROM jobs_fts WHERE jobs_fts MATCH ?)", [match]
+
+    pattern = f"%{text.strip()}%"
+    return f"({alias}.title LIKE ? OR {alias}.description LIKE ?)", [pattern, pattern]
+
+def keyword_join(text, alias='j'):
+    """
+    Build a JOIN restricting results to jobs matching text and exposing
+    match_rank (bm25, lower is better) and match_snippet columns.
+
+    Returns (sql, params), or (None, []) when text has no searchable terms
+    or the full-text index is unavailable (use keyword_filter instead).
+    """
+    match = build_match_query(text)
+    if match is None or not has_fts():
+        return None, []
+
+    # LIMIT -1 keeps SQLite from flattening the subquery into the outer
+    # join, where the bm25()/snippet() auxiliary functions cannot run
+    weights = ', '.join(str(weight) for weight in BM25_WEIGHTS)
+    sql = f"""
+        JOIN (
+            SELECT rowid AS match_id,
+                   bm25(jobs_fts, {weights}) AS match_rank,
+                   snippet(jobs_fts, -1, '{SNIPPET_START}', '{SNIPPET_END}', '…', 16) AS match_snippet
+            FROM jobs_fts
+            WHERE jobs_fts MATCH ?
+            LIMIT -1
+        ) m ON m.match_id = {alias}.job_id
+    """
+    return sql, [match]
+
+def search_jobs(conn, text, limit=20, status='Open'):
+    """
+    Full-text search over jobs, best match first.
+
+    Returns job dicts with match_rank and match_snippet added.
+    """
+    join_sql, params = keyword_join(text)
+    if join_sql is None:
+        where_sql, params = keyword_filter(text)
+        if where_sql is None:
+            return []
+        query = f"SELECT j.*, NULL AS match_rank, NULL AS match_snippet FROM jobs j WHERE {where_sql} AND j.status = ? ORDER BY j.created_at DESC LIMIT ?"
+    else:
+        query = f"SELECT j.*, m.match_rank, m.match_snippet FROM jobs j {join_sql} WHERE j.status = ? ORDER BY m.match_rank LIMIT ?"
+
+    cursor = conn.cursor()
+    cursor.execute(query, params + [status, limit])
+    return [dict(row) for row in cursor.fetchall()]
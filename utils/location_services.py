@@ -1,45 +1,35 @@
 import streamlit as st
 import folium
 from folium import plugins
-from geopy.geocoders import Nominatim
-from geopy.distance import geodesic
 import json
 from streamlit_folium import folium_static
-import requests
 from typing import Tuple, Optional
-
-# Initialize the geocoder
-geocoder = Nominatim(user_agent="jobcon_app")
+from utils.geo import haversine_km
+from utils.geocoding import geocode, reverse_geocode as cached_reverse_geocode, GeocodingError
 
 def geocode_address(address: str) -> Optional[Tuple[float, float]]:
-    """Convert address to coordinates using Nominatim"""
+    """Convert address to coordinates using the cached Nominatim lookup"""
     try:
-        url = f"https://nominatim.openstreetmap.org/search?q={address}&format=json&limit=1"
-        response = requests.get(url, headers={'User-Agent': 'JobCon/1.0'})
-        data = response.json()
-        
-        if data:
-            lat = float(data[0]['lat'])
-            lon = float(data[0]['lon'])
-            return (lat, lon)
-        return None
-    except Exception as e:
-        st.error(f"Error geocoding address: {str(e)}")
+        location = geocode(address)
+    except GeocodingError:
         return None
+    if location:
+        return (location['lat'], location['lon'])
+    return None
 
 def reverse_geocode(lat, lon):
     """Convert coordinates to address"""
     try:
-        location = geocoder.reverse((lat, lon))
-        if location:
-            return location.address
-    except Exception as e:
-        st.error(f"Error reverse geocoding: {str(e)}")
+        location = cached_reverse_geocode(lat, lon)
+    except GeocodingError:
+        return None
+    if location:
+        return location['display_name']
     return None
 
 def calculate_distance(coord1, coord2):
-    """Calculate distance between two coordinates in kilometers"""
-    return geodesic(coord1, coord2).kilometers
+    """Calculate distance between two (lat, lon) coordinates in kilometers"""
+    return haversine_km(coord1[0], coord1[1], coord2[0], coord2[1])
 
 def create_map(center_lat=0, center_lon=0, zoom_start=13):
     """Create a Folium map centered at the specified coordinates"""
@@ -82,36 +72,32 @@ def show_location_picker(default_location: str = "", height: int = 400) -> Tuple
     return location, coordinates
 
 def show_job_map(jobs: list, height: int = 600):
-    """Show multiple jobs on a map"""
-    if not jobs:
+    """Show multiple jobs on a map using their stored coordinates"""
+    # Jobs without coordinates yet are skipped rather than geocoded here
+    located = [job for job in jobs if job.get('job_latitude') is not None and job.get('job_longitude') is not None]
+    if not located:
         return
     
     # Create map centered on the first job
-    first_job = jobs[0]
-    coordinates = geocode_address(first_job['location'])
-    if not coordinates:
-        return
-    
-    m = folium.Map(location=coordinates, zoom_start=11)
+    first_job = located[0]
+    m = folium.Map(location=(first_job['job_latitude'], first_job['job_longitude']), zoom_start=11)
     
     # Add markers for all jobs
-    for job in jobs:
-        coords = geocode_address(job['location'])
-        if coords:
-            # Create popup content
-            popup_html = f"""
-                <b>{job['title']}</b><br>
-                at {job.get('company_name', job['poster_name'])}<br>
-                {job['job_type']}<br>
-                {job.get('payment_type', '')}
-            """
-            
-            # Add marker
-            folium.Marker(
-                coords,
-                popup=folium.Popup(popup_html, max_width=300),
-                icon=folium.Icon(color='red', icon='info-sign')
-            ).add_to(m)
+    for job in located:
+        # Create popup content
+        popup_html = f"""
+            <b>{job['title']}</b><br>
+            at {job.get('company_name') or job.get('poster_name', '')}<br>
+            {job['job_type']}<br>
+            {job.get('payment_type', '')}
+        """
+        
+        # Add marker
+        folium.Marker(
+            (job['job_latitude'], job['job_longitude']),
+            popup=folium.Popup(popup_html, max_width=300),
+            icon=folium.Icon(color='red', icon='info-sign')
+        ).add_to(m)
     
     # Display map
     folium_static(m, height=height)
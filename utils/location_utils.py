@@ -1,27 +1,17 @@
-import math
+from datetime import datetime
+from config import ZIP_SEARCH_GEOHASH_PRECISION
+from utils.geo import (
+    bounding_box, geohash_encode, geohash_filter, geohash_neighbors,
+    haversine_km, sort_by_distance
+)
+from utils.tags import parse_tags, tag_ids, unpack_tags
 
 def calculate_distance(lat1, lon1, lat2, lon2):
     """
     Calculate the distance between two points on the Earth's surface
     using the Haversine formula
     """
-    # Convert latitude and longitude from degrees to radians
-    lat1_rad = math.radians(lat1)
-    lon1_rad = math.radians(lon1)
-    lat2_rad = math.radians(lat2)
-    lon2_rad = math.radians(lon2)
-    
-    # Earth radius in kilometers
-    earth_radius = 6371.0
-    
-    # Haversine formula
-    dlon = lon2_rad - lon1_rad
-    dlat = lat2_rad - lat1_rad
-    a = math.sin(dlat/2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlon/2)**2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-    distance = earth_radius * c
-    
-    return distance
+    return haversine_km(lat1, lon1, lat2, lon2)
 
 def update_user_location(user_id, latitude, longitude, location_name, postal_code=None):
     """
@@ -38,6 +28,7 @@ def update_user_location(user_id, latitude, longitude, location_name, postal_cod
         True if update was successful, False otherwise
     """
     from utils.database import get_db
+    from utils.recommendations import invalidate_recommendations
     
     try:
         conn = get_db()
@@ -57,6 +48,7 @@ def update_user_location(user_id, latitude, longitude, location_name, postal_cod
             """, (latitude, longitude, location_name, user_id))
         
         conn.commit()
+        invalidate_recommendations(user_id)
         return True
     except Exception as e:
         print(f"Error updating user location: {str(e)}")
@@ -64,7 +56,57 @@ def update_user_location(user_id, latitude, longitude, location_name, postal_cod
     finally:
         conn.close()
 
-def get_nearby_users(db_conn, user_id, user_role, distance_km=50, zip_code=None):
+def get_postal_centroid(postal_code):
+    """
+    Return the (latitude, longitude) centroid of a postal code, or None
+    
+    Computed once and stored in postal_centroids: the mean of the users and
+    jobs already known in that postal code, or else the geocoded code.
+    """
+    from utils.database import db_connection
+    from utils.geocoding import geocode, GeocodingError
+    
+    with db_connection() as conn:
+        row = conn.execute("""
+            SELECT latitude, longitude FROM postal_centroids WHERE postal_code = ?
+        """, (postal_code,)).fetchone()
+        if row:
+            return row['latitude'], row['longitude']
+        
+        row = conn.execute("""
+            SELECT AVG(lat) AS latitude, AVG(lon) AS longitude FROM (
+                SELECT latitude AS lat, longitude AS lon FROM users
+                WHERE postal_code = ? AND latitude IS NOT NULL AND longitude IS NOT NULL
+                UNION ALL
+                SELECT job_latitude, job_longitude FROM jobs
+                WHERE postal_code = ? AND job_latitude IS NOT NULL AND job_longitude IS NOT NULL
+            )
+        """, (postal_code, postal_code)).fetchone()
+    
+    if row and row['latitude'] is not None:
+        centroid = (row['latitude'], row['longitude'])
+    else:
+        try:
+            location = geocode(postal_code)
+        except GeocodingError:
+            return None
+        if not location:
+            return None
+        centroid = (location['lat'], location['lon'])
+    
+    with db_connection() as conn:
+        conn.execute("""
+            INSERT OR REPLACE INTO postal_centroids (postal_code, latitude, longitude, geohash, updated_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, (postal_code, centroid[0], centroid[1], geohash_encode(*centroid), datetime.now().isoformat()))
+    
+    return centroid
+
+def has_skills(user, wanted):
+    """Whether a user row's skill or trade tag set shares a tag id with wanted"""
+    return bool(wanted & (unpack_tags(user['skill_tags']) | unpack_tags(user['trade_tags'])))
+
+def get_nearby_users(db_conn, user_id, user_role, distance_km=50, zip_code=None, skills=None):
     """
     Find nearby users based on a user's location and role
     
@@ -74,12 +116,24 @@ def get_nearby_users(db_conn, user_id, user_role, distance_km=50, zip_code=None)
         user_role: Role of the user ('Job Seeker' or 'Job Poster')
         distance_km: Maximum distance in kilometers (default: 50)
         zip_code: Optional filter by zip/postal code
+        skills: Optional comma-separated skills; only users listing at least
+            one of them in their skills or preferred trades are returned
         
     Returns:
         List of nearby users with opposite role
     """
+    from utils.database import has_column, has_spatial_index, refresh_geohashes, refresh_tags
+    
     cursor = db_conn.cursor()
     
+    # Wanted skills as tag ids; a skill no one has listed matches no one
+    wanted = None
+    if skills and parse_tags(skills):
+        refresh_tags()
+        wanted = tag_ids(db_conn, parse_tags(skills))
+        if not wanted:
+            return []
+    
     # Get the user's location
     cursor.execute("""
         SELECT latitude, longitude, postal_code 
@@ -95,24 +149,41 @@ def get_nearby_users(db_conn, user_id, user_role, distance_km=50, zip_code=None)
         target_role = 'Job Seeker'
         
         try:
-            # Find users with matching zip/postal code
-            cursor.execute("""
-                SELECT user_id, name, email, company_name, location, latitude, longitude, 
-                       picture_url, skills, preferred_trades, postal_code
-                FROM users
-                WHERE role = ? AND postal_code = ?
-            """, (target_role, zip_code))
+            columns = """user_id, name, email, company_name, location, latitude, longitude, 
+                       picture_url, skills, preferred_trades, postal_code, skill_tags, trade_tags"""
+            
+            # Users with exactly this zip/postal code
+            query = f"SELECT {columns} FROM users WHERE role = ? AND postal_code = ?"
+            params = [target_role, zip_code]
             
+            # Plus users in the postal code's geohash cell and its neighbours
+            centroid = get_postal_centroid(zip_code) if has_column('users', 'geohash') else None
+            if centroid:
+                refresh_geohashes()
+                cell = geohash_encode(centroid[0], centroid[1], ZIP_SEARCH_GEOHASH_PRECISION)
+                cell_sql, cell_params = geohash_filter('geohash', geohash_neighbors(cell))
+                query += f" UNION SELECT {columns} FROM users WHERE role = ? AND {cell_sql}"
+                params += [target_role] + cell_params
+            
+            cursor.execute(query, params)
             matches = cursor.fetchall()
             
-            # Add distance = 0 to indicate they're in the same zip code
             nearby_users = []
             for user in matches:
+                if wanted is not None and not has_skills(user, wanted):
+                    continue
                 if user['user_id'] != user_id:  # Don't include the current user
                     user_data = dict(user)
-                    user_data['distance'] = 0  # Same zip code, so distance is considered 0
+                    if user['postal_code'] == zip_code or not centroid:
+                        user_data['distance'] = 0  # Same zip code, so distance is considered 0
+                    else:
+                        # Approximate: distance from the postal code's centroid
+                        user_data['distance'] = round(haversine_km(
+                            centroid[0], centroid[1], user['latitude'], user['longitude']
+                        ), 1)
                     nearby_users.append(user_data)
-                
+            
+            nearby_users.sort(key=lambda x: x['distance'])
             return nearby_users
             
         except Exception as e:
@@ -130,30 +201,35 @@ def get_nearby_users(db_conn, user_id, user_role, distance_km=50, zip_code=None)
     # Determine the role we're looking for - we only want job seekers if we're a job poster
     target_role = 'Job Seeker'
     
-    # Find users with the opposite role
-    cursor.execute("""
-        SELECT user_id, name, email, company_name, location, latitude, longitude, 
-               picture_url, skills, preferred_trades
-        FROM users
-        WHERE role = ? AND latitude IS NOT NULL AND longitude IS NOT NULL
-    """, (target_role,))
-    
-    potential_matches = cursor.fetchall()
-    nearby_users = []
-    
-    for user in potential_matches:
-        if user['user_id'] != user_id and user['latitude'] and user['longitude']:  # Don't include the current user
-            dist = calculate_distance(
-                user_lat, user_lon, 
-                user['latitude'], user['longitude']
-            )
-            
-            if dist <= distance_km:
-                user_data = dict(user)
-                user_data['distance'] = round(dist, 1)
-                nearby_users.append(user_data)
-    
-    # Sort by distance
-    nearby_users.sort(key=lambda x: x['distance'])
-    
-    return nearby_users 
\ No newline at end of file
+    # Prefilter candidates to the radius' bounding box, then refine below
+    min_lat, max_lat, min_lon, max_lon = bounding_box(user_lat, user_lon, distance_km)
+    
+    if has_spatial_index('users_geo'):
+        # Served by the users_geo R*Tree instead of scanning every seeker
+        cursor.execute("""
+            SELECT u.user_id, u.name, u.email, u.company_name, u.location, u.latitude, u.longitude, 
+                   u.picture_url, u.skills, u.preferred_trades, u.skill_tags, u.trade_tags
+            FROM users_geo g
+            JOIN user_geo_ids k ON k.geo_id = g.id
+            JOIN users u ON u.user_id = k.user_id
+            WHERE g.min_lat <= ? AND g.max_lat >= ? AND g.min_lon <= ? AND g.max_lon >= ?
+            AND u.role = ?
+        """, (max_lat, min_lat, max_lon, min_lon, target_role))
+    else:
+        cursor.execute("""
+            SELECT user_id, name, email, company_name, location, latitude, longitude, 
+                   picture_url, skills, preferred_trades, skill_tags, trade_tags
+            FROM users
+            WHERE role = ? AND latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ?
+        """, (target_role, min_lat, max_lat, min_lon, max_lon))
+    
+    # Exact distances for all candidates in one vectorized pass
+    candidates = [row for row in cursor.fetchall() if row['user_id'] != user_id]  # Don't include the current user
+    if wanted is not None:
+        candidates = [row for row in candidates if has_skills(row, wanted)]
+    nearby_users = sort_by_distance(candidates, user_lat, user_lon, distance_km)
+    
+    for user in nearby_users:
+        user['distance'] = round(user['distance'], 1)
+    
+    return nearby_users 
@@ -0,0 +1,27 @@
+import threading
+
+class MessageHub:
+    """
+    In-process publish/subscribe for new messages, keyed by user_id.
+
+    All Streamlit sessions share this process, so a message sent in one
+    session can tell the recipient's session that its inbox changed without
+    either of them querying the database. Each channel is a counter that is
+    bumped on publish; subscribers remember the last value they handled and
+    only reload when it moves.
+    """
+    _versions = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def publish(*user_ids):
+        """Signal new messages for each of user_ids"""
+        with MessageHub._lock:
+            for user_id in user_ids:
+                MessageHub._versions[user_id] = MessageHub._versions.get(user_id, 0) + 1
+
+    @staticmethod
+    def version(user_id):
+        """Current counter of a user's channel (0 until the first publish)"""
+        with MessageHub._lock:
+            return MessageHub._versions.get(user_id, 0)
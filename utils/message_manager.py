@@ -0,0 +1,143 @@
+from datetime import datetime
+from config import MESSAGES_PER_PAGE
+from utils.database import get_db, get_unread_counters, table_columns
+from utils.message_hub import MessageHub
+
+class MessageManager:
+    @staticmethod
+    def message_column():
+        """Name of the message text column ('content' on databases predating migration 4)"""
+        return 'message' if 'message' in table_columns('messages') else 'content'
+
+    @staticmethod
+    def get_conversations(user_id, limit=50):
+        """
+        Get a user's conversations, most recent first.
+
+        Reads the conversations summary table, so the cost does not grow with
+        the number of messages exchanged.
+        """
+        conn = get_db()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f"""
+                SELECT c.other_user_id, c.unread_count, c.last_at,
+                       u.name as other_user_name, u.company_name,
+                       m.{MessageManager.message_column()} as last_message
+                FROM conversations c
+                JOIN users u ON u.user_id = c.other_user_id
+                LEFT JOIN messages m ON m.message_id = c.last_message_id
+                WHERE c.user_id = ?
+                ORDER BY c.last_at DESC
+                LIMIT ?
+            """, (user_id, limit))
+            return cursor.fetchall()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def get_thread(user_id, other_user_id, before_id=None, after_id=None, limit=MESSAGES_PER_PAGE):
+        """
+        Get messages between two users in message_id order (oldest first).
+
+        By default returns the latest limit messages; before_id pages back
+        from an older message and after_id returns only messages newer than
+        the last one seen (without a limit).
+        """
+        if after_id is not None:
+            condition, params, order, limit = "message_id > ?", [after_id], "", -1
+        elif before_id is not None:
+            condition, params, order = "message_id < ?", [before_id], " DESC"
+        else:
+            condition, params, order = "1", [], " DESC"
+
+        # Each direction is a range scan on idx_messages_pair; limiting both
+        # sides before merging keeps the cost independent of thread length
+        page = f"""
+            SELECT message_id FROM messages
+            WHERE sender_id = ? AND receiver_id = ? AND {condition}
+            ORDER BY message_id{order} LIMIT ?
+        """
+
+        conn = get_db()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f"""
+                SELECT m.*, u.name as sender_name, u.company_name,
+                       m.{MessageManager.message_column()} as message_text
+                FROM messages m
+                JOIN users u ON m.sender_id = u.user_id
+                WHERE m.message_id IN (
+                    SELECT message_id FROM ({page})
+                    UNION ALL
+                    SELECT message_id FROM ({page})
+                )
+                ORDER BY m.message_id{order}
+                LIMIT ?
+            """, [user_id, other_user_id, *params, limit,
+                  other_user_id, user_id, *params, limit,
+                  limit])
+            messages = cursor.fetchall()
+        finally:
+            conn.close()
+
+        return messages if after_id is not None else messages[::-1]
+
+    @staticmethod
+    def get_unread_count(user_id):
+        """Total unread messages of a user (from unread_counters)"""
+        return get_unread_counters(user_id)['messages']
+
+    @staticmethod
+    def mark_conversation_read(user_id, other_user_id):
+        """Mark everything other_user_id sent to user_id as read"""
+        conn = get_db()
+        try:
+            conn.execute("""
+                UPDATE messages
+                SET is_read = 1
+                WHERE receiver_id = ? AND is_read = 0 AND sender_id = ?
+            """, (user_id, other_user_id))
+            conn.commit()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def message_values(sender_id, receiver_id, text, created_at=None, **extra):
+        """
+        Column -> value mapping for one messages row on the current schema.
+
+        extra columns (e.g. application_id) are only kept if they exist.
+        """
+        columns = table_columns('messages')
+        values = {
+            'sender_id': sender_id,
+            'receiver_id': receiver_id,
+            MessageManager.message_column(): text,
+            'created_at': created_at or datetime.now().isoformat(),
+            'is_read': 0
+        }
+        if 'other_user_id' in columns:
+            # other_user_id is the conversation partner, i.e. the receiver
+            values['other_user_id'] = receiver_id
+        values.update((column, value) for column, value in extra.items() if column in columns)
+        return values
+
+    @staticmethod
+    def send_message(sender_id, receiver_id, text):
+        """Store a message, wake both participants' open chats and return its message_id"""
+        values = MessageManager.message_values(sender_id, receiver_id, text)
+
+        conn = get_db()
+        try:
+            cursor = conn.execute(
+                f"INSERT INTO messages ({', '.join(values)}) VALUES ({', '.join('?' for _ in values)})",
+                tuple(values.values())
+            )
+            conn.commit()
+            message_id = cursor.lastrowid
+        finally:
+            conn.close()
+
+        MessageHub.publish(sender_id, receiver_id)
+        return message_id
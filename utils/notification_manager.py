@@ -1,61 +1,63 @@
-import smtplib
-import os
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from datetime import datetime
-from utils.database import get_db
-from utils.location_manager import calculate_distance
+from datetime import datetime, timedelta
+from utils.database import get_db, get_unread_counters, refresh_tags, table_columns
+from utils import email_outbox
+from utils.job_alerts import match_alerts
+from utils.message_hub import MessageHub
+from utils.message_manager import MessageManager
 from dotenv import load_dotenv
 import streamlit as st
-import sqlite3
 
 # Load environment variables
 load_dotenv()
 
 class NotificationManager:
-    # Email configuration
-    SMTP_SERVER = os.getenv('SMTP_SERVER', 'smtp.gmail.com')
-    SMTP_PORT = int(os.getenv('SMTP_PORT', '587'))
-    SMTP_USERNAME = os.getenv('SMTP_USERNAME', '')
-    SMTP_PASSWORD = os.getenv('SMTP_PASSWORD', '')
-    SMTP_FROM_NAME = os.getenv('SMTP_FROM_NAME', 'JobCon')
-
     @staticmethod
-    def send_email(to_email, subject, body):
-        """Send email notification"""
-        if not all([NotificationManager.SMTP_USERNAME, NotificationManager.SMTP_PASSWORD]):
+    def send_email(to_email, subject, body, digest_key=None, conn=None):
+        """
+        Queue an email notification for the background outbox worker.
+
+        Emails sharing a recipient and digest_key are coalesced into one
+        digest; pass conn to queue inside the caller's transaction.
+        """
+        if not email_outbox.is_configured():
             print("Email configuration missing. Please set up SMTP credentials.")
             return False
         
         try:
-            msg = MIMEMultipart()
-            msg['From'] = f"{NotificationManager.SMTP_FROM_NAME} <{NotificationManager.SMTP_USERNAME}>"
-            msg['To'] = to_email
-            msg['Subject'] = subject
-            
-            msg.attach(MIMEText(body, 'html'))
-            
-            server = smtplib.SMTP(NotificationManager.SMTP_SERVER, NotificationManager.SMTP_PORT)
-            server.starttls()
-            server.login(NotificationManager.SMTP_USERNAME, NotificationManager.SMTP_PASSWORD)
-            server.send_message(msg)
-            server.quit()
+            email_outbox.enqueue_email(to_email, subject, body, digest_key, conn)
             return True
         except Exception as e:
-            print(f"Failed to send email: {str(e)}")
+            print(f"Failed to queue email: {str(e)}")
             return False
 
     @staticmethod
     def check_job_alerts():
-        """Check for new jobs matching premium users' preferences"""
+        """
+        Check for new jobs matching premium users' preferences.
+
+        New jobs are fetched once and matched against every active alert in
+        one pass (see utils.job_alerts). Each alert remembers the newest job
+        it was matched against in last_job_id, so a job is alerted once; an
+        alert without a mark yet looks back one hour.
+        """
         conn = get_db()
         cursor = conn.cursor()
         
         try:
+            # Jobs inserted after this point are left for the next run
+            cursor.execute("SELECT MAX(job_id) AS max_job_id FROM jobs")
+            max_job_id = cursor.fetchone()['max_job_id']
+            if max_job_id is None:
+                return
+            
+            # Tag sets of alerts and jobs edited since the last refresh. This
+            # runs after max_job_id is read, so every job up to the new
+            # high-water mark (and every alert) has its tags before matching
+            refresh_tags()
+            
             # Get premium users with active alerts
             cursor.execute("""
-                SELECT u.*, ja.trade_categories, ja.keywords, ja.max_distance,
-                       ja.min_pay, ja.job_types
+                SELECT ja.*, u.email, u.latitude, u.longitude
                 FROM users u
                 JOIN job_alerts ja ON u.user_id = ja.user_id
                 WHERE u.is_premium = 1 
@@ -63,82 +65,73 @@ class NotificationManager:
                 AND ja.is_active = 1
             """, (datetime.now().isoformat(),))
             
-            users = cursor.fetchall()
-            
-            for user in users:
-                # Get jobs posted in the last hour
-                cursor.execute("""
-                    SELECT j.*, u.company_name, u.name as poster_name
-                    FROM jobs j
-                    JOIN users u ON j.job_poster_id = u.user_id
-                    WHERE j.created_at > datetime('now', '-1 hour')
-                    AND j.status = 'Open'
-                """)
-                
-                new_jobs = cursor.fetchall()
-                matching_jobs = []
+            alerts = cursor.fetchall()
+            if not alerts:
+                return
+            
+            # Jobs past the lowest high-water mark, plus the last hour's
+            # jobs for alerts that have no mark yet
+            since = (datetime.now() - timedelta(hours=1)).isoformat()
+            marks = [alert['last_job_id'] for alert in alerts if alert['last_job_id'] is not None]
+            conditions, params = [], [max_job_id]
+            if marks:
+                conditions.append("j.job_id > ?")
+                params.append(min(marks))
+            if len(marks) < len(alerts):
+                conditions.append("j.created_at > ?")
+                params.append(since)
+            
+            # New open jobs for all alerts at once
+            cursor.execute(f"""
+                SELECT j.*, u.company_name, u.name as poster_name
+                FROM jobs j
+                JOIN users u ON j.job_poster_id = u.user_id
+                WHERE j.status = 'Open'
+                AND j.job_id <= ?
+                AND ({' OR '.join(conditions)})
+                ORDER BY j.job_id
+            """, params)
+            
+            new_jobs = cursor.fetchall()
+            now = datetime.now().isoformat()
+            
+            notifications = []
+            for alert, matching_jobs in match_alerts(alerts, new_jobs, default_since=since):
+                # In-app notification
+                notification_text = f"Found {len(matching_jobs)} new job{'s' if len(matching_jobs) > 1 else ''} matching your preferences!"
+                notifications.append((alert['user_id'], notification_text, now))
                 
-                for job in new_jobs:
-                    # Check if job matches user preferences
-                    if user['trade_categories'] and job['trade_category'] not in user['trade_categories'].split(','):
-                        continue
-                        
-                    if user['job_types'] and job['job_type'] not in user['job_types'].split(','):
-                        continue
-                        
-                    if user['min_pay'] and job['payment_amount'] and job['payment_amount'] < user['min_pay']:
-                        continue
-                    
-                    # Check distance if both locations are available
-                    if (user['latitude'] and user['longitude'] and 
-                        job['latitude'] and job['longitude'] and 
-                        user['max_distance']):
-                        
-                        distance = calculate_distance(
-                            user['latitude'], user['longitude'],
-                            job['latitude'], job['longitude']
-                        )
-                        
-                        if distance > user['max_distance']:
-                            continue
-                    
-                    # Check keywords
-                    if user['keywords']:
-                        keywords = user['keywords'].lower().split(',')
-                        job_text = f"{job['title']} {job['description']}".lower()
-                        if not any(kw in job_text for kw in keywords):
-                            continue
-                    
-                    matching_jobs.append(job)
+                # Email notification
+                email_body = "<h2>New Jobs Matching Your Preferences</h2>"
+                for job in matching_jobs:
+                    company = job['company_name'] or job['poster_name']
+                    email_body += f"""
+                        <div style='margin-bottom: 20px;'>
+                            <h3>{job['title']} at {company}</h3>
+                            <p>📍 {job['location']}</p>
+                            <p>💰 {job['payment_type']}: ${job['payment_amount']}</p>
+                            <p>{job['description'][:200]}...</p>
+                        </div>
+                    """
                 
-                # Send notifications for matching jobs
-                if matching_jobs:
-                    # Create in-app notification
-                    notification_text = f"Found {len(matching_jobs)} new job{'s' if len(matching_jobs) > 1 else ''} matching your preferences!"
-                    cursor.execute("""
-                        INSERT INTO notifications (user_id, message, created_at)
-                        VALUES (?, ?, ?)
-                    """, (user['user_id'], notification_text, datetime.now().isoformat()))
-                    
-                    # Send email notification
-                    email_body = "<h2>New Jobs Matching Your Preferences</h2>"
-                    for job in matching_jobs:
-                        company = job['company_name'] or job['poster_name']
-                        email_body += f"""
-                            <div style='margin-bottom: 20px;'>
-                                <h3>{job['title']} at {company}</h3>
-                                <p>📍 {job['location']}</p>
-                                <p>💰 {job['payment_type']}: ${job['payment_amount']}</p>
-                                <p>{job['description'][:200]}...</p>
-                            </div>
-                        """
-                    
-                    NotificationManager.send_email(
-                        user['email'],
-                        "New Job Matches Found!",
-                        email_body
-                    )
+                # Queued with the notifications; several alerts of one user
+                # go out as a single digest
+                NotificationManager.send_email(
+                    alert['email'], "New Job Matches Found!", email_body,
+                    digest_key='job_alerts', conn=conn
+                )
+            
+            if notifications:
+                cursor.executemany("""
+                    INSERT INTO notifications (user_id, message, created_at)
+                    VALUES (?, ?, ?)
+                """, notifications)
             
+            # Advance every alert's high-water mark, matched or not
+            cursor.executemany(
+                "UPDATE job_alerts SET last_job_id = ? WHERE alert_id = ?",
+                [(max_job_id, alert['alert_id']) for alert in alerts]
+            )
             conn.commit()
             
         finally:
@@ -181,7 +174,7 @@ class NotificationManager:
                     Please check your messages for further instructions.</p>
                 """
             
-            NotificationManager.send_email(app['email'], subject, body)
+            NotificationManager.send_email(app['email'], subject, body, digest_key='application_updates')
             
         finally:
             conn.close()
@@ -214,19 +207,21 @@ class NotificationManager:
     @staticmethod
     def mark_notification_read(notification_id):
         """
-        Mark a notification as read
+        Mark a notification, or a list of notification IDs, as read
         """
+        ids = notification_id if isinstance(notification_id, (list, tuple, set)) else [notification_id]
         try:
             conn = get_db()
             cursor = conn.cursor()
             
-            cursor.execute(
+            # unread_counters is adjusted by trigger in the same transaction
+            cursor.executemany(
                 """
                 UPDATE notifications
                 SET is_read = 1
-                WHERE notification_id = ?
+                WHERE notification_id = ? AND is_read = 0
                 """,
-                (notification_id,)
+                [(nid,) for nid in ids]
             )
             
             conn.commit()
@@ -237,6 +232,32 @@ class NotificationManager:
         finally:
             conn.close()
     
+    @staticmethod
+    def mark_all_notifications_read(user_id):
+        """
+        Mark every unread notification of a user as read
+        """
+        try:
+            conn = get_db()
+            cursor = conn.cursor()
+            
+            cursor.execute(
+                """
+                UPDATE notifications
+                SET is_read = 1
+                WHERE user_id = ? AND is_read = 0
+                """,
+                (user_id,)
+            )
+            
+            conn.commit()
+            return True
+        except Exception as e:
+            print(f"Error marking notifications as read: {e}")
+            return False
+        finally:
+            conn.close()
+    
     @staticmethod
     def get_notifications(user_id, limit=20, offset=0, include_read=False):
         """
@@ -279,28 +300,13 @@ class NotificationManager:
     @staticmethod
     def get_unread_count(user_id):
         """
-        Get count of unread notifications for a user
+        Get count of unread notifications for a user (from unread_counters)
         """
         try:
-            conn = get_db()
-            cursor = conn.cursor()
-            
-            cursor.execute(
-                """
-                SELECT COUNT(*) as count
-                FROM notifications
-                WHERE user_id = ? AND is_read = 0
-                """,
-                (user_id,)
-            )
-            
-            result = cursor.fetchone()
-            return result['count'] if result else 0
+            return get_unread_counters(user_id)['notifications']
         except Exception as e:
             print(f"Error getting unread notification count: {e}")
             return 0
-        finally:
-            conn.close()
     
     @staticmethod
     def notify_application_status_change(application_id, new_status):
@@ -308,14 +314,51 @@ class NotificationManager:
         Notify both job seeker and job poster about an application status change
         """
         try:
-            conn = get_db()
-            cursor = conn.cursor()
+            return NotificationManager.notify_status_changes([(application_id, new_status)]) > 0
+        except Exception as e:
+            print(f"Error notifying about application status change: {e}")
+            return False
+    
+    @staticmethod
+    def notify_status_changes(changes):
+        """
+        Fan out notifications for a batch of (application_id, new_status)
+        changes in one transaction; returns the number of applications notified.
+        """
+        return NotificationManager.update_application_statuses(changes, update=False)
+    
+    @staticmethod
+    def update_application_statuses(changes, update=True):
+        """
+        Apply a batch of (application_id, new_status) changes and notify everyone involved.
+
+        The status updates, the seeker and poster notifications and the
+        welcome messages of accepted applications are all written with
+        executemany in a single transaction, and names and job titles for
+        the whole batch are resolved in one query. With update=False only
+        the notifications are written.
+
+        Returns the number of applications notified.
+        """
+        changes = dict(changes)
+        if not changes:
+            return 0
+        
+        conn = get_db()
+        try:
+            now = datetime.now().isoformat()
+            if update:
+                conn.executemany(
+                    "UPDATE applications SET status = ?, updated_at = ? WHERE application_id = ?",
+                    [(status, now, application_id) for application_id, status in changes.items()]
+                )
             
-            # Get application details including job title and usernames
-            cursor.execute(
-                """
+            placeholders = ', '.join('?' for _ in changes)
+            apps = conn.execute(
+                f"""
                 SELECT 
-                    a.*, 
+                    a.application_id,
+                    a.applicant_id,
                     j.title as job_title,
                     j.job_poster_id,
                     u_seeker.name as applicant_name,
@@ -325,63 +368,77 @@ class NotificationManager:
                 JOIN jobs j ON a.job_id = j.job_id
                 JOIN users u_seeker ON a.applicant_id = u_seeker.user_id
                 JOIN users u_poster ON j.job_poster_id = u_poster.user_id
-                WHERE a.application_id = ?
+                WHERE a.application_id IN ({placeholders})
                 """,
-                (application_id,)
-            )
-            
-            app_details = cursor.fetchone()
-            
-            if not app_details:
-                print(f"Could not find application with ID {application_id}")
-                return False
-            
-            # Create the application link for notifications
-            app_link = f"/applications?application_id={application_id}"
-            
-            # Create notification for the job seeker
-            seeker_message = NotificationManager._get_status_change_message_for_seeker(
-                new_status, 
-                app_details.get('job_title', 'a job'), 
-                app_details.get('company_name') or app_details.get('poster_name', 'the employer')
-            )
-            
-            NotificationManager.create_notification(
-                app_details['applicant_id'],
-                seeker_message,
-                app_link,
-                'application_update'
-            )
-            
-            # Create notification for the job poster
-            poster_message = NotificationManager._get_status_change_message_for_poster(
-                new_status, 
-                app_details.get('job_title', 'your job posting'), 
-                app_details.get('applicant_name', 'An applicant')
-            )
-            
-            NotificationManager.create_notification(
-                app_details['job_poster_id'],
-                poster_message,
-                app_link,
-                'application_update'
-            )
-            
-            # If status is accepted, create a message thread between job seeker and poster
-            if new_status == 'Accepted':
-                NotificationManager._create_accepted_message_thread(
-                    app_details['applicant_id'],
-                    app_details['job_poster_id'],
-                    app_details['job_title'],
-                    application_id
+                tuple(changes)
+            ).fetchall()
+            
+            missing = set(changes) - {app['application_id'] for app in apps}
+            if missing:
+                print(f"Could not find applications with IDs {sorted(missing)}")
+            
+            notifications = []
+            messages = []
+            for app in apps:
+                new_status = changes[app['application_id']]
+                app_link = f"/applications?application_id={app['application_id']}"
+                job_title = app['job_title'] or 'a job'
+                
+                seeker_message = NotificationManager._get_status_change_message_for_seeker(
+                    new_status, job_title, app['company_name'] or app['poster_name'] or 'the employer'
                 )
-            
-            return True
-        except Exception as e:
-            print(f"Error notifying about application status change: {e}")
-            return False
+                poster_message = NotificationManager._get_status_change_message_for_poster(
+                    new_status, app['job_title'] or 'your job posting', app['applicant_name'] or 'An applicant'
+                )
+                notifications.append(
+                    NotificationManager._notification_values(app['applicant_id'], seeker_message, app_link, 'application_update', now)
+                )
+                notifications.append(
+                    NotificationManager._notification_values(app['job_poster_id'], poster_message, app_link, 'application_update', now)
+                )
+                
+                # An accepted application opens a message thread between seeker and poster
+                if new_status == 'Accepted':
+                    messages.extend(NotificationManager._accepted_thread_messages(
+                        app['applicant_id'], app['job_poster_id'], job_title, app['application_id'], now
+                    ))
+            
+            NotificationManager._insert_rows(conn, 'notifications', notifications)
+            NotificationManager._insert_rows(conn, 'messages', messages)
+            conn.commit()
         finally:
             conn.close()
+        
+        if messages:
+            MessageHub.publish(*{message['receiver_id'] for message in messages})
+        return len(apps)
+    
+    @staticmethod
+    def _notification_values(user_id, message, link, notification_type, created_at):
+        """Column -> value mapping for one notifications row on the current schema"""
+        columns = table_columns('notifications')
+        values = {
+            'user_id': user_id,
+            'message': message,
+            'is_read': 0,
+            'created_at': created_at
+        }
+        if 'link' in columns:
+            values['link'] = link
+        if 'notification_type' in columns:
+            values['notification_type'] = notification_type
+        return values
+    
+    @staticmethod
+    def _insert_rows(conn, table, rows):
+        """executemany INSERT of column -> value mappings sharing the same columns"""
+        if not rows:
+            return
+        columns = list(rows[0])
+        conn.executemany(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+            [tuple(row[column] for column in columns) for row in rows]
+        )
     
     @staticmethod
     def _get_status_change_message_for_seeker(status, job_title, employer_name):
@@ -412,70 +469,18 @@ class NotificationManager:
             return f"{applicant_name}'s application status for '{job_title}' has been updated to {status}."
     
     @staticmethod
-    def _create_accepted_message_thread(seeker_id, poster_id, job_title, application_id):
+    def _accepted_thread_messages(seeker_id, poster_id, job_title, application_id, created_at):
         """
-        Create initial message thread between job seeker and job poster when application is accepted
+        Welcome messages opening the thread between job seeker and job poster when an application is accepted
         """
-        try:
-            conn = get_db()
-            cursor = conn.cursor()
-            
-            # Get current time
-            now = datetime.now().isoformat()
-            
-            # Try to create welcome message using either 'message' or 'content' field
-            seeker_welcome = f"Congratulations on your application for '{job_title}'! You can use this chat to coordinate next steps with the employer."
-            poster_welcome = f"You've accepted an application for '{job_title}'. Use this chat to coordinate next steps with the applicant."
-            
-            # First try with 'message' field
-            try:
-                # Message to job seeker
-                cursor.execute(
-                    """
-                    INSERT INTO messages (sender_id, receiver_id, message, created_at, is_read, application_id)
-                    VALUES (?, ?, ?, ?, 0, ?)
-                    """,
-                    (poster_id, seeker_id, seeker_welcome, now, application_id)
-                )
-                
-                # Message to job poster
-                cursor.execute(
-                    """
-                    INSERT INTO messages (sender_id, receiver_id, message, created_at, is_read, application_id)
-                    VALUES (?, ?, ?, ?, 0, ?)
-                    """,
-                    (0, poster_id, poster_welcome, now, application_id)  # System message (sender_id = 0)
-                )
-            except sqlite3.OperationalError:
-                # Try with 'content' field
-                try:
-                    # Message to job seeker
-                    cursor.execute(
-                        """
-                        INSERT INTO messages (sender_id, receiver_id, content, created_at, is_read, application_id)
-                        VALUES (?, ?, ?, ?, 0, ?)
-                        """,
-                        (poster_id, seeker_id, seeker_welcome, now, application_id)
-                    )
-                    
-                    # Message to job poster
-                    cursor.execute(
-                        """
-                        INSERT INTO messages (sender_id, receiver_id, content, created_at, is_read, application_id)
-                        VALUES (?, ?, ?, ?, 0, ?)
-                        """,
-                        (0, poster_id, poster_welcome, now, application_id)  # System message (sender_id = 0)
-                    )
-                except Exception as e2:
-                    print(f"Could not create welcome messages: {e2}")
-            
-            conn.commit()
-            return True
-        except Exception as e:
-            print(f"Error creating message thread: {e}")
-            return False
-        finally:
-            conn.close()
+        seeker_welcome = f"Congratulations on your application for '{job_title}'! You can use this chat to coordinate next steps with the employer."
+        poster_welcome = f"You've accepted an application for '{job_title}'. Use this chat to coordinate next steps with the applicant."
+        return [
+            # Message to job seeker
+            MessageManager.message_values(poster_id, seeker_id, seeker_welcome, created_at, application_id=application_id),
+            # Message to job poster (system message, sender_id = 0)
+            MessageManager.message_values(0, poster_id, poster_welcome, created_at, application_id=application_id)
+        ]
     
     @staticmethod
     def notify_message_received(sender_id, receiver_id, message_id=None):
@@ -509,6 +514,9 @@ class NotificationManager:
                 'message'
             )
             
+            # Refresh the receiver's open chat
+            MessageHub.publish(receiver_id)
+            
             return True
         except Exception as e:
             print(f"Error notifying about message: {e}")
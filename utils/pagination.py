@@ -0,0 +1,81 @@
+import streamlit as st
+
+from config import ITEMS_PER_PAGE
+
+class Keyset:
+    """
+    Sort order for keyset ("seek") pagination.
+
+    Columns are SQL expressions ending in a unique key, e.g.
+    Keyset('j.created_at', 'j.job_id'). Instead of OFFSET, each page
+    continues after the sort values of the previous page's last row (the
+    cursor), so fetching page 1000 costs the same index seek as page 1.
+    """
+
+    def __init__(self, *columns, descending=True, keys=None):
+        self.columns = columns
+        self.descending = descending
+        # Result column holding each sort value (defaults to the bare column name)
+        self.keys = keys or tuple(column.split('.')[-1] for column in columns)
+
+    def filter(self, after):
+        """WHERE fragment for rows after the cursor; returns (sql, params), sql None on the first page"""
+        if after is None:
+            return None, []
+        op = '<' if self.descending else '>'
+        placeholders = ', '.join('?' for _ in self.columns)
+        return f"({', '.join(self.columns)}) {op} ({placeholders})", list(after)
+
+    def order_by(self):
+        direction = ' DESC' if self.descending else ''
+        return " ORDER BY " + ', '.join(f"{column}{direction}" for column in self.columns)
+
+    def cursor_for(self, row):
+        return tuple(row[key] for key in self.keys)
+
+    def fetch_page(self, cursor, query, params, page_size=ITEMS_PER_PAGE):
+        """
+        Run query (already filtered with filter() and ending in order_by())
+        for one page.
+
+        Returns (rows, next_cursor); next_cursor is None on the last page.
+        """
+        cursor.execute(f"{query} LIMIT ?", list(params) + [page_size + 1])
+        rows = cursor.fetchall()
+        if len(rows) <= page_size:
+            return rows, None
+        rows = rows[:page_size]
+        return rows, self.cursor_for(rows[-1])
+
+def page_cursor(name, filters=None):
+    """
+    Cursor of the page currently shown for the listing name, kept in
+    st.session_state. Changing filters (any comparable value, e.g. a tuple
+    of the widget values) goes back to the first page.
+    """
+    state = st.session_state.setdefault(f'{name}_pages', {'cursors': [None], 'filters': filters})
+    if state['filters'] != filters:
+        state['cursors'] = [None]
+        state['filters'] = filters
+    return state['cursors'][-1]
+
+def page_controls(name, next_cursor):
+    """Previous / Next buttons for a listing paged with page_cursor()"""
+    state = st.session_state.get(f'{name}_pages')
+    if not state:
+        return
+    cursors = state['cursors']
+    if len(cursors) == 1 and next_cursor is None:
+        return
+
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        if len(cursors) > 1 and st.button("← Previous", key=f"{name}_prev_page"):
+            cursors.pop()
+            st.rerun()
+    with col2:
+        st.caption(f"Page {len(cursors)}")
+    with col3:
+        if next_cursor is not None and st.button("Next →", key=f"{name}_next_page"):
+            cursors.append(next_cursor)
+            st.rerun()
@@ -0,0 +1,67 @@
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+from config import (
+    BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING, PASSWORD_HASH_TIMEOUT
+)
+
+# bcrypt releases the GIL, so a few worker threads keep hashing off the
+# Streamlit script threads while capping how many cores a login storm uses
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix='bcrypt')
+_slots = threading.BoundedSemaphore(PASSWORD_HASH_MAX_PENDING)
+
+class PasswordHashingBusy(RuntimeError):
+    """No hashing slot became free within PASSWORD_HASH_TIMEOUT"""
+
+def _run(func, *args):
+    """Run func on the worker pool and wait for its result"""
+    if not _slots.acquire(timeout=PASSWORD_HASH_TIMEOUT):
+        raise PasswordHashingBusy("Too many password checks in progress")
+    try:
+        future = _executor.submit(func, *args)
+    except Exception:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    return future.result()
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+def _check(password, hashed_password):
+    try:
+        return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+    except ValueError:
+        # Not a bcrypt hash (e.g. an unset or legacy password)
+        return False
+
+def hash_password(password, rounds=BCRYPT_ROUNDS):
+    """bcrypt hash of password with the configured cost"""
+    return _run(_hash, password, rounds)
+
+def verify_password(password, hashed_password):
+    """Whether password matches a stored bcrypt hash"""
+    if not password or not hashed_password:
+        return False
+    return _run(_check, password, hashed_password)
+
+def hash_rounds(hashed_password):
+    """Cost factor of a bcrypt hash ('$2b$12$...'), or None"""
+    try:
+        return int(hashed_password.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+def needs_rehash(hashed_password):
+    """Whether a stored hash was made with a cost other than BCRYPT_ROUNDS"""
+    return hash_rounds(hashed_password) != BCRYPT_ROUNDS
+
+if __name__ == '__main__':
+    # Print a hash for ADMIN_PASSWORD_HASH: python -m utils.passwords <password>
+    if len(sys.argv) != 2:
+        sys.exit("usage: python -m utils.passwords <password>")
+    print(hash_password(sys.argv[1]))
+    _executor.shutdown()
@@ -0,0 +1,187 @@
+import threading
+import time
+
+import numpy as np
+
+from config import (
+    RECOMMENDATION_CANDIDATES, RECOMMENDATION_LIMIT, RECOMMENDATION_CACHE_SECONDS,
+    SEARCH_RADIUS_KM, ZIP_SEARCH_GEOHASH_PRECISION
+)
+from utils.database import get_db, has_column, has_spatial_index, refresh_tags
+from utils.geo import bbox_filter, geohash_encode, geohash_filter, geohash_neighbors, haversine_many
+from utils.tags import overlap, unpack_tags
+
+# Score weights, as in the original single-query recommender
+LOCATION_WEIGHT = 100  # Minus the distance in km, floored at 0
+CATEGORY_WEIGHT = 50
+CERTIFICATION_WEIGHT = 25  # Per matching certification
+MAX_PAY_SCORE = 50  # Pay counts 1 point per 100, up to this
+
+# Per-user result cache: (user_id, limit) -> (newest job_id when computed, expires_at, jobs)
+_cache = {}
+_cache_lock = threading.Lock()
+
+# Open jobs that still take applications; application_count is trigger-maintained
+OPEN_JOBS = """
+    SELECT j.*, u.company_name, u.name as poster_name
+    FROM jobs j
+    JOIN users u ON j.job_poster_id = u.user_id
+    WHERE j.status = 'Open'
+    AND j.application_count < IFNULL(j.workers_needed, 1)
+"""
+
+def get_seeker(conn, user_id):
+    """
+    Seeker row, or None; cert_tags and experience_tags (certification
+    names and work history categories) are unpacked to tag id sets.
+    """
+    seeker = conn.execute("SELECT * FROM users WHERE user_id = ?", (user_id,)).fetchone()
+    if seeker:
+        seeker['cert_tags'] = unpack_tags(seeker['cert_tags'])
+        seeker['experience_tags'] = unpack_tags(seeker['experience_tags'])
+    return seeker
+
+def candidate_jobs(conn, seeker, limit=RECOMMENDATION_CANDIDATES):
+    """
+    Stage 1: gather up to limit open jobs from each index-backed source.
+
+    Sources are the seeker's experience categories (idx_jobs_status_category_created),
+    jobs around the seeker (jobs_geo R*Tree, or the geohash grid) and the newest
+    open jobs, so a good match is found even when it is not among the most recent.
+    Returns job dicts without duplicates.
+    """
+    queries = []
+
+    if seeker['experience_tags']:
+        queries.append((
+            "AND j.trade_category IN (SELECT trade_category FROM work_history WHERE user_id = ?)",
+            [seeker['user_id']]
+        ))
+
+    lat, lon = seeker.get('latitude'), seeker.get('longitude')
+    if lat is not None and lon is not None:
+        if has_spatial_index('jobs_geo'):
+            geo_sql, geo_params = bbox_filter('jobs_geo', 'j.job_id', lat, lon, SEARCH_RADIUS_KM)
+            queries.append((f"AND {geo_sql}", geo_params))
+        elif has_column('jobs', 'geohash'):
+            cell = geohash_encode(lat, lon, ZIP_SEARCH_GEOHASH_PRECISION)
+            geo_sql, geo_params = geohash_filter('j.geohash', geohash_neighbors(cell))
+            queries.append((f"AND {geo_sql}", geo_params))
+
+    queries.append(("", []))
+
+    jobs = {}
+    for condition, params in queries:
+        for job in conn.execute(
+            f"{OPEN_JOBS} {condition} ORDER BY j.created_at DESC LIMIT ?", params + [limit]
+        ).fetchall():
+            jobs.setdefault(job['job_id'], job)
+    return list(jobs.values())
+
+def score_jobs(seeker, jobs):
+    """
+    Stage 2: match scores of all candidates in vectorized passes.
+
+    Returns (scores, distances) as arrays aligned with jobs; distances are
+    NaN where either side has no coordinates.
+    """
+    n = len(jobs)
+    scores = np.zeros(n)
+    distances = np.full(n, np.nan)
+
+    # Location: closer is better
+    lat, lon = seeker.get('latitude'), seeker.get('longitude')
+    if lat is not None and lon is not None:
+        distances = haversine_many(
+            lat, lon,
+            [job.get('job_latitude') for job in jobs],
+            [job.get('job_longitude') for job in jobs]
+        )
+        scores += np.nan_to_num(np.maximum(0, LOCATION_WEIGHT - distances), nan=0.0)
+
+    # Experience category match
+    categories = seeker['experience_tags']
+    if categories:
+        scores += CATEGORY_WEIGHT * np.fromiter(
+            (overlap(categories, unpack_tags(job['category_tags'])) > 0 for job in jobs), dtype=float, count=n
+        )
+
+    # Certifications named in the job requirements
+    certifications = seeker['cert_tags']
+    if certifications:
+        scores += CERTIFICATION_WEIGHT * np.fromiter(
+            (overlap(certifications, unpack_tags(job['requirement_tags'])) for job in jobs), dtype=float, count=n
+        )
+
+    # Pay
+    pay = np.array([job.get('payment_amount') or 0 for job in jobs], dtype=float)
+    scores += np.clip(pay / 100, 0, MAX_PAY_SCORE)
+
+    return scores, distances
+
+def top_k(scores, k):
+    """Indices of the k highest scores, best first (ties keep candidate order)"""
+    if len(scores) > k:
+        # Partition first so only the k winners are fully sorted
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        return candidates[np.lexsort((candidates, -scores[candidates]))]
+    return np.argsort(-scores, kind='stable')
+
+def still_open(conn, jobs):
+    """Whether every job of a cached result still takes applications (one primary key probe each)"""
+    if not jobs:
+        return True
+    job_ids = [job['job_id'] for job in jobs]
+    placeholders = ", ".join("?" * len(job_ids))
+    row = conn.execute(f"""
+        SELECT COUNT(*) AS open_jobs FROM jobs j
+        WHERE j.job_id IN ({placeholders})
+        AND j.status = 'Open' AND j.application_count < IFNULL(j.workers_needed, 1)
+    """, job_ids).fetchone()
+    return row['open_jobs'] == len(job_ids)
+
+def recommend_jobs(user_id, limit=RECOMMENDATION_LIMIT):
+    """
+    Best matching open jobs for a seeker, with match_score and distance added.
+
+    Results are cached per user for RECOMMENDATION_CACHE_SECONDS and
+    recomputed as soon as a job newer than the cached ones is posted or a
+    cached job closes or fills up. Profile and job status edits drop the
+    cache through invalidate_recommendations().
+    """
+    conn = get_db()
+    try:
+        newest = conn.execute("SELECT MAX(job_id) AS job_id FROM jobs").fetchone()['job_id']
+
+        with _cache_lock:
+            entry = _cache.get((user_id, limit))
+        if entry and entry[0] == newest and entry[1] > time.time() and still_open(conn, entry[2]):
+            return [dict(job) for job in entry[2]]
+
+        # Tag sets of seekers and jobs edited since the last refresh
+        refresh_tags()
+        seeker = get_seeker(conn, user_id)
+        if not seeker:
+            return []
+        jobs = candidate_jobs(conn, seeker)
+    finally:
+        conn.close()
+
+    results = []
+    if jobs:
+        scores, distances = score_jobs(seeker, jobs)
+        for i in top_k(scores, limit):
+            job = dict(jobs[i])
+            job['match_score'] = float(scores[i])
+            job['distance'] = None if np.isnan(distances[i]) else float(distances[i])
+            results.append(job)
+
+    with _cache_lock:
+        _cache[(user_id, limit)] = (newest, time.time() + RECOMMENDATION_CACHE_SECONDS, results)
+    return [dict(job) for job in results]
+
+def invalidate_recommendations(user_id=None):
+    """Drop cached recommendations for one user, or for everyone"""
+    with _cache_lock:
+        for key in [key for key in _cache if user_id is None or key[0] == user_id]:
+            del _cache[key]
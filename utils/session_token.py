@@ -0,0 +1,27 @@
+import time
+
+from jose import JWTError, jwt
+
+from config import SESSION_SECRET, SESSION_EXPIRY, SESSION_REFRESH_MARGIN
+
+# Tokens are HMAC-signed with SESSION_SECRET and only ever checked locally
+ALGORITHM = 'HS256'
+
+def issue_session_token(user_id, lifetime=SESSION_EXPIRY):
+    """Signed token naming user_id, valid for lifetime seconds"""
+    now = int(time.time())
+    claims = {'sub': str(user_id), 'iat': now, 'exp': now + lifetime}
+    return jwt.encode(claims, SESSION_SECRET, algorithm=ALGORITHM)
+
+def read_session_token(token):
+    """Claims of a well-signed, unexpired token, or None"""
+    if not token:
+        return None
+    try:
+        return jwt.decode(token, SESSION_SECRET, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+
+def needs_refresh(claims):
+    """Whether the identity behind a token should be re-checked with Google"""
+    return claims['exp'] - time.time() < SESSION_REFRESH_MARGIN
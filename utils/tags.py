@@ -0,0 +1,75 @@
+import threading
+from array import array
+
+# Tag sets are stored as BLOBs of sorted 32-bit tag ids
+TAG_TYPECODE = 'i'
+
+# Vocabulary cache: normalized tag name -> tag_id. Ids are never reassigned,
+# so entries stay valid for the life of the database.
+_tag_ids = {}
+_tag_lock = threading.Lock()
+
+def normalize_tag(name):
+    """Case- and whitespace-insensitive form of a tag name"""
+    return ' '.join((name or '').lower().split())
+
+def parse_tags(*values):
+    """Normalized tag names of one or more comma-separated fields"""
+    tags = set()
+    for value in values:
+        for item in (value or '').split(','):
+            tag = normalize_tag(item)
+            if tag:
+                tags.add(tag)
+    return tags
+
+def pack_tags(tag_ids):
+    """Compact BLOB of a set of tag ids"""
+    return array(TAG_TYPECODE, sorted(tag_ids)).tobytes()
+
+def unpack_tags(blob):
+    """frozenset of the tag ids in a BLOB written by pack_tags (empty for NULL)"""
+    if not blob:
+        return frozenset()
+    tag_ids = array(TAG_TYPECODE)
+    tag_ids.frombytes(blob)
+    return frozenset(tag_ids)
+
+def overlap(a, b):
+    """Number of tag ids two sets share"""
+    return len(a & b) if a and b else 0
+
+def tag_map(conn, names, create=False):
+    """
+    Map of normalized tag names to their tag ids.
+
+    With create=True unknown names are added to the tags vocabulary on conn
+    (the caller commits); otherwise they are left out, since no stored tag
+    set can contain them. Only committed ids are cached, so ids created in a
+    transaction that is rolled back are never handed out.
+    """
+    with _tag_lock:
+        ids = {name: _tag_ids[name] for name in names if name in _tag_ids}
+    missing = [name for name in names if name not in ids]
+    if not missing:
+        return ids
+
+    if create:
+        conn.executemany("INSERT OR IGNORE INTO tags (name) VALUES (?)", [(name,) for name in missing])
+    placeholders = ", ".join("?" * len(missing))
+    rows = conn.execute(f"SELECT tag_id, name FROM tags WHERE name IN ({placeholders})", missing).fetchall()
+
+    for row in rows:
+        ids[row['name']] = row['tag_id']
+    if not create:
+        with _tag_lock:
+            _tag_ids.update((row['name'], row['tag_id']) for row in rows)
+    return ids
+
+def tag_ids(conn, names):
+    """Set of the known tag ids of normalized tag names"""
+    return set(tag_map(conn, names).values())
+
+def clear_tag_cache():
+    with _tag_lock:
+        _tag_ids.clear()